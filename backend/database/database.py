@@ -3,7 +3,7 @@ ChiliView Datenbankverbindung und -konfiguration
 Verwaltet zentrale Datenbank und Reseller-spezifische SQLite-Datenbanken
 """
 
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
@@ -191,7 +191,10 @@ class DatabaseManager:
             )
             
             # Tabellen erstellen (nur User, Project, etc. - keine Admin/Reseller)
-            from .models import User, Project, ProcessingLog, AuditLog, VirusScanResult
+            from .models import (
+                User, Project, ProcessingLog, AuditLog, VirusScanResult,
+                UploadSession, UploadSessionFile, ImageMetadata
+            )
             
             # Metadata für Reseller-spezifische Tabellen
             reseller_metadata = MetaData()
@@ -202,9 +205,13 @@ class DatabaseManager:
             ProcessingLog.__table__.tometadata(reseller_metadata)
             AuditLog.__table__.tometadata(reseller_metadata)
             VirusScanResult.__table__.tometadata(reseller_metadata)
+            UploadSession.__table__.tometadata(reseller_metadata)
+            UploadSessionFile.__table__.tometadata(reseller_metadata)
+            ImageMetadata.__table__.tometadata(reseller_metadata)
             
             # Tabellen erstellen
             reseller_metadata.create_all(bind=engine)
+            self.upgrade_reseller_schema(engine)
             
             # Engine und Session im Cache speichern
             reseller_engines[reseller_id] = engine
@@ -218,6 +225,36 @@ class DatabaseManager:
             logger.error(f"Fehler beim Erstellen der Reseller-Datenbank: {str(e)}", reseller_id=reseller_id)
             raise
     
+    def upgrade_reseller_schema(self, engine):
+        """
+        Bringt eine bestehende Reseller-Datenbank auf den aktuellen Stand
+        Fehlende Tabellen, Spalten und Indizes werden ergänzt (nur additive Änderungen)
+        """
+        from .models import Project, VirusScanResult, UploadSession, UploadSessionFile, ImageMetadata
+        
+        inspector = inspect(engine)
+        existing_tables = set(inspector.get_table_names())
+        
+        for table in (Project.__table__, VirusScanResult.__table__, UploadSession.__table__,
+                      UploadSessionFile.__table__, ImageMetadata.__table__):
+            if table.name not in existing_tables:
+                table.create(bind=engine)
+                logger.info(f"Tabelle {table.name} in Reseller-Datenbank angelegt")
+                continue
+            
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            with engine.begin() as connection:
+                for column in table.columns:
+                    if column.name not in existing_columns:
+                        column_type = column.type.compile(dialect=engine.dialect)
+                        connection.execute(text(
+                            f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                        ))
+                        logger.info(f"Spalte {table.name}.{column.name} in Reseller-Datenbank ergänzt")
+            
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+    
     def get_reseller_session(self, reseller_id: str) -> sessionmaker:
         """
         Gibt eine Session für die Reseller-spezifische Datenbank zurück
@@ -235,6 +272,7 @@ class DatabaseManager:
                 poolclass=StaticPool,
                 echo=False
             )
+            self.upgrade_reseller_schema(engine)
             
             reseller_engines[reseller_id] = engine
             reseller_sessions[reseller_id] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -3,7 +3,7 @@ ChiliView Datenbank-Models
 SQLAlchemy Models für alle Entitäten der mehrmandantenfähigen Plattform
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, LargeBinary
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -130,7 +130,9 @@ class Project(Base):
     
     # Verarbeitungsstatus
     status = Column(String(20), default="uploaded")  # uploaded, processing, completed, failed
-    webodm_task_id = Column(String(100))
+    webodm_task_id = Column(String(100))  # Task-Referenz des Verarbeitungs-Backends
+    processing_backend = Column(String(20))  # webodm, nodeodm, cli (leer = webodm)
+    processing_node = Column(String(100))  # Gewählter Verarbeitungsknoten (Label)
     progress_percentage = Column(Float, default=0.0)
     processing_started_at = Column(DateTime(timezone=True))
     processing_completed_at = Column(DateTime(timezone=True))
@@ -147,6 +149,7 @@ class Project(Base):
     # Beziehungen
     user = relationship("User", back_populates="projects")
     processing_logs = relationship("ProcessingLog", back_populates="project", cascade="all, delete-orphan")
+    image_metadata = relationship("ImageMetadata", back_populates="project", cascade="all, delete-orphan")
 
 class ProcessingLog(Base):
     """
@@ -255,9 +258,12 @@ class BackupRecord(Base):
 class VirusScanResult(Base):
     """
     Ergebnisse der Virenscans für hochgeladene Dateien
-    Speichert ClamAV-Scan-Resultate
+    Speichert ClamAV-Scan-Resultate und dient als Verdict-Cache (file_hash + Signaturversion)
     """
     __tablename__ = "virus_scan_results"
+    __table_args__ = (
+        Index("ix_virus_scan_results_hash_signature", "file_hash", "signature_version"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     file_path = Column(String(500), nullable=False)
@@ -267,6 +273,79 @@ class VirusScanResult(Base):
     is_clean = Column(Boolean, nullable=False)
     threat_name = Column(String(100))
     scan_engine_version = Column(String(50))
+    signature_version = Column(String(20))  # Signatur-DB-Version aus clamd VERSION
     
     # Zeitstempel
-    scanned_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    scanned_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class UploadSession(Base):
+    """
+    Wiederaufnehmbare Upload-Sitzung (Chunked Upload)
+    Teildateien liegen unter data/resellers/{reseller_id}/uploads/{session_uuid}
+    """
+    __tablename__ = "upload_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_uuid = Column(String(36), unique=True, index=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Zielprojekt
+    project_name = Column(String(100), nullable=False)
+    project_description = Column(Text)
+    project_id = Column(Integer, ForeignKey("projects.id"))  # gesetzt ab Beginn des Commits
+    
+    # Status
+    status = Column(String(20), default="open")  # open, committing, committed, aborted
+    total_size_bytes = Column(Integer, default=0)
+    
+    # Zeitstempel
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    expires_at = Column(DateTime(timezone=True))
+    
+    # Beziehungen
+    files = relationship("UploadSessionFile", back_populates="session",
+                         cascade="all, delete-orphan", order_by="UploadSessionFile.file_index")
+
+class UploadSessionFile(Base):
+    """
+    Einzelne Datei einer Upload-Sitzung mit bereits empfangenen Bytes
+    """
+    __tablename__ = "upload_session_files"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("upload_sessions.id"), nullable=False, index=True)
+    file_index = Column(Integer, nullable=False)
+    filename = Column(String(255), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    received_bytes = Column(Integer, default=0, nullable=False)
+    sha256 = Column(String(64))  # Optional vom Client angegebene Prüfsumme der ganzen Datei
+    
+    # Beziehungen
+    session = relationship("UploadSession", back_populates="files")
+
+class ImageMetadata(Base):
+    """
+    EXIF-Metadaten eines hochgeladenen Bildes (beim Upload extrahiert)
+    Kompakter Index pro Projekt für Planung, Laufzeitschätzung und Kartenanzeige
+    """
+    __tablename__ = "image_metadata"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    file_name = Column(String(255), nullable=False)
+    
+    # GPS (WGS84, Höhe in Metern über Meeresspiegel)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    altitude_m = Column(Float)
+    
+    # Kamera und Aufnahme
+    camera_make = Column(String(64))
+    camera_model = Column(String(128))
+    width = Column(Integer)
+    height = Column(Integer)
+    captured_at = Column(DateTime)
+    
+    # Beziehungen
+    project = relationship("Project", back_populates="image_metadata")
@@ -18,11 +18,16 @@ import os
 # Import der eigenen Module
 from database.database import init_database, get_database
 from auth.auth_handler import AuthHandler
-from routers import admin, reseller, user, auth, upload, viewer, queue
+from routers import admin, reseller, user, auth, upload, viewer, queue, webhooks
 from utils.logging_config import setup_logging
 from utils.security import SecurityMiddleware
 from services.webodm_cli_service import webodm_cli_service
 from services.processing_queue import processing_queue
+from services.image_metadata import shutdown_metadata_executor
+from services.webodm_client import close_webodm_client
+from services.status_sync import status_sync
+from services.node_registry import node_registry
+from services.processing_backend import close_processing_backends
 
 # Logging konfigurieren
 setup_logging()
@@ -56,6 +61,12 @@ async def lifespan(app: FastAPI):
     logger.info("Starte Processing Queue Manager...")
     await processing_queue.start()
     
+    # Zentrale WebODM-Statussynchronisation starten (übernimmt laufende Projekte)
+    await status_sync.start()
+    
+    # Lastabfrage der Verarbeitungsknoten für die Knotenauswahl
+    await node_registry.start()
+    
     logger.info("ChiliView Backend erfolgreich gestartet")
     yield
     
@@ -64,6 +75,15 @@ async def lifespan(app: FastAPI):
     
     # Processing Queue stoppen
     await processing_queue.stop()
+    await status_sync.stop()
+    await node_registry.stop()
+    await close_processing_backends()
+    
+    # Metadaten-Prozesse beenden
+    shutdown_metadata_executor()
+    
+    # WebODM-Verbindungspool schließen
+    await close_webodm_client()
 
 def create_directory_structure():
     """
@@ -123,6 +143,7 @@ app.include_router(user.router, prefix="/api/user", tags=["User"])
 app.include_router(upload.router, prefix="/api/upload", tags=["Upload"])
 app.include_router(viewer.router, prefix="/api/viewer", tags=["Viewer"])
 app.include_router(queue.router, prefix="/api/queue", tags=["Queue"])
+app.include_router(webhooks.router, prefix="/api/webhooks", tags=["Webhooks"])
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,139 @@
+"""
+ChiliView WebODM-Projekt-Migration
+Führt die bisherigen Einzelprojekte (ein WebODM-Projekt "ChiliView_Project_{id}" pro Upload)
+in das gemeinsame WebODM-Projekt des Resellers zusammen
+
+Abgeschlossene Tasks werden per PATCH in das Reseller-Projekt verschoben, die Task-Referenz
+in der Reseller-Datenbank angepasst und das leere Altprojekt gelöscht. Laufende Tasks
+bleiben unverändert (sie werden von der Status-Synchronisation verfolgt); die Migration
+kann später erneut ausgeführt werden. Ohne --apply werden nur die Änderungen angezeigt.
+
+Aufruf (im backend-Verzeichnis):
+    python migrate_webodm_projects.py
+    python migrate_webodm_projects.py --apply [--reseller RESELLER_ID]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Backend-Pfad zum Python-Path hinzufügen
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.database import db_manager, get_database, get_reseller_database
+from database.models import Project, Reseller
+from services.processing_backend import LEGACY_BACKEND, TASK_FINAL_STATUSES
+from services.webodm_backend import split_task_ref
+from services.webodm_client import WEBODM_TASK_STATUS, close_webodm_client, get_webodm_client
+from services.webodm_projects import webodm_projects
+
+
+async def fold_project(client, project: Project, target_id, apply: bool):
+    """
+    Verschiebt die Task eines Einzelprojekts in das Reseller-Projekt
+    Liefert (verschoben, Kurztext für die Ausgabe)
+    """
+    old_project_id, task_id = split_task_ref(project.webodm_task_id)
+
+    response = await client.get(f"/api/projects/{old_project_id}/")
+    if response.status_code == 404:
+        return False, "Altprojekt nicht mehr vorhanden"
+    if response.status_code != 200:
+        return False, f"Altprojekt nicht lesbar (HTTP {response.status_code})"
+    if response.json().get("name") != f"ChiliView_Project_{project.id}":
+        return False, "kein ChiliView-Einzelprojekt, übersprungen"
+
+    response = await client.get(f"/api/projects/{old_project_id}/tasks/")
+    if response.status_code != 200:
+        return False, f"Taskliste nicht lesbar (HTTP {response.status_code})"
+    tasks = response.json()
+    if len(tasks) != 1 or str(tasks[0]["id"]) != task_id:
+        return False, f"{len(tasks)} Tasks im Altprojekt, übersprungen"
+    if WEBODM_TASK_STATUS.get(tasks[0].get("status")) not in TASK_FINAL_STATUSES:
+        return False, "Task läuft noch, übersprungen"
+
+    if not apply:
+        return False, f"würde nach Projekt {target_id} verschoben"
+
+    response = await client.request(
+        "PATCH", f"/api/projects/{old_project_id}/tasks/{task_id}/",
+        json={"project": target_id, "name": f"ChiliView_Project_{project.id}"}
+    )
+    if response.status_code != 200:
+        return False, f"Verschieben fehlgeschlagen (HTTP {response.status_code})"
+
+    project.webodm_task_id = f"{target_id}_{task_id}"
+
+    response = await client.request("DELETE", f"/api/projects/{old_project_id}/")
+    if response.status_code not in (204, 404):
+        return True, f"verschoben, Altprojekt nicht gelöscht (HTTP {response.status_code})"
+    return True, f"nach Projekt {target_id} verschoben"
+
+
+async def migrate_reseller(client, reseller_id: str, apply: bool) -> int:
+    reseller_db = get_reseller_database(reseller_id)
+    moved = 0
+    try:
+        projects = reseller_db.query(Project).filter(
+            Project.webodm_task_id.isnot(None),
+            (Project.processing_backend.is_(None)) | (Project.processing_backend == LEGACY_BACKEND)
+        ).all()
+        if not projects:
+            return 0
+
+        print(f"🏢 Reseller {reseller_id}: {len(projects)} Projekte mit WebODM-Task")
+        target_id = None
+        if apply:
+            target_id = await webodm_projects.get_project(client, reseller_id)
+
+        for project in projects:
+            if target_id is not None and project.webodm_task_id.startswith(f"{target_id}_"):
+                continue
+            task_ref = project.webodm_task_id
+            folded, result = await fold_project(client, project, target_id or "(neu)", apply)
+            if folded:
+                reseller_db.commit()
+                moved += 1
+            print(f"  Projekt {project.id} ({task_ref}): {result}")
+
+        return moved
+    finally:
+        reseller_db.close()
+
+
+async def migrate_webodm_projects(apply: bool, reseller_id: str = None):
+    print("🔄 Starte WebODM-Projekt-Migration" + ("" if apply else " (Probelauf, --apply zum Ausführen)"))
+
+    db = get_database()
+    try:
+        reseller_ids = [row.reseller_id for row in db.query(Reseller.reseller_id).all()]
+    finally:
+        db.close()
+    if reseller_id:
+        reseller_ids = [rid for rid in reseller_ids if rid == reseller_id]
+
+    client = get_webodm_client()
+    total = 0
+    try:
+        for rid in reseller_ids:
+            if not Path(db_manager.get_reseller_database_path(rid)).exists():
+                continue
+            total += await migrate_reseller(client, rid, apply)
+    finally:
+        await close_webodm_client()
+
+    print(f"✅ Migration abgeschlossen: {total} Tasks verschoben")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiliView WebODM-Projekt-Migration")
+    parser.add_argument("--apply", action="store_true", help="Änderungen ausführen (sonst Probelauf)")
+    parser.add_argument("--reseller", help="Nur diesen Reseller migrieren")
+    args = parser.parse_args()
+    asyncio.run(migrate_webodm_projects(args.apply, args.reseller))
+
+
+if __name__ == "__main__":
+    main()
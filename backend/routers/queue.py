@@ -3,20 +3,26 @@ Queue Router für ChiliView
 Verwaltet die Processing Queue und bietet Status-Informationen
 """
 
+import json
 import logging
 from typing import Dict, List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from database.database import get_database
 from database.models import User, Project
 from auth.auth_handler import get_current_user
-from services.processing_queue import get_processing_queue, ProcessingQueueManager
+from services.job_logs import JobLog, job_logs
+from services.processing_queue import get_processing_queue, ProcessingQueueManager, ProcessingTask
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Kommentarzeile gegen Proxy-Timeouts, solange keine neuen Zeilen kommen
+LOG_STREAM_KEEPALIVE_SECONDS = 15.0
+
 @router.get("/status")
 async def get_queue_status(
     current_user: User = Depends(get_current_user),
@@ -59,6 +65,89 @@ async def get_task_status(
         logger.error(f"Fehler beim Abrufen des Task-Status: {e}")
         raise HTTPException(status_code=500, detail="Fehler beim Abrufen des Task-Status")
 
+def _task_log_for_user(task_id: str, current_user: dict,
+                       queue_manager: ProcessingQueueManager) -> JobLog:
+    """Job-Log einer Task, sichtbar für Besitzer, eigenen Reseller und Admins"""
+    task: Optional[ProcessingTask] = queue_manager.get_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task nicht gefunden")
+
+    role = current_user.get("role")
+    same_reseller = current_user.get("reseller_id") == task.reseller_id
+    is_owner = role == "user" and same_reseller and current_user.get("sub") == str(task.user_id)
+    if role != "admin" and not is_owner and not (role == "reseller" and same_reseller):
+        raise HTTPException(status_code=403, detail="Keine Berechtigung für diese Task")
+
+    job_log = job_logs.get(task.task_id)
+    if job_log is None:
+        raise HTTPException(status_code=404, detail="Keine Live-Ausgabe für diese Task vorhanden")
+    return job_log
+
+@router.get("/task/{task_id}/logs")
+async def get_task_logs(
+    task_id: str,
+    tail: int = Query(200, ge=1, le=5000),
+    current_user: dict = Depends(get_current_user),
+    queue_manager: ProcessingQueueManager = Depends(get_processing_queue)
+):
+    """Letzte Ausgabezeilen einer laufenden oder kürzlich beendeten Task (aus dem Ringpuffer)"""
+    job_log = _task_log_for_user(task_id, current_user, queue_manager)
+    entries = job_log.tail(tail)
+    return {
+        "task_id": task_id,
+        "finished": job_log.finished,
+        "status": job_log.status,
+        "last_seq": job_log.seq,
+        "lines": [{"seq": seq, "line": line} for seq, line in entries]
+    }
+
+@router.get("/task/{task_id}/logs/stream")
+async def stream_task_logs(
+    task_id: str,
+    request: Request,
+    tail: int = Query(100, ge=0, le=5000),
+    current_user: dict = Depends(get_current_user),
+    queue_manager: ProcessingQueueManager = Depends(get_processing_queue)
+):
+    """
+    Live-Ausgabe einer Task als Server-Sent Events
+    Jede Zeile ist ein Ereignis mit ihrer Sequenznummer als id; nach einem Verbindungsabbruch
+    setzt der Header Last-Event-ID an dieser Stelle fort. Zum Ende folgt ein "end"-Ereignis.
+    """
+    job_log = _task_log_for_user(task_id, current_user, queue_manager)
+
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        start_seq = int(last_event_id)
+    else:
+        start_seq = max(job_log.seq - tail, 0)
+
+    async def events():
+        seq = start_seq
+        while True:
+            entries = job_log.since(seq)
+            if entries:
+                if entries[0][0] > seq + 1:
+                    # Zeilen sind bereits aus dem Ringpuffer gefallen
+                    yield f"event: gap\ndata: {entries[0][0] - seq - 1}\n\n"
+                yield "".join(
+                    f"id: {entry_seq}\ndata: {line.replace(chr(13), ' ')}\n\n" for entry_seq, line in entries
+                )
+                seq = entries[-1][0]
+            elif job_log.finished:
+                yield f"event: end\ndata: {json.dumps({'status': job_log.status})}\n\n"
+                return
+            elif await request.is_disconnected():
+                return
+            elif not await job_log.wait(seq, LOG_STREAM_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.delete("/task/{task_id}")
 async def cancel_task(
     task_id: str,
@@ -72,7 +161,7 @@ async def cancel_task(
         if not success:
             raise HTTPException(
                 status_code=400, 
-                detail="Task konnte nicht abgebrochen werden (nicht gefunden oder bereits gestartet)"
+                detail="Task konnte nicht abgebrochen werden (nicht gefunden oder Instanz nicht aktiv)"
             )
             
         return {"message": "Task erfolgreich abgebrochen", "task_id": task_id}
@@ -165,7 +254,8 @@ async def get_admin_queue_overview(
                 "reseller_id": task.reseller_id,
                 "user_id": task.user_id,
                 "started_at": task.started_at.isoformat() if task.started_at else None,
-                "progress": task.progress
+                "progress": task.progress,
+                "resources": task.resources
             })
         
         # Queue-Statistiken
@@ -209,6 +299,7 @@ async def configure_queue(
         if max_concurrent_jobs is not None:
             if 1 <= max_concurrent_jobs <= 10:
                 queue_manager.max_concurrent_jobs = max_concurrent_jobs
+                queue_manager.resources.configure(max_concurrent_jobs)
                 changes["max_concurrent_jobs"] = max_concurrent_jobs
             else:
                 raise HTTPException(status_code=400, detail="max_concurrent_jobs muss zwischen 1 und 10 liegen")
@@ -376,6 +376,7 @@ async def get_user(
                     "name": project.name,
                     "status": project.status,
                     "progress_percentage": project.progress_percentage,
+                    "processing_node": project.processing_node,
                     "created_at": project.created_at.isoformat(),
                     "file_count": project.file_count,
                     "file_size_bytes": project.file_size_bytes
@@ -3,34 +3,41 @@ ChiliView Upload Router
 API-Endpunkte für Datei-Upload, Virenscan und WebODM-CLI Integration
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Request, status, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, Request, status, UploadFile, File, Form, Header, Query
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 import structlog
 import os
 import uuid
-import shutil
 import asyncio
+import threading
 from pathlib import Path
-# Windows-kompatible magic-Implementierung
-try:
-    import magic
-    MAGIC_AVAILABLE = True
-except ImportError:
-    MAGIC_AVAILABLE = False
-    # Fallback für Windows ohne libmagic
-    class MockMagic:
-        @staticmethod
-        def from_file(path, mime=True):
-            return "image/jpeg"  # Fallback für Bilder
-    magic = MockMagic()
-import hashlib
 
 from auth.auth_handler import require_user, get_current_user
 from database.database import get_reseller_database
-from database.models import User, Project, ProcessingLog, VirusScanResult
+from database.models import User, Project, ProcessingLog, VirusScanResult, UploadSession, UploadSessionFile
+from services.archive_ingest import ArchiveLimits, QueueReader, extract_archive, is_archive_filename
+from services.clamav_client import ClamdStreamSession, get_clamd_client, parse_signature_version
+from services.image_metadata import build_image_metadata, read_image_metadata
+from services.node_registry import node_registry
+from services.processing_backend import LEGACY_BACKEND, ProcessingJob, active_backends, get_processing_backend
+from services.webodm_client import get_webodm_client
+from services.ingest import (
+    INGEST_WORKERS, IngestCancelled, IngestRejected, IngestResult, IngestStage,
+    MultipartStreamError, StreamingMultipartParser, UploadBudget, UploadLimitExceeded,
+    first_ingest_error, hash_spooled_file, ingest_stored_file, ingest_upload_file, run_in_ingest_pool
+)
+from services.scan_cache import get_scan_cache
+from services.status_sync import status_sync
+from services.upload_progress import BatchedCommitter, upload_progress
+from services.upload_sessions import (
+    UPLOAD_SESSION_CHUNK_SIZE, ChunkChecksumMismatch, ChunkOffsetMismatch, SessionChunkWriter,
+    active_commits, discard_upload_project, expire_upload_sessions, get_chunk_lock,
+    is_stale_commit, part_path, project_file_path, reconcile_part_file, release_stale_commit,
+    remove_session_files, session_directory, session_expiry
+)
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
@@ -53,6 +60,43 @@ class ProcessingStatusResponse(BaseModel):
     current_step: Optional[str]
     estimated_completion: Optional[str]
     error_message: Optional[str]
+    files_received: Optional[int] = None
+    bytes_received: Optional[int] = None
+    processing_node: Optional[str] = None
+
+class UploadSessionFileSpec(BaseModel):
+    """Angekündigte Datei einer Upload-Sitzung"""
+    filename: str
+    size_bytes: int
+    sha256: Optional[str] = None
+
+class CreateUploadSessionRequest(BaseModel):
+    """Neue wiederaufnehmbare Upload-Sitzung"""
+    project_name: str
+    project_description: Optional[str] = None
+    files: List[UploadSessionFileSpec]
+
+class UploadSessionFileStatus(BaseModel):
+    """Empfangsstand einer Datei"""
+    file_index: int
+    filename: str
+    size_bytes: int
+    received_bytes: int
+
+class UploadSessionResponse(BaseModel):
+    """Zustand einer Upload-Sitzung"""
+    session_id: str
+    status: str
+    chunk_size: int
+    expires_at: Optional[str]
+    project_id: Optional[int]
+    files: List[UploadSessionFileStatus]
+
+class UploadChunkResponse(BaseModel):
+    """Antwort auf einen hochgeladenen Chunk"""
+    file_index: int
+    received_bytes: int
+    complete: bool
 
 # Konfiguration
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tiff', '.tif', '.raw', '.dng'}
@@ -62,10 +106,20 @@ CHUNK_SIZE = 8192  # 8KB Chunks für Streaming
 class VirusScanner:
     """
     Virus-Scanner Integration mit ClamAV
+    Nutzt den prozessweiten, gepoolten clamd-Client (INSTREAM über Unix-Socket oder TCP)
+    
+    Gescannt wird im fusionierten Ingest-Durchgang (INSTREAM), die Datei wird nicht
+    erneut gelesen. Der Verdict-Cache (VIRUS_SCAN_CACHE_ENABLED) merkt sich saubere
+    Ergebnisse je SHA-256; ein Treffer erspart den Scan, wenn der Hash vorab bekannt ist
+    (gespoolte Dateien von POST /, angekündigte Hashes bei /stream und Upload-Sitzungen),
+    und ersetzt fehlgeschlagene Stream-Scans
     """
     
     def __init__(self):
         self.enabled = os.getenv("VIRUS_SCAN_ENABLED", "true").lower() == "true"
+        self.cache_enabled = os.getenv("VIRUS_SCAN_CACHE_ENABLED", "true").lower() == "true"
+        self.client = get_clamd_client()
+        self.cache = get_scan_cache()
         
     async def scan_file(self, file_path: str) -> Dict[str, Any]:
         """
@@ -79,39 +133,7 @@ class VirusScanner:
             }
         
         try:
-            import pyclamd
-            
-            # ClamAV-Daemon verbinden
-            cd = pyclamd.ClamdUnixSocket()
-            
-            # Ping-Test
-            if not cd.ping():
-                logger.warning("ClamAV-Daemon nicht erreichbar")
-                return {
-                    "is_clean": True,  # Bei Fehler durchlassen
-                    "threat_name": None,
-                    "scan_engine_version": "unavailable"
-                }
-            
-            # Datei scannen
-            scan_result = cd.scan_file(file_path)
-            
-            if scan_result is None:
-                # Datei ist sauber
-                return {
-                    "is_clean": True,
-                    "threat_name": None,
-                    "scan_engine_version": cd.version()
-                }
-            else:
-                # Bedrohung gefunden
-                threat_name = scan_result[file_path][1] if file_path in scan_result else "Unknown"
-                return {
-                    "is_clean": False,
-                    "threat_name": threat_name,
-                    "scan_engine_version": cd.version()
-                }
-                
+            return await run_in_ingest_pool(self.client.scan_path, file_path)
         except Exception as e:
             logger.error(f"Fehler beim Virenscan: {str(e)}")
             # Bei Fehler durchlassen (fail-open)
@@ -120,287 +142,1048 @@ class VirusScanner:
                 "threat_name": None,
                 "scan_engine_version": "error"
             }
+    
+    def open_stream(self) -> Optional[ClamdStreamSession]:
+        """
+        Startet einen Stream-Scan für die fusionierte Ingest-Stufe
+        Gibt None zurück, wenn der Virenscan deaktiviert ist
+        """
+        if not self.enabled:
+            return None
+        return self.client.open_stream()
+    
+    async def cached_verdict(self, reseller_db, reseller_id: str, sha256: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Gecachtes sauberes Ergebnis für einen Inhalt mit bekanntem SHA-256 oder None
+        (gleicher Hash, aktuelle Signaturversion)
+        """
+        if not self.enabled or not self.cache_enabled or not sha256:
+            return None
+        
+        signature_version = parse_signature_version(
+            await run_in_ingest_pool(self.client.version)
+        )
+        return self.cache.lookup(reseller_db, reseller_id, sha256, signature_version)
+    
+    async def cached_verdict_for_spooled(self, reseller_db, reseller_id: str, source) -> Optional[Dict[str, Any]]:
+        """
+        Sucht eine gespoolte Upload-Datei im Verdict-Cache
+        Der zusätzliche Lesedurchgang über den Spool entfällt bei deaktiviertem Cache
+        """
+        if not self.enabled or not self.cache_enabled:
+            return None
+        sha256 = await run_in_ingest_pool(hash_spooled_file, source)
+        return await self.cached_verdict(reseller_db, reseller_id, sha256)
+    
+    async def verify_ingested(self, reseller_db, reseller_id: str, result: IngestResult,
+                              cached: Optional[Dict[str, Any]] = None) -> IngestResult:
+        """
+        Gleicht das Scan-Ergebnis der Ingest-Stufe mit dem Verdict-Cache ab
+        cached: vorab per cached_verdict gefundenes Ergebnis, die Datei wurde dann nicht gestreamt
+        """
+        if not self.enabled or not self.cache_enabled:
+            return result
+        
+        if cached is not None:
+            result.scan_result = cached
+            return result
+        
+        # Funde hat die Ingest-Stufe bereits abgelehnt; saubere Ergebnisse merken
+        signature_version = parse_signature_version(result.scan_result["scan_engine_version"])
+        if signature_version:
+            self.cache.store(reseller_id, result.sha256, signature_version, result.scan_result)
+        else:
+            # Stream-Scan fehlgeschlagen (fail-open): bekanntes sauberes Ergebnis bevorzugen
+            cached = await self.cached_verdict(reseller_db, reseller_id, result.sha256)
+            if cached is not None:
+                result.scan_result = cached
+        return result
 
-class WebODMProcessor:
+def _log_processing_error(reseller_db, project_id: int, error_message: str):
     """
-    WebODM-CLI Integration für Fotogrammetrie-Verarbeitung
+    Loggt einen Verarbeitungsfehler
     """
+    try:
+        processing_log = ProcessingLog(
+            project_id=project_id,
+            log_level="ERROR",
+            message=error_message,
+            step="processing_start",
+            progress=0.0
+        )
+        
+        reseller_db.add(processing_log)
+        reseller_db.commit()
+        
+    except Exception as e:
+        logger.error(f"Fehler beim Erstellen des Processing-Logs: {str(e)}")
+
+# Globale Instanzen
+virus_scanner = VirusScanner()
+
+def _get_upload_user(reseller_db, user_id: int) -> User:
+    """
+    Lädt den hochladenden User und prüft sein Projekt-Limit
+    """
+    user = reseller_db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User nicht gefunden")
     
-    def __init__(self):
-        self.webodm_url = os.getenv("WEBODM_URL", "http://webodm-cli:8080")
-        self.webodm_username = os.getenv("WEBODM_USERNAME", "admin")
-        self.webodm_password = os.getenv("WEBODM_PASSWORD", "admin")
+    current_projects = reseller_db.query(Project).filter(Project.user_id == user_id).count()
+    if current_projects >= user.max_projects:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Projekt-Limit erreicht ({user.max_projects})"
+        )
+    
+    return user
+
+def _create_upload_project(reseller_db, reseller_id: str, user_id: int, project_name: str,
+                           project_description: Optional[str], file_count: int,
+                           total_size: int) -> Tuple[Project, Path]:
+    """
+    Legt das Projekt im Status "uploading" samt Upload-Verzeichnis an
+    """
+    project = Project(
+        project_uuid=str(uuid.uuid4()),
+        name=project_name,
+        description=project_description,
+        user_id=user_id,
+        status="uploading",
+        file_count=file_count,
+        file_size_bytes=total_size,
+        progress_percentage=0.0
+    )
+    
+    reseller_db.add(project)
+    reseller_db.commit()
+    reseller_db.refresh(project)
+    
+    upload_dir = Path(f"data/resellers/{reseller_id}/projects/{project.id}/upload")
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    
+    project.upload_path = str(upload_dir)
+    reseller_db.commit()
+    
+    upload_progress.start(reseller_id, project.id)
+    
+    return project, upload_dir
+
+def _check_file_extension(filename: str):
+    """
+    Prüft die Dateierweiterung gegen ALLOWED_EXTENSIONS
+    """
+    file_ext = Path(filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Dateityp nicht unterstützt: {file_ext}"
+        )
+
+async def _extract_metadata(result: IngestResult) -> Optional[Dict[str, Any]]:
+    """Übergibt den mitgeführten Dateianfang an den Metadaten-Pool und gibt ihn danach frei"""
+    head, result.head = result.head, None
+    return await read_image_metadata(head, result.file_path)
+
+def _record_ingest_result(committer: BatchedCommitter, reseller_id: str, project: Project,
+                          result: IngestResult, bytes_received: int,
+                          upload_fraction: Optional[float],
+                          metadata: Optional[Dict[str, Any]] = None):
+    """
+    Speichert Scan-Ergebnis und EXIF-Metadaten einer Datei und aktualisiert den Upload-Fortschritt
+    Der Fortschritt geht sofort in den In-Memory-Kanal, die Datenbank wird gebündelt committet
+    """
+    scan_result = result.scan_result
+    virus_scan_record = VirusScanResult(
+        file_path=str(result.file_path),
+        file_hash=result.sha256,
+        is_clean=scan_result["is_clean"],
+        threat_name=scan_result["threat_name"],
+        scan_engine_version=scan_result["scan_engine_version"],
+        signature_version=parse_signature_version(scan_result["scan_engine_version"])
+    )
+    
+    # Progress aktualisieren (Upload = 50% des Gesamtfortschritts)
+    progress_percentage = None
+    if upload_fraction is not None:
+        progress_percentage = min(upload_fraction, 1.0) * 50
+        project.progress_percentage = progress_percentage
+    
+    metadata_record = None
+    if metadata is not None:
+        metadata_record = build_image_metadata(project.id, Path(result.file_path).name, metadata)
+    
+    upload_progress.update(reseller_id, project.id, bytes_received, progress_percentage)
+    committer.record(virus_scan_record, metadata_record)
+
+async def _complete_upload(reseller_db, project: Project, reseller_id: str, user_id: int,
+                           file_count: int, total_size: int, request: Optional[Request]) -> UploadResponse:
+    """
+    Schließt den Upload ab, schreibt das Audit-Log und startet die Verarbeitung
+    """
+    project.status = "uploaded"
+    project.progress_percentage = 50.0
+    project.file_count = file_count
+    project.file_size_bytes = total_size
+    reseller_db.commit()
+    upload_progress.finish(reseller_id, project.id)
+    
+    # Audit-Log erstellen
+    from auth.auth_handler import auth_handler
+    await auth_handler.log_audit_action(
+        reseller_db, "upload_files", user_id=user_id,
+        resource_type="project", resource_id=str(project.id),
+        description=f"Dateien hochgeladen: {file_count} Dateien, {total_size} bytes",
+        ip_address=request.client.host if request else "unknown",
+        user_agent=request.headers.get("user-agent", "unknown") if request else "unknown"
+    )
+    
+    logger.info("Upload abgeschlossen", 
+               project_id=project.id,
+               file_count=file_count,
+               total_size=total_size,
+               user_id=user_id)
+    
+    # WebODM-Verarbeitung im Hintergrund starten
+    asyncio.create_task(start_processing(project.id, reseller_id))
+    
+    return UploadResponse(
+        project_id=project.id,
+        project_uuid=project.project_uuid,
+        message="Upload erfolgreich, Verarbeitung gestartet",
+        file_count=file_count,
+        total_size_bytes=total_size,
+        status="uploaded"
+    )
+
+def _upload_error_to_http(error: Exception) -> Exception:
+    """
+    Übersetzt Ingest-Fehler in die passende HTTP-Antwort
+    """
+    if isinstance(error, UploadLimitExceeded):
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(error)
+        )
+    if isinstance(error, (IngestRejected, MultipartStreamError)):
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+    return error
+
+@router.post("/", response_model=UploadResponse)
+async def upload_files(
+    project_name: str = Form(...),
+    project_description: Optional[str] = Form(None),
+    files: List[UploadFile] = File(...),
+    request: Request = None,
+    current_user: dict = Depends(require_user)
+):
+    """
+    Lädt Dateien hoch und startet die Verarbeitung
+    
+    - **project_name**: Name des Projekts
+    - **project_description**: Optionale Beschreibung
+    - **files**: Liste der hochzuladenden Bilddateien
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
+            )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        project = None
         
-    async def create_task(self, project_id: int, images_path: str, reseller_db) -> str:
-        """
-        Erstellt eine neue WebODM-Aufgabe
-        """
         try:
-            import httpx
+            # User-Daten und Limits laden
+            user = _get_upload_user(reseller_db, user_id)
             
-            # WebODM-API Client
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                
-                # Login
-                login_data = {
-                    "username": self.webodm_username,
-                    "password": self.webodm_password
-                }
-                
-                login_response = await client.post(
-                    f"{self.webodm_url}/api/token-auth/",
-                    data=login_data
+            # Datei-Validierung
+            if len(files) == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Keine Dateien hochgeladen"
                 )
-                
-                if login_response.status_code != 200:
-                    raise Exception(f"WebODM Login fehlgeschlagen: {login_response.status_code}")
-                
-                token = login_response.json()["token"]
-                headers = {"Authorization": f"Token {token}"}
-                
-                # Projekt erstellen
-                project_data = {
-                    "name": f"ChiliView_Project_{project_id}",
-                    "description": f"Automatisch erstellt für Projekt {project_id}"
-                }
-                
-                project_response = await client.post(
-                    f"{self.webodm_url}/api/projects/",
-                    json=project_data,
-                    headers=headers
+            
+            if len(files) > MAX_FILES_PER_UPLOAD:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Zu viele Dateien (Maximum: {MAX_FILES_PER_UPLOAD})"
                 )
+            
+            # Dateinamen und -erweiterungen vorab prüfen
+            named_files = []
+            for i, file in enumerate(files):
+                if not file.filename:
+                    continue
+                filename = Path(file.filename).name
+                _check_file_extension(filename)
+                named_files.append((i, filename, file))
+            
+            # Gesamtgröße prüfen
+            total_size = 0
+            for file in files:
+                if hasattr(file, 'size') and file.size:
+                    total_size += file.size
+            
+            max_size_bytes = user.max_upload_size_mb * 1024 * 1024
+            if total_size > max_size_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Upload zu groß ({total_size} bytes, Maximum: {max_size_bytes} bytes)"
+                )
+            
+            # Projekt erstellen
+            project, upload_dir = _create_upload_project(
+                reseller_db, reseller_id, user_id, project_name, project_description,
+                len(files), total_size
+            )
+            
+            # Dateien parallel (begrenzt auf INGEST_WORKERS) im Thread-Pool schreiben,
+            # hashen, prüfen und scannen; Dateinamen behalten ihren Index
+            budget = UploadBudget(max_size_bytes)
+            committer = BatchedCommitter(reseller_db)
+            cancelled = threading.Event()
+            slots = asyncio.Semaphore(INGEST_WORKERS)
+            completed = 0
+            
+            async def ingest(i: int, filename: str, file: UploadFile) -> IngestResult:
+                nonlocal completed
+                async with slots:
+                    if cancelled.is_set():
+                        raise IngestCancelled(f"Ingest abgebrochen: {filename}")
+                    try:
+                        # Bereits sauber gescannter Inhalt (Cache-Treffer): kein erneuter Scan
+                        cached = await virus_scanner.cached_verdict_for_spooled(
+                            reseller_db, reseller_id, file.file
+                        )
+                        result = await run_in_ingest_pool(
+                            ingest_upload_file, file.file, upload_dir / f"{i:04d}_{filename}",
+                            filename, budget, None if cached is not None else virus_scanner.open_stream,
+                            cancelled
+                        )
+                        result = await virus_scanner.verify_ingested(reseller_db, reseller_id, result, cached)
+                    except Exception:
+                        cancelled.set()
+                        raise
                 
-                if project_response.status_code != 201:
-                    raise Exception(f"WebODM Projekt-Erstellung fehlgeschlagen: {project_response.status_code}")
-                
-                webodm_project_id = project_response.json()["id"]
+                metadata = await _extract_metadata(result)
+                completed += 1
+                _record_ingest_result(
+                    committer, reseller_id, project, result,
+                    budget.used_bytes, completed / len(named_files), metadata
+                )
+                return result
+            
+            results = await asyncio.gather(
+                *(ingest(i, filename, file) for i, filename, file in named_files),
+                return_exceptions=True
+            )
+            error = first_ingest_error(results)
+            if error is not None:
+                raise error
+            
+            return await _complete_upload(
+                reseller_db, project, reseller_id, user_id,
+                len(results), budget.used_bytes, request
+            )
+            
+        except Exception as e:
+            discard_upload_project(reseller_db, reseller_id, project)
+            raise _upload_error_to_http(e)
+        finally:
+            reseller_db.close()
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Upload konnte nicht abgeschlossen werden"
+        )
+
+@router.post("/stream", response_model=UploadResponse)
+async def upload_files_streaming(
+    request: Request,
+    current_user: dict = Depends(require_user)
+):
+    """
+    Lädt Dateien im Streaming-Modus hoch (ohne Zwischenspeicherung)
+    
+    Erwartet denselben multipart/form-data Body wie POST /api/upload/.
+    Die Felder **project_name** und **project_description** müssen vor den Dateien
+    gesendet werden. Jede Datei wird während des Empfangs blockweise direkt ins
+    Upload-Verzeichnis geschrieben und sofort abgebrochen, wenn das Upload-Limit
+    des Users überschritten wird.
+    
+    Optional kann direkt vor jeder Datei ein Feld **sha256** (SHA-256 der Datei, hex)
+    gesendet werden. Ist der Inhalt mit der aktuellen Signaturversion bereits sauber
+    gescannt, entfällt der Virenscan; weicht der Hash ab, wird der Upload abgelehnt.
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
+            )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        project = None
+        stage = None
+        stage_sha256 = None
+        stage_cached = None
+        pending = []
+        
+        try:
+            # User-Daten und Limits laden
+            user = _get_upload_user(reseller_db, user_id)
+            budget = UploadBudget(user.max_upload_size_mb * 1024 * 1024)
+            committer = BatchedCommitter(reseller_db)
+            content_length = int(request.headers.get("content-length") or 0)
+            
+            # Empfang ist sequenziell; Scan-Abschluss der vorherigen Dateien läuft
+            # parallel weiter (begrenzt auf INGEST_WORKERS offene Dateien)
+            slots = asyncio.Semaphore(INGEST_WORKERS)
+            
+            async def finish(file_stage: IngestStage, declared_sha256: Optional[str],
+                             cached: Optional[Dict[str, Any]]) -> IngestResult:
+                try:
+                    result = await run_in_ingest_pool(file_stage.finish)
+                    if declared_sha256 and result.sha256 != declared_sha256:
+                        raise IngestRejected(f"Prüfsumme stimmt nicht überein: {result.filename}")
+                    result = await virus_scanner.verify_ingested(reseller_db, reseller_id, result, cached)
+                except Exception:
+                    await run_in_ingest_pool(file_stage.abort)
+                    raise
+                finally:
+                    slots.release()
                 
-                # Task erstellen
-                task_data = {
-                    "project": webodm_project_id,
-                    "name": f"Task_{project_id}",
-                    "processing_node": None,  # Auto-select
-                    "auto_boundary": True,
-                    "options": [
-                        {"name": "mesh-octree-depth", "value": "11"},
-                        {"name": "mesh-size", "value": "200000"},
-                        {"name": "texturing-data-term", "value": "area"},
-                        {"name": "texturing-nadir-weight", "value": "16"}
-                    ]
-                }
+                metadata = await _extract_metadata(result)
+                # Dateianzahl ist im Streaming-Modus unbekannt, Fortschritt nach Bytes
+                _record_ingest_result(
+                    committer, reseller_id, project, result, budget.used_bytes,
+                    budget.used_bytes / content_length if content_length else None, metadata
+                )
+                return result
+            
+            parser = StreamingMultipartParser(request.headers.get("content-type"), request.stream())
+            fields: Dict[str, str] = {}
+            
+            async for event in parser.events():
+                kind = event[0]
                 
-                # Bilder als Multipart-Upload vorbereiten
-                files = []
-                image_files = list(Path(images_path).glob("*"))
+                if kind == "field":
+                    fields[event[1]] = event[2]
                 
-                for image_file in image_files:
-                    if image_file.suffix.lower() in ALLOWED_EXTENSIONS:
-                        files.append(
-                            ("images", (image_file.name, open(image_file, "rb"), "image/jpeg"))
+                elif kind == "file_start":
+                    # Ein sha256-Feld gilt nur für die unmittelbar folgende Datei
+                    stage_sha256 = (fields.pop("sha256", None) or "").strip().lower() or None
+                    filename = Path(event[2]).name
+                    if not filename:
+                        continue
+                    
+                    # Projekt beim ersten Datei-Teil anlegen
+                    if project is None:
+                        if not fields.get("project_name"):
+                            raise HTTPException(
+                                status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="project_name muss vor den Dateien gesendet werden"
+                            )
+                        project, upload_dir = _create_upload_project(
+                            reseller_db, reseller_id, user_id, fields["project_name"],
+                            fields.get("project_description"), 0, 0
+                        )
+                    
+                    if len(pending) >= MAX_FILES_PER_UPLOAD:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Zu viele Dateien (Maximum: {MAX_FILES_PER_UPLOAD})"
                         )
+                    
+                    _check_file_extension(filename)
+                    
+                    # Schreiben, Hash, Typprüfung und Virenscan laufen während des Empfangs;
+                    # angekündigter Hash mit sauberem Cache-Eintrag: kein Stream-Scan
+                    stage_cached = await virus_scanner.cached_verdict(reseller_db, reseller_id, stage_sha256)
+                    scan_factory = None if stage_cached is not None else virus_scanner.open_stream
+                    file_path = upload_dir / f"{len(pending):04d}_{filename}"
+                    await slots.acquire()
+                    try:
+                        stage = await run_in_ingest_pool(
+                            lambda: IngestStage(file_path, filename, budget, scan_factory() if scan_factory else None)
+                        )
+                    except Exception:
+                        slots.release()
+                        raise
                 
-                # Task mit Bildern erstellen
-                task_response = await client.post(
-                    f"{self.webodm_url}/api/projects/{webodm_project_id}/tasks/",
-                    data=task_data,
-                    files=files,
-                    headers=headers
-                )
+                elif kind == "file_data":
+                    if stage is not None:
+                        await run_in_ingest_pool(stage.write, event[1])
                 
-                # Dateien schließen
-                for _, (_, file_obj, _) in files:
-                    file_obj.close()
+                elif kind == "file_end":
+                    if stage is not None:
+                        pending.append(asyncio.ensure_future(finish(stage, stage_sha256, stage_cached)))
+                        stage = None
+            
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            pending = []
+            error = first_ingest_error(results)
+            if error is not None:
+                raise error
+            
+            if not results:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Keine Dateien hochgeladen"
+                )
+            
+            return await _complete_upload(
+                reseller_db, project, reseller_id, user_id,
+                len(results), budget.used_bytes, request
+            )
+            
+        except Exception as e:
+            if stage is not None:
+                await run_in_ingest_pool(stage.abort)
+            # Laufende Scans abwarten, bevor das Projekt verworfen wird
+            await asyncio.gather(*pending, return_exceptions=True)
+            discard_upload_project(reseller_db, reseller_id, project)
+            raise _upload_error_to_http(e)
+        finally:
+            reseller_db.close()
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Streaming-Upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Upload konnte nicht abgeschlossen werden"
+        )
+
+@router.post("/archive", response_model=UploadResponse)
+async def upload_archive(
+    request: Request,
+    current_user: dict = Depends(require_user)
+):
+    """
+    Lädt ein ZIP- oder TAR-Archiv (auch .tar.gz, .tar.bz2, .tar.xz) hoch und entpackt es beim Empfang
+    
+    Erwartet multipart/form-data mit **project_name**, optional **project_description**
+    (beide vor der Datei) und genau einem Datei-Teil mit dem Archiv. Das Archiv selbst
+    wird nicht gespeichert; übernommen werden nur Einträge mit erlaubter Bild-Endung.
+    Entpackte Gesamtgröße (Upload-Limit des Users), Anzahl der Einträge und
+    Kompressionsrate werden laufend geprüft.
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
+            )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        project = None
+        reader = None
+        extraction = None
+        collector = None
+        members: asyncio.Queue = asyncio.Queue()
+        pending = []
+        cancelled = threading.Event()
+        
+        try:
+            # User-Daten und Limits laden
+            user = _get_upload_user(reseller_db, user_id)
+            max_size_bytes = user.max_upload_size_mb * 1024 * 1024
+            budget = UploadBudget(max_size_bytes)
+            committer = BatchedCommitter(reseller_db)
+            content_length = int(request.headers.get("content-length") or 0)
+            loop = asyncio.get_running_loop()
+            slots = asyncio.Semaphore(INGEST_WORKERS)
+            
+            async def verify(result: IngestResult) -> IngestResult:
+                async with slots:
+                    try:
+                        result = await virus_scanner.verify_ingested(reseller_db, reseller_id, result)
+                    except Exception:
+                        cancelled.set()
+                        raise
                 
-                if task_response.status_code != 201:
-                    raise Exception(f"WebODM Task-Erstellung fehlgeschlagen: {task_response.status_code}")
+                metadata = await _extract_metadata(result)
+                _record_ingest_result(
+                    committer, reseller_id, project, result, budget.used_bytes,
+                    reader.bytes_received / content_length if content_length else None, metadata
+                )
+                return result
+            
+            async def collect_members():
+                # Entpackte Mitglieder prüfen und verbuchen, während das Archiv noch ankommt
+                while True:
+                    result = await members.get()
+                    if result is None:
+                        return
+                    pending.append(asyncio.ensure_future(verify(result)))
+            
+            parser = StreamingMultipartParser(request.headers.get("content-type"), request.stream())
+            fields: Dict[str, str] = {}
+            archive_received = False
+            
+            async for event in parser.events():
+                kind = event[0]
                 
-                task_id = task_response.json()["id"]
-                webodm_task_id = f"{webodm_project_id}_{task_id}"
+                if kind == "field":
+                    fields[event[1]] = event[2]
                 
-                logger.info("WebODM Task erstellt", 
-                           project_id=project_id,
-                           webodm_task_id=webodm_task_id)
+                elif kind == "file_start":
+                    filename = Path(event[2]).name
+                    if not filename:
+                        continue
+                    
+                    if archive_received or reader is not None:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Nur ein Archiv pro Upload erlaubt"
+                        )
+                    
+                    if not is_archive_filename(filename):
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Archivtyp nicht unterstützt: {filename}"
+                        )
+                    
+                    if not fields.get("project_name"):
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="project_name muss vor dem Archiv gesendet werden"
+                        )
+                    
+                    project, upload_dir = _create_upload_project(
+                        reseller_db, reseller_id, user_id, fields["project_name"],
+                        fields.get("project_description"), 0, 0
+                    )
+                    
+                    # Extraktion läuft in einem eigenen Thread und liest aus der Queue
+                    reader = QueueReader()
+                    limits = ArchiveLimits(reader, max_size_bytes, MAX_FILES_PER_UPLOAD * 10)
+                    collector = asyncio.ensure_future(collect_members())
+                    extraction = asyncio.ensure_future(asyncio.to_thread(
+                        extract_archive, reader, upload_dir, ALLOWED_EXTENSIONS, budget, limits,
+                        MAX_FILES_PER_UPLOAD, virus_scanner.open_stream,
+                        lambda result: loop.call_soon_threadsafe(members.put_nowait, result),
+                        cancelled
+                    ))
                 
-                return webodm_task_id
+                elif kind == "file_data":
+                    if reader is not None and not archive_received:
+                        if not reader.feed_nowait(event[1]):
+                            await asyncio.to_thread(reader.feed, event[1])
+                        # Fehler der Extraktion (z.B. Zip-Bombe) sofort melden
+                        if extraction.done() or cancelled.is_set():
+                            break
                 
+                elif kind == "file_end":
+                    if reader is not None and not archive_received:
+                        archive_received = True
+                        await asyncio.to_thread(reader.close)
+            
+            if extraction is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Kein Archiv hochgeladen"
+                )
+            
+            if not archive_received:
+                reader.abort()
+            
+            extraction_error = None
+            try:
+                await extraction
+            except Exception as e:
+                extraction_error = e
+            finally:
+                members.put_nowait(None)
+                await collector
+            
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            pending = []
+            error = first_ingest_error(results + ([extraction_error] if extraction_error else []))
+            if error is not None:
+                raise error
+            
+            if not archive_received:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Archiv-Upload abgebrochen"
+                )
+            
+            if not results:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Archiv enthält keine unterstützten Bilddateien"
+                )
+            
+            return await _complete_upload(
+                reseller_db, project, reseller_id, user_id,
+                len(results), budget.used_bytes, request
+            )
+            
         except Exception as e:
-            logger.error(f"Fehler bei WebODM Task-Erstellung: {str(e)}")
+            cancelled.set()
+            if reader is not None:
+                reader.abort()
+            # Extraktion und laufende Scans abwarten, bevor das Projekt verworfen wird
+            if extraction is not None:
+                await asyncio.gather(extraction, return_exceptions=True)
+            if collector is not None and not collector.done():
+                members.put_nowait(None)
+                await collector
+            await asyncio.gather(*pending, return_exceptions=True)
+            discard_upload_project(reseller_db, reseller_id, project)
+            raise _upload_error_to_http(e)
+        finally:
+            reseller_db.close()
             
-            # Processing-Log erstellen
-            await self.log_processing_error(reseller_db, project_id, str(e))
-            raise
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Archiv-Upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Upload konnte nicht abgeschlossen werden"
+        )
+
+def _get_upload_session(reseller_db, session_id: str, user_id: int) -> UploadSession:
+    """
+    Lädt eine Upload-Sitzung des Users
+    """
+    upload_session = reseller_db.query(UploadSession).filter(
+        UploadSession.session_uuid == session_id,
+        UploadSession.user_id == user_id
+    ).first()
     
-    async def get_task_status(self, webodm_task_id: str) -> Dict[str, Any]:
-        """
-        Ruft den Status einer WebODM-Aufgabe ab
-        """
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Upload-Sitzung nicht gefunden")
+    
+    return upload_session
+
+def _require_open_session(reseller_db, reseller_id: str, upload_session: UploadSession):
+    """
+    Prüft, dass die Sitzung noch Chunks bzw. einen Commit annimmt
+    Ein nach einem Absturz hängengebliebener Commit wird vorher freigegeben
+    """
+    if is_stale_commit(upload_session):
+        release_stale_commit(reseller_db, reseller_id, upload_session)
+    
+    if (upload_session.status == "open" and upload_session.expires_at
+            and upload_session.expires_at < datetime.utcnow()):
+        upload_session.status = "aborted"
+        reseller_db.commit()
+        remove_session_files(reseller_id, upload_session.session_uuid)
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Upload-Sitzung abgelaufen")
+    
+    if upload_session.status != "open":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload-Sitzung ist nicht offen ({upload_session.status})"
+        )
+
+def _upload_session_response(upload_session: UploadSession) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        session_id=upload_session.session_uuid,
+        status=upload_session.status,
+        chunk_size=UPLOAD_SESSION_CHUNK_SIZE,
+        expires_at=upload_session.expires_at.isoformat() if upload_session.expires_at else None,
+        project_id=upload_session.project_id,
+        files=[
+            UploadSessionFileStatus(
+                file_index=session_file.file_index,
+                filename=session_file.filename,
+                size_bytes=session_file.size_bytes,
+                received_bytes=session_file.received_bytes
+            )
+            for session_file in upload_session.files
+        ]
+    )
+
+@router.post("/sessions", response_model=UploadSessionResponse)
+async def create_upload_session(
+    session_request: CreateUploadSessionRequest,
+    current_user: dict = Depends(require_user)
+):
+    """
+    Legt eine wiederaufnehmbare Upload-Sitzung an (Chunked Upload)
+    
+    Ablauf: Sitzung anlegen, Chunks per PUT /sessions/{id}/files/{index}?offset=...
+    mit Header X-Chunk-SHA256 (SHA-256 des Chunks, hex) senden, dann
+    POST /sessions/{id}/commit. Nach einem Verbindungsabbruch liefert
+    GET /sessions/{id} die bereits empfangenen Bytes jeder Datei.
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
+            )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        
+        try:
+            user = _get_upload_user(reseller_db, user_id)
+            expire_upload_sessions(reseller_db, reseller_id)
+            
+            if len(session_request.files) == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Keine Dateien angekündigt"
+                )
+            
+            if len(session_request.files) > MAX_FILES_PER_UPLOAD:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Zu viele Dateien (Maximum: {MAX_FILES_PER_UPLOAD})"
+                )
+            
+            total_size = 0
+            for spec in session_request.files:
+                _check_file_extension(Path(spec.filename).name)
+                if spec.size_bytes <= 0:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Ungültige Dateigröße: {spec.filename}"
+                    )
+                total_size += spec.size_bytes
+            
+            max_size_bytes = user.max_upload_size_mb * 1024 * 1024
+            if total_size > max_size_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Upload zu groß ({total_size} bytes, Maximum: {max_size_bytes} bytes)"
+                )
+            
+            upload_session = UploadSession(
+                session_uuid=str(uuid.uuid4()),
+                user_id=user_id,
+                project_name=session_request.project_name,
+                project_description=session_request.project_description,
+                status="open",
+                total_size_bytes=total_size,
+                expires_at=session_expiry()
+            )
+            for index, spec in enumerate(session_request.files):
+                upload_session.files.append(UploadSessionFile(
+                    file_index=index,
+                    filename=Path(spec.filename).name,
+                    size_bytes=spec.size_bytes,
+                    received_bytes=0,
+                    sha256=spec.sha256.lower() if spec.sha256 else None
+                ))
+            
+            reseller_db.add(upload_session)
+            reseller_db.commit()
+            reseller_db.refresh(upload_session)
+            
+            session_directory(reseller_id, upload_session.session_uuid).mkdir(parents=True, exist_ok=True)
+            
+            logger.info("Upload-Sitzung angelegt",
+                       session_id=upload_session.session_uuid,
+                       file_count=len(session_request.files),
+                       total_size=total_size,
+                       user_id=user_id)
+            
+            return _upload_session_response(upload_session)
+            
+        finally:
+            reseller_db.close()
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Anlegen der Upload-Sitzung: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Upload-Sitzung konnte nicht angelegt werden"
+        )
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    current_user: dict = Depends(require_user)
+):
+    """
+    Liefert den Empfangsstand einer Upload-Sitzung (für die Wiederaufnahme)
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
+            )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        
         try:
-            import httpx
+            upload_session = _get_upload_session(reseller_db, session_id, user_id)
+            
+            # Nach einem Neustart Teildateien und verbuchte Bytes abgleichen
+            if upload_session.status == "open":
+                changed = False
+                for session_file in upload_session.files:
+                    received_bytes = await run_in_ingest_pool(
+                        reconcile_part_file,
+                        part_path(reseller_id, session_id, session_file.file_index),
+                        session_file.received_bytes
+                    )
+                    if received_bytes != session_file.received_bytes:
+                        session_file.received_bytes = received_bytes
+                        changed = True
+                if changed:
+                    reseller_db.commit()
             
-            project_id, task_id = webodm_task_id.split("_")
+            return _upload_session_response(upload_session)
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                
-                # Login
-                login_data = {
-                    "username": self.webodm_username,
-                    "password": self.webodm_password
-                }
-                
-                login_response = await client.post(
-                    f"{self.webodm_url}/api/token-auth/",
-                    data=login_data
-                )
-                
-                if login_response.status_code != 200:
-                    raise Exception(f"WebODM Login fehlgeschlagen: {login_response.status_code}")
-                
-                token = login_response.json()["token"]
-                headers = {"Authorization": f"Token {token}"}
-                
-                # Task-Status abrufen
-                task_response = await client.get(
-                    f"{self.webodm_url}/api/projects/{project_id}/tasks/{task_id}/",
-                    headers=headers
-                )
-                
-                if task_response.status_code != 200:
-                    raise Exception(f"WebODM Task-Status abrufen fehlgeschlagen: {task_response.status_code}")
-                
-                task_data = task_response.json()
-                
-                # Status mapping
-                status_mapping = {
-                    10: "queued",      # QUEUED
-                    20: "processing",  # RUNNING
-                    30: "completed",   # COMPLETED
-                    40: "failed",      # FAILED
-                    50: "canceled"     # CANCELED
-                }
-                
-                status = status_mapping.get(task_data["status"], "unknown")
-                progress = task_data.get("running_progress", 0)
-                
-                return {
-                    "status": status,
-                    "progress_percentage": progress,
-                    "current_step": task_data.get("last_error", ""),
-                    "processing_time": task_data.get("processing_time", 0),
-                    "output_available": task_data.get("available_assets", [])
-                }
-                
-        except Exception as e:
-            logger.error(f"Fehler beim Abrufen des WebODM Task-Status: {str(e)}")
-            return {
-                "status": "error",
-                "progress_percentage": 0,
-                "current_step": f"Fehler: {str(e)}",
-                "processing_time": 0,
-                "output_available": []
-            }
+        finally:
+            reseller_db.close()
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Upload-Sitzung: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Upload-Sitzung konnte nicht abgerufen werden"
+        )
+
+@router.put("/sessions/{session_id}/files/{file_index}", response_model=UploadChunkResponse)
+async def upload_session_chunk(
+    session_id: str,
+    file_index: int,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    chunk_sha256: str = Header(..., alias="X-Chunk-SHA256"),
+    current_user: dict = Depends(require_user)
+):
+    """
+    Nimmt einen Chunk einer Datei entgegen
     
-    async def download_results(self, webodm_task_id: str, output_path: str) -> bool:
-        """
-        Lädt die Ergebnisse einer WebODM-Aufgabe herunter
-        """
+    - **offset**: Position des Chunks, muss den bereits empfangenen Bytes entsprechen
+    - **X-Chunk-SHA256**: SHA-256 des Chunks (hex); bei Abweichung wird der Chunk verworfen
+    
+    Bei falschem Offset antwortet der Server mit 409 und dem erwarteten Offset im
+    Header Upload-Offset.
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
+            )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        
         try:
-            import httpx
+            upload_session = _get_upload_session(reseller_db, session_id, user_id)
+            _require_open_session(reseller_db, reseller_id, upload_session)
             
-            project_id, task_id = webodm_task_id.split("_")
+            session_file = next(
+                (f for f in upload_session.files if f.file_index == file_index), None
+            )
+            if session_file is None:
+                raise HTTPException(status_code=404, detail="Datei nicht in der Upload-Sitzung")
             
-            async with httpx.AsyncClient(timeout=300.0) as client:  # 5 Minuten Timeout
-                
-                # Login
-                login_data = {
-                    "username": self.webodm_username,
-                    "password": self.webodm_password
-                }
+            async with get_chunk_lock(reseller_id, session_id, file_index):
+                reseller_db.refresh(session_file)
+                path = part_path(reseller_id, session_id, file_index)
                 
-                login_response = await client.post(
-                    f"{self.webodm_url}/api/token-auth/",
-                    data=login_data
+                received_bytes = await run_in_ingest_pool(
+                    reconcile_part_file, path, session_file.received_bytes
                 )
+                if offset != received_bytes:
+                    session_file.received_bytes = received_bytes
+                    reseller_db.commit()
+                    raise ChunkOffsetMismatch(received_bytes)
                 
-                if login_response.status_code != 200:
-                    raise Exception(f"WebODM Login fehlgeschlagen: {login_response.status_code}")
-                
-                token = login_response.json()["token"]
-                headers = {"Authorization": f"Token {token}"}
-                
-                # Verfügbare Assets abrufen
-                assets_response = await client.get(
-                    f"{self.webodm_url}/api/projects/{project_id}/tasks/{task_id}/",
-                    headers=headers
+                writer = await run_in_ingest_pool(
+                    SessionChunkWriter, path, offset, session_file.size_bytes - offset
                 )
+                try:
+                    async for data in request.stream():
+                        if data:
+                            await run_in_ingest_pool(writer.write, data)
+                    chunk_size = await run_in_ingest_pool(writer.finish, chunk_sha256)
+                except Exception:
+                    await run_in_ingest_pool(writer.abort)
+                    raise
                 
-                if assets_response.status_code != 200:
-                    raise Exception("Konnte verfügbare Assets nicht abrufen")
-                
-                available_assets = assets_response.json().get("available_assets", [])
-                
-                # Wichtige Assets herunterladen
-                important_assets = ["textured_model.zip", "orthophoto.tif", "dsm.tif"]
-                
-                Path(output_path).mkdir(parents=True, exist_ok=True)
-                
-                for asset in important_assets:
-                    if asset in available_assets:
-                        
-                        download_response = await client.get(
-                            f"{self.webodm_url}/api/projects/{project_id}/tasks/{task_id}/download/{asset}",
-                            headers=headers
-                        )
-                        
-                        if download_response.status_code == 200:
-                            asset_path = Path(output_path) / asset
-                            with open(asset_path, "wb") as f:
-                                f.write(download_response.content)
-                            
-                            logger.info(f"Asset heruntergeladen: {asset}")
-                
-                return True
-                
-        except Exception as e:
-            logger.error(f"Fehler beim Herunterladen der WebODM-Ergebnisse: {str(e)}")
-            return False
-    
-    async def log_processing_error(self, reseller_db, project_id: int, error_message: str):
-        """
-        Loggt einen Verarbeitungsfehler
-        """
-        try:
-            processing_log = ProcessingLog(
-                project_id=project_id,
-                log_level="ERROR",
-                message=error_message,
-                step="webodm_processing",
-                progress=0.0
+                session_file.received_bytes = offset + chunk_size
+                upload_session.expires_at = session_expiry()
+                reseller_db.commit()
+            
+            return UploadChunkResponse(
+                file_index=file_index,
+                received_bytes=session_file.received_bytes,
+                complete=session_file.received_bytes == session_file.size_bytes
             )
             
-            reseller_db.add(processing_log)
-            reseller_db.commit()
+        finally:
+            reseller_db.close()
             
-        except Exception as e:
-            logger.error(f"Fehler beim Erstellen des Processing-Logs: {str(e)}")
-
-# Globale Instanzen
-virus_scanner = VirusScanner()
-webodm_processor = WebODMProcessor()
+    except HTTPException:
+        raise
+    except ChunkOffsetMismatch as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Upload-Offset": str(e.expected_offset)}
+        )
+    except ChunkChecksumMismatch as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except UploadLimitExceeded as e:
+        raise _upload_error_to_http(e)
+    except Exception as e:
+        logger.error(f"Fehler beim Chunk-Upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Chunk konnte nicht gespeichert werden"
+        )
 
-@router.post("/", response_model=UploadResponse)
-async def upload_files(
-    project_name: str = Form(...),
-    project_description: Optional[str] = Form(None),
-    files: List[UploadFile] = File(...),
-    request: Request = None,
+@router.post("/sessions/{session_id}/commit", response_model=UploadResponse)
+async def commit_upload_session(
+    session_id: str,
+    request: Request,
     current_user: dict = Depends(require_user)
 ):
     """
-    Lädt Dateien hoch und startet die Verarbeitung
+    Schließt eine vollständig empfangene Upload-Sitzung ab
     
-    - **project_name**: Name des Projekts
-    - **project_description**: Optionale Beschreibung
-    - **files**: Liste der hochzuladenden Bilddateien
+    Die Dateien durchlaufen dieselbe Prüfung wie bei POST /api/upload/ (Hash,
+    Typprüfung, Virenscan), werden ins Projekt übernommen und die Verarbeitung
+    wird gestartet. Bei abgelehnten Dateien wird die Sitzung beendet, bei anderen
+    Fehlern kann der Commit wiederholt werden.
     """
     try:
         user_id = int(current_user.get("sub"))
@@ -413,182 +1196,191 @@ async def upload_files(
             )
         
         reseller_db = get_reseller_database(reseller_id)
+        upload_session = None
+        project = None
+        moved_parts: List[Tuple[Path, Path]] = []
         
         try:
-            # User-Daten und Limits laden
-            user = reseller_db.query(User).filter(User.id == user_id).first()
-            if not user:
-                raise HTTPException(status_code=404, detail="User nicht gefunden")
+            upload_session = _get_upload_session(reseller_db, session_id, user_id)
+            _require_open_session(reseller_db, reseller_id, upload_session)
+            _get_upload_user(reseller_db, user_id)
             
-            # Projekt-Limit prüfen
-            current_projects = reseller_db.query(Project).filter(Project.user_id == user_id).count()
-            if current_projects >= user.max_projects:
+            session_files = list(upload_session.files)
+            incomplete = [f.filename for f in session_files if f.received_bytes != f.size_bytes]
+            if incomplete:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Projekt-Limit erreicht ({user.max_projects})"
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Dateien unvollständig: {', '.join(incomplete[:10])}"
                 )
             
-            # Datei-Validierung
-            if len(files) == 0:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Keine Dateien hochgeladen"
-                )
+            upload_session.status = "committing"
+            reseller_db.commit()
+            active_commits.add(session_id)
             
-            if len(files) > MAX_FILES_PER_UPLOAD:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Zu viele Dateien (Maximum: {MAX_FILES_PER_UPLOAD})"
-                )
+            project, upload_dir = _create_upload_project(
+                reseller_db, reseller_id, user_id, upload_session.project_name,
+                upload_session.project_description, len(session_files),
+                upload_session.total_size_bytes
+            )
+            # Projekt schon vermerken, damit ein abgebrochener Commit es wiederfindet
+            upload_session.project_id = project.id
+            reseller_db.commit()
             
-            # Gesamtgröße prüfen
-            total_size = 0
-            for file in files:
-                if hasattr(file, 'size') and file.size:
-                    total_size += file.size
+            # Teildateien parallel prüfen, erst danach ins Projekt verschieben
+            committer = BatchedCommitter(reseller_db)
+            cancelled = threading.Event()
+            slots = asyncio.Semaphore(INGEST_WORKERS)
+            completed = 0
+            verified_bytes = 0
             
-            max_size_bytes = user.max_upload_size_mb * 1024 * 1024
-            if total_size > max_size_bytes:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Upload zu groß ({total_size} bytes, Maximum: {max_size_bytes} bytes)"
+            async def verify(session_file: UploadSessionFile) -> IngestResult:
+                nonlocal completed, verified_bytes
+                async with slots:
+                    if cancelled.is_set():
+                        raise IngestCancelled(f"Ingest abgebrochen: {session_file.filename}")
+                    try:
+                        # Angekündigter Hash mit sauberem Cache-Eintrag: kein erneuter Scan
+                        cached = await virus_scanner.cached_verdict(
+                            reseller_db, reseller_id, session_file.sha256
+                        )
+                        result = await run_in_ingest_pool(
+                            ingest_stored_file,
+                            part_path(reseller_id, session_id, session_file.file_index),
+                            session_file.filename,
+                            None if cached is not None else virus_scanner.open_stream, cancelled
+                        )
+                        if session_file.sha256 and result.sha256 != session_file.sha256:
+                            raise IngestRejected(
+                                f"Prüfsumme stimmt nicht überein: {session_file.filename}"
+                            )
+                        result = await virus_scanner.verify_ingested(
+                            reseller_db, reseller_id, result, cached
+                        )
+                    except Exception:
+                        cancelled.set()
+                        raise
+                
+                # Teildatei liegt noch am alten Ort, falls der Dateianfang nicht reicht
+                metadata = await _extract_metadata(result)
+                result.file_path = project_file_path(upload_dir, session_file.file_index, session_file.filename)
+                completed += 1
+                verified_bytes += result.size
+                _record_ingest_result(
+                    committer, reseller_id, project, result,
+                    verified_bytes, completed / len(session_files), metadata
                 )
+                return result
             
-            # Projekt erstellen
-            project_uuid = str(uuid.uuid4())
-            project = Project(
-                project_uuid=project_uuid,
-                name=project_name,
-                description=project_description,
-                user_id=user_id,
-                status="uploading",
-                file_count=len(files),
-                file_size_bytes=total_size,
-                progress_percentage=0.0
+            results = await asyncio.gather(
+                *(verify(session_file) for session_file in session_files),
+                return_exceptions=True
             )
+            error = first_ingest_error(results)
+            if error is not None:
+                raise error
             
-            reseller_db.add(project)
-            reseller_db.commit()
-            reseller_db.refresh(project)
+            def move_parts():
+                for session_file in session_files:
+                    source = part_path(reseller_id, session_id, session_file.file_index)
+                    target = project_file_path(upload_dir, session_file.file_index, session_file.filename)
+                    os.replace(source, target)
+                    moved_parts.append((source, target))
             
-            # Upload-Verzeichnis erstellen
-            upload_dir = Path(f"data/resellers/{reseller_id}/projects/{project.id}/upload")
-            upload_dir.mkdir(parents=True, exist_ok=True)
+            await run_in_ingest_pool(move_parts)
             
-            project.upload_path = str(upload_dir)
-            reseller_db.commit()
+            response = await _complete_upload(
+                reseller_db, project, reseller_id, user_id,
+                len(results), verified_bytes, request
+            )
             
-            # Dateien hochladen und validieren
-            uploaded_files = []
-            virus_scan_results = []
+            # Erst nach erfolgreichem Abschluss, sonst bleibt die Sitzung wiederholbar
+            upload_session.status = "committed"
+            reseller_db.commit()
+            remove_session_files(reseller_id, session_id)
+            return response
             
-            for i, file in enumerate(files):
-                # Dateiname validieren
-                if not file.filename:
-                    continue
-                
-                # Dateierweiterung prüfen
-                file_ext = Path(file.filename).suffix.lower()
-                if file_ext not in ALLOWED_EXTENSIONS:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Dateityp nicht unterstützt: {file_ext}"
-                    )
-                
-                # Sichere Dateinamen generieren
-                safe_filename = f"{i:04d}_{file.filename}"
-                file_path = upload_dir / safe_filename
-                
-                # Datei speichern
-                with open(file_path, "wb") as buffer:
-                    content = await file.read()
-                    buffer.write(content)
-                
-                # Dateityp mit python-magic verifizieren (Windows-kompatibel)
-                if MAGIC_AVAILABLE:
-                    try:
-                        file_type = magic.from_file(str(file_path), mime=True)
-                        if not file_type.startswith('image/'):
-                            os.remove(file_path)
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=f"Datei ist kein gültiges Bild: {file.filename}"
-                            )
-                    except Exception as e:
-                        logger.warning(f"Magic-Dateityp-Prüfung fehlgeschlagen: {str(e)}")
-                        # Fallback: Dateierweiterung vertrauen
-                        pass
-                else:
-                    # Windows-Fallback: Nur Dateierweiterung prüfen
-                    logger.debug("Magic nicht verfügbar, verwende Dateierweiterung für Validierung")
-                
-                # Datei-Hash berechnen
-                file_hash = hashlib.sha256()
-                with open(file_path, "rb") as f:
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        file_hash.update(chunk)
-                
-                # Virenscan
-                scan_result = await virus_scanner.scan_file(str(file_path))
-                
-                if not scan_result["is_clean"]:
-                    # Infizierte Datei löschen
-                    os.remove(file_path)
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Virus gefunden in {file.filename}: {scan_result['threat_name']}"
-                    )
-                
-                # Scan-Ergebnis speichern
-                virus_scan_record = VirusScanResult(
-                    file_path=str(file_path),
-                    file_hash=file_hash.hexdigest(),
-                    is_clean=scan_result["is_clean"],
-                    threat_name=scan_result["threat_name"],
-                    scan_engine_version=scan_result["scan_engine_version"]
-                )
-                
-                reseller_db.add(virus_scan_record)
-                virus_scan_results.append(scan_result)
-                uploaded_files.append(str(file_path))
+        except Exception as e:
+            if moved_parts:
+                # Teildateien zurück in die Sitzung, bevor das Projektverzeichnis gelöscht wird
+                def restore_parts():
+                    for source, target in moved_parts:
+                        try:
+                            os.replace(target, source)
+                        except OSError as restore_error:
+                            logger.error(f"Teildatei {target} nicht wiederherstellbar: {str(restore_error)}")
                 
-                # Progress aktualisieren
-                progress = ((i + 1) / len(files)) * 50  # Upload = 50% des Gesamtfortschritts
-                project.progress_percentage = progress
-                reseller_db.commit()
+                await run_in_ingest_pool(restore_parts)
             
-            # Upload abgeschlossen
-            project.status = "uploaded"
-            project.progress_percentage = 50.0
-            reseller_db.commit()
+            if upload_session is not None:
+                # Abgelehnte Inhalte beenden die Sitzung, sonst bleibt sie für einen neuen Commit offen
+                try:
+                    reseller_db.rollback()
+                    if upload_session.status == "committing":
+                        if isinstance(e, IngestRejected):
+                            upload_session.status = "aborted"
+                            remove_session_files(reseller_id, session_id)
+                        else:
+                            upload_session.status = "open"
+                        upload_session.project_id = None
+                        reseller_db.commit()
+                except Exception as reset_error:
+                    reseller_db.rollback()
+                    logger.error(f"Fehler beim Zurücksetzen der Upload-Sitzung: {str(reset_error)}")
+            discard_upload_project(reseller_db, reseller_id, project)
             
-            # Audit-Log erstellen
-            from auth.auth_handler import auth_handler
-            await auth_handler.log_audit_action(
-                reseller_db, "upload_files", user_id=user_id,
-                resource_type="project", resource_id=str(project.id),
-                description=f"Dateien hochgeladen: {len(uploaded_files)} Dateien, {total_size} bytes",
-                ip_address=request.client.host if request else "unknown",
-                user_agent=request.headers.get("user-agent", "unknown") if request else "unknown"
+            raise _upload_error_to_http(e)
+        finally:
+            active_commits.discard(session_id)
+            reseller_db.close()
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Abschluss der Upload-Sitzung: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Upload konnte nicht abgeschlossen werden"
+        )
+
+@router.delete("/sessions/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    current_user: dict = Depends(require_user)
+):
+    """
+    Bricht eine offene Upload-Sitzung ab und löscht die Teildateien
+    Ein hängengebliebener Commit (UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES) wird dabei mit abgebrochen
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
             )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        
+        try:
+            upload_session = _get_upload_session(reseller_db, session_id, user_id)
+            if is_stale_commit(upload_session):
+                release_stale_commit(reseller_db, reseller_id, upload_session)
             
-            logger.info("Upload abgeschlossen", 
-                       project_id=project.id,
-                       file_count=len(uploaded_files),
-                       total_size=total_size,
-                       user_id=user_id)
+            if upload_session.status in ("committing", "committed"):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Upload-Sitzung kann nicht abgebrochen werden ({upload_session.status})"
+                )
             
-            # WebODM-Verarbeitung im Hintergrund starten
-            asyncio.create_task(start_processing(project.id, reseller_id))
+            upload_session.status = "aborted"
+            reseller_db.commit()
+            remove_session_files(reseller_id, session_id)
             
-            return UploadResponse(
-                project_id=project.id,
-                project_uuid=project.project_uuid,
-                message="Upload erfolgreich, Verarbeitung gestartet",
-                file_count=len(uploaded_files),
-                total_size_bytes=total_size,
-                status="uploaded"
-            )
+            logger.info("Upload-Sitzung abgebrochen", session_id=session_id, user_id=user_id)
+            
+            return {"message": "Upload-Sitzung abgebrochen"}
             
         finally:
             reseller_db.close()
@@ -596,17 +1388,18 @@ async def upload_files(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Fehler beim Upload: {str(e)}")
+        logger.error(f"Fehler beim Abbrechen der Upload-Sitzung: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Upload konnte nicht abgeschlossen werden"
+            detail="Upload-Sitzung konnte nicht abgebrochen werden"
         )
 
 async def start_processing(project_id: int, reseller_id: str):
     """
-    Startet die WebODM-Verarbeitung im Hintergrund
+    Startet die Verarbeitung im Hintergrund (Backend nach PROCESSING_BACKEND)
     """
     reseller_db = get_reseller_database(reseller_id)
+    backend = get_processing_backend()
     
     try:
         project = reseller_db.query(Project).filter(Project.id == project_id).first()
@@ -618,33 +1411,56 @@ async def start_processing(project_id: int, reseller_id: str):
         project.status = "processing"
         project.processing_started_at = datetime.utcnow()
         project.progress_percentage = 60.0
+        project.processing_backend = backend.name
         reseller_db.commit()
         
         # Processing-Log erstellen
         processing_log = ProcessingLog(
             project_id=project_id,
             log_level="INFO",
-            message="WebODM-Verarbeitung gestartet",
+            message=f"Verarbeitung gestartet (Backend {backend.name})",
             step="webodm_start",
             progress=60.0
         )
         reseller_db.add(processing_log)
         reseller_db.commit()
         
-        # WebODM-Task erstellen
-        webodm_task_id = await webodm_processor.create_task(
-            project_id, project.upload_path, reseller_db
+        # Task anlegen, die Bildübertragung füllt den Fortschritt von 60 auf 70%
+        def on_upload_progress(uploaded: int, total: int):
+            project.progress_percentage = 60.0 + 10.0 * uploaded / total
+            reseller_db.commit()
+        
+        def on_node_selected(selection):
+            project.processing_node = selection.label if selection else None
+            if selection:
+                reseller_db.add(ProcessingLog(
+                    project_id=project_id,
+                    log_level="INFO",
+                    message=(f"Verarbeitungsknoten {selection.label} gewählt "
+                             f"(Prognose {round(selection.predicted_seconds / 60)} min)"),
+                    step="node_selection",
+                    progress=project.progress_percentage
+                ))
+            reseller_db.commit()
+        
+        job = ProcessingJob(
+            reseller_id=reseller_id,
+            project_id=project_id,
+            user_id=project.user_id,
+            images_path=project.upload_path
         )
+        task_ref = await backend.submit(job, on_upload_progress, on_node_selected)
         
-        project.webodm_task_id = webodm_task_id
+        project.webodm_task_id = task_ref
         project.progress_percentage = 70.0
         reseller_db.commit()
         
-        # Status-Polling starten
-        await poll_processing_status(project_id, reseller_id)
+        # Statusabfrage übernimmt die zentrale Synchronisation
+        status_sync.track(reseller_id, project_id, task_ref, project.processing_started_at, backend.name)
         
     except Exception as e:
         logger.error(f"Fehler bei Verarbeitungsstart: {str(e)}")
+        _log_processing_error(reseller_db, project_id, str(e))
         
         # Projekt als fehlgeschlagen markieren
         project = reseller_db.query(Project).filter(Project.id == project_id).first()
@@ -656,120 +1472,6 @@ async def start_processing(project_id: int, reseller_id: str):
     finally:
         reseller_db.close()
 
-async def poll_processing_status(project_id: int, reseller_id: str):
-    """
-    Überwacht den Verarbeitungsstatus
-    """
-    reseller_db = get_reseller_database(reseller_id)
-    
-    try:
-        project = reseller_db.query(Project).filter(Project.id == project_id).first()
-        if not project or not project.webodm_task_id:
-            return
-        
-        max_polls = 360  # 6 Stunden bei 60s Intervall
-        poll_count = 0
-        
-        while poll_count < max_polls:
-            await asyncio.sleep(60)  # 1 Minute warten
-            poll_count += 1
-            
-            # Status von WebODM abrufen
-            status_data = await webodm_processor.get_task_status(project.webodm_task_id)
-            
-            # Projekt aktualisieren
-            project = reseller_db.query(Project).filter(Project.id == project_id).first()
-            if not project:
-                break
-            
-            old_progress = project.progress_percentage
-            new_progress = 70.0 + (status_data["progress_percentage"] * 0.25)  # 70-95%
-            
-            project.progress_percentage = new_progress
-            
-            # Processing-Log nur bei Fortschritt
-            if new_progress > old_progress:
-                processing_log = ProcessingLog(
-                    project_id=project_id,
-                    log_level="INFO",
-                    message=f"Verarbeitung: {status_data['progress_percentage']:.1f}%",
-                    step=status_data.get("current_step", "processing"),
-                    progress=new_progress
-                )
-                reseller_db.add(processing_log)
-            
-            if status_data["status"] == "completed":
-                # Ergebnisse herunterladen
-                output_dir = Path(f"data/resellers/{reseller_id}/projects/{project_id}/output")
-                
-                success = await webodm_processor.download_results(
-                    project.webodm_task_id, str(output_dir)
-                )
-                
-                if success:
-                    project.status = "completed"
-                    project.progress_percentage = 100.0
-                    project.processing_completed_at = datetime.utcnow()
-                    project.viewer_path = str(output_dir)
-                    project.viewer_url = f"/viewer/{reseller_id}/{project_id}/"
-                    
-                    # Upload-Dateien löschen (Speicherplatz sparen)
-                    if project.upload_path and Path(project.upload_path).exists():
-                        shutil.rmtree(project.upload_path, ignore_errors=True)
-                    
-                    processing_log = ProcessingLog(
-                        project_id=project_id,
-                        log_level="INFO",
-                        message="Verarbeitung erfolgreich abgeschlossen",
-                        step="completed",
-                        progress=100.0
-                    )
-                    reseller_db.add(processing_log)
-                    
-                    logger.info("Verarbeitung abgeschlossen", project_id=project_id)
-                else:
-                    project.status = "failed"
-                    project.error_message = "Ergebnisse konnten nicht heruntergeladen werden"
-                
-                reseller_db.commit()
-                break
-                
-            elif status_data["status"] == "failed":
-                project.status = "failed"
-                project.error_message = status_data.get("current_step", "Unbekannter Fehler")
-                
-                processing_log = ProcessingLog(
-                    project_id=project_id,
-                    log_level="ERROR",
-                    message=f"Verarbeitung fehlgeschlagen: {project.error_message}",
-                    step="failed",
-                    progress=project.progress_percentage
-                )
-                reseller_db.add(processing_log)
-                
-                reseller_db.commit()
-                logger.error("Verarbeitung fehlgeschlagen", 
-                           project_id=project_id, 
-                           error=project.error_message)
-                break
-            
-            reseller_db.commit()
-        
-        # Timeout erreicht
-        if poll_count >= max_polls:
-            project = reseller_db.query(Project).filter(Project.id == project_id).first()
-            if project and project.status == "processing":
-                project.status = "failed"
-                project.error_message = "Verarbeitung-Timeout erreicht"
-                reseller_db.commit()
-                
-                logger.warning("Verarbeitung-Timeout", project_id=project_id)
-        
-    except Exception as e:
-        logger.error(f"Fehler beim Status-Polling: {str(e)}")
-    finally:
-        reseller_db.close()
-
 @router.get("/status/{project_id}", response_model=ProcessingStatusResponse)
 async def get_processing_status(
     project_id: int,
@@ -822,13 +1524,25 @@ async def get_processing_status(
             if latest_log:
                 current_step = latest_log.step
             
+            # Laufender Upload: Live-Fortschritt aus dem In-Memory-Kanal
+            progress_percentage = project.progress_percentage
+            live_progress = None
+            if project.status == "uploading":
+                live_progress = upload_progress.get(reseller_id, project.id)
+                if live_progress is not None:
+                    progress_percentage = live_progress.progress_percentage
+                    current_step = "upload"
+            
             return ProcessingStatusResponse(
                 project_id=project.id,
                 status=project.status,
-                progress_percentage=project.progress_percentage,
+                progress_percentage=progress_percentage,
                 current_step=current_step,
                 estimated_completion=estimated_completion,
-                error_message=project.error_message
+                error_message=project.error_message,
+                files_received=live_progress.files_received if live_progress else None,
+                bytes_received=live_progress.bytes_received if live_progress else None,
+                processing_node=project.processing_node
             )
             
         finally:
@@ -883,6 +1597,13 @@ async def cancel_processing(
             project.status = "failed"
             project.error_message = "Verarbeitung vom Benutzer abgebrochen"
             reseller_db.commit()
+            status_sync.untrack(reseller_id, project_id)
+            
+            # Laufende Aufgabe im Backend abbrechen
+            if project.webodm_task_id:
+                await get_processing_backend(project.processing_backend or LEGACY_BACKEND).cancel(
+                    project.webodm_task_id
+                )
             
             # Processing-Log erstellen
             processing_log = ProcessingLog(
@@ -933,5 +1654,11 @@ async def upload_health_check():
         "service": "upload",
         "version": "1.0.0",
         "virus_scanner_enabled": virus_scanner.enabled,
-        "webodm_url": webodm_processor.webodm_url
+        "virus_scanner_address": virus_scanner.client.address,
+        "virus_scan_cache": virus_scanner.cache.stats() if virus_scanner.cache_enabled else None,
+        "webodm_url": get_webodm_client().base_url,
+        "webodm_client": get_webodm_client().stats(),
+        "processing_backends": [backend.stats() for backend in active_backends()],
+        "status_sync": status_sync.stats(),
+        "node_registry": node_registry.stats()
     }
\ No newline at end of file
@@ -11,7 +11,9 @@ import structlog
 
 from auth.auth_handler import require_user, get_current_user
 from database.database import get_reseller_database
-from database.models import User, Project, ProcessingLog
+from database.models import User, Project, ProcessingLog, ImageMetadata
+from services.image_metadata import summarize_project_metadata
+from services.upload_progress import upload_progress
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
@@ -54,6 +56,16 @@ class UserProfileResponse(BaseModel):
     gdpr_consent: bool
     gdpr_consent_date: Optional[str]
 
+def _live_progress_percentage(reseller_id: str, project: Project) -> float:
+    """
+    Fortschritt laufender Uploads aus dem In-Memory-Kanal, sonst aus der Datenbank
+    """
+    if project.status == "uploading":
+        live_progress = upload_progress.get(reseller_id, project.id)
+        if live_progress is not None:
+            return live_progress.progress_percentage
+    return project.progress_percentage
+
 # User-Dashboard
 @router.get("/dashboard")
 async def get_user_dashboard(
@@ -189,7 +201,7 @@ async def list_user_projects(
                     name=project.name,
                     description=project.description,
                     status=project.status,
-                    progress_percentage=project.progress_percentage,
+                    progress_percentage=_live_progress_percentage(reseller_id, project),
                     file_count=project.file_count or 0,
                     file_size_bytes=project.file_size_bytes,
                     viewer_url=project.viewer_url,
@@ -248,7 +260,7 @@ async def get_project(
                 name=project.name,
                 description=project.description,
                 status=project.status,
-                progress_percentage=project.progress_percentage,
+                progress_percentage=_live_progress_percentage(reseller_id, project),
                 file_count=project.file_count or 0,
                 file_size_bytes=project.file_size_bytes,
                 viewer_url=project.viewer_url,
@@ -484,6 +496,76 @@ async def get_project_logs(
             detail="Projekt-Logs konnten nicht abgerufen werden"
         )
 
+@router.get("/projects/{project_id}/images")
+async def get_project_images(
+    project_id: int,
+    skip: int = 0,
+    limit: int = 1000,
+    current_user: dict = Depends(require_user)
+):
+    """
+    Ruft den beim Upload erstellten EXIF-Index eines Projekts ab
+    (Zusammenfassung plus Aufnahmepositionen für die Kartenanzeige)
+    """
+    try:
+        user_id = int(current_user.get("sub"))
+        reseller_id = current_user.get("reseller_id")
+        
+        if not reseller_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reseller-ID fehlt"
+            )
+        
+        reseller_db = get_reseller_database(reseller_id)
+        
+        try:
+            # Projekt-Berechtigung prüfen
+            project = reseller_db.query(Project).filter(
+                Project.id == project_id,
+                Project.user_id == user_id
+            ).first()
+            
+            if not project:
+                raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+            
+            images = reseller_db.query(ImageMetadata).filter(
+                ImageMetadata.project_id == project_id
+            ).order_by(ImageMetadata.file_name).offset(skip).limit(limit).all()
+            
+            result = []
+            for image in images:
+                result.append({
+                    "file_name": image.file_name,
+                    "latitude": image.latitude,
+                    "longitude": image.longitude,
+                    "altitude_m": image.altitude_m,
+                    "camera_model": image.camera_model,
+                    "width": image.width,
+                    "height": image.height,
+                    "captured_at": image.captured_at.isoformat() if image.captured_at else None
+                })
+            
+            return {
+                "summary": summarize_project_metadata(reseller_db, project_id),
+                "images": result,
+                "skip": skip,
+                "limit": limit,
+                "project_id": project_id
+            }
+            
+        finally:
+            reseller_db.close()
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Bild-Metadaten: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Bild-Metadaten konnten nicht abgerufen werden"
+        )
+
 # User-Profil
 @router.get("/profile", response_model=UserProfileResponse)
 async def get_user_profile(
@@ -0,0 +1,49 @@
+"""
+Webhooks Router für ChiliView
+Empfängt Abschluss-Callbacks von WebODM/NodeODM und stößt die Status-Synchronisation an
+"""
+
+import json
+import logging
+from fastapi import APIRouter, HTTPException, Request, status
+
+from services.status_sync import status_sync
+from services.webhooks import (
+    SIGNATURE_HEADER, WEBHOOKS_ENABLED, parse_webhook_payload, verify_webhook
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.post("/processing/{reseller_id}/{project_id}", status_code=status.HTTP_202_ACCEPTED)
+async def processing_webhook(reseller_id: str, project_id: int, request: Request):
+    """
+    Callback eines Verarbeitungs-Knotens für ein Projekt
+    Authentifizierung per ?token= oder X-ChiliView-Signature; der Status wird anschließend
+    beim Knoten selbst abgefragt, der Inhalt des Callbacks dient nur der Protokollierung
+    """
+    if not WEBHOOKS_ENABLED:
+        raise HTTPException(status_code=404, detail="Webhooks sind deaktiviert")
+
+    body = await request.body()
+    if not verify_webhook(reseller_id, project_id, body,
+                          request.query_params.get("token"),
+                          request.headers.get(SIGNATURE_HEADER)):
+        logger.warning(f"Webhook mit ungültiger Authentifizierung für Projekt {reseller_id}/{project_id}")
+        raise HTTPException(status_code=401, detail="Ungültige Webhook-Authentifizierung")
+
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        payload = {}
+    event = parse_webhook_payload(payload)
+
+    tracked = status_sync.notify(reseller_id, project_id)
+    logger.info(
+        f"Webhook für Projekt {reseller_id}/{project_id} empfangen "
+        f"(Task {event['task_id']}, Status {event['status_code']}, "
+        f"{'Abfrage angestoßen' if tracked else 'nicht in Verarbeitung'})"
+    )
+
+    return {"accepted": True, "tracked": tracked, "final": event["final"]}
@@ -0,0 +1,245 @@
+"""
+Zulassungskontrolle für die Processing Queue
+Startet WebODM-CLI-Aufträge nur, wenn Arbeitsspeicher und Temp-Platz voraussichtlich reichen
+
+Für jeden Auftrag wird beim Einreihen der Spitzenbedarf geschätzt: Speicher aus
+Bildanzahl × Megapixel und den Qualitätsoptionen (pc-quality, feature-quality),
+Plattenplatz aus der Größe der Eingabebilder. Gestartet wird nur, wenn der Bedarf in den
+projizierten freien Speicher passt (verfügbar abzüglich dessen, was laufende Aufträge
+bis zu ihrer Schätzung noch belegen werden). Passt der vorderste Auftrag nicht, dürfen kleinere dahinter vorziehen
+(Backfill), jedoch höchstens ADMISSION_MAX_HEAD_WAIT Sekunden lang; danach wird nichts
+Neues mehr gestartet, bis der vorderste Auftrag Platz hat. Ein Auftrag, der allein
+größer ist als das Budget, startet, sobald nichts anderes läuft.
+"""
+
+import logging
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from services.processing_backend import IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def _env_int(name: str, default: int) -> int:
+    env_value = os.getenv(name)
+    if env_value and env_value.isdigit():
+        return int(env_value)
+    return default
+
+
+# Grundbedarf einer Instanz und Speicher je Bild-Megapixel bei pc-quality "medium"
+ADMISSION_BASE_MEMORY_MB = _env_int("ADMISSION_BASE_MEMORY_MB", 1024)
+ADMISSION_KB_PER_MEGAPIXEL = _env_int("ADMISSION_KB_PER_MEGAPIXEL", 512)
+# Temp- und Ausgabedaten als Vielfaches der Eingabebilder
+ADMISSION_DISK_FACTOR = _env_int("ADMISSION_DISK_FACTOR", 6)
+ADMISSION_MAX_HEAD_WAIT = _env_int("ADMISSION_MAX_HEAD_WAIT", 1800)
+# Annahmen, wenn Bilder nicht lesbar sind (z.B. wiederhergestellte Tasks ohne Pfad)
+DEFAULT_IMAGE_COUNT = 150
+DEFAULT_MEGAPIXELS = 20.0
+DEFAULT_IMAGE_BYTES = 8 * MB
+RESOLUTION_SAMPLE = 5
+
+# Speicherfaktoren relativ zu "medium"
+PC_QUALITY_FACTORS = {"ultra": 4.0, "high": 2.0, "medium": 1.0, "low": 0.5, "lowest": 0.25}
+FEATURE_QUALITY_FACTORS = {"ultra": 1.6, "high": 1.25, "medium": 1.0, "low": 0.8, "lowest": 0.65}
+# Standard von WebODMCLIService.process_images
+DEFAULT_QUALITY = "high"
+
+
+@dataclass
+class TaskEstimate:
+    """Geschätzter Spitzenbedarf eines Auftrags"""
+    images: int
+    megapixels: float
+    memory_bytes: int
+    disk_bytes: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["memory_mb"] = self.memory_bytes // MB
+        data["disk_mb"] = self.disk_bytes // MB
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["TaskEstimate"]:
+        if not data:
+            return None
+        return cls(data["images"], data["megapixels"], data["memory_bytes"], data["disk_bytes"])
+
+
+def _image_megapixels(image_files: Sequence[Path]) -> float:
+    """Mittlere Auflösung einiger Bilder (nur die Header werden gelesen)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return DEFAULT_MEGAPIXELS
+
+    sizes = []
+    step = max(len(image_files) // RESOLUTION_SAMPLE, 1)
+    for image_file in list(image_files)[::step][:RESOLUTION_SAMPLE]:
+        try:
+            with Image.open(image_file) as image:
+                width, height = image.size
+            sizes.append(width * height / 1_000_000)
+        except Exception:
+            continue
+    return sum(sizes) / len(sizes) if sizes else DEFAULT_MEGAPIXELS
+
+
+def estimate_task(images_path: Optional[str], options: Optional[Dict[str, Any]] = None) -> TaskEstimate:
+    """Schätzt Spitzen-RSS und Temp-Platz eines Auftrags (blockierend, im Thread-Pool aufrufen)"""
+    options = options or {}
+    image_files: List[Path] = []
+    if images_path and Path(images_path).is_dir():
+        image_files = [p for p in Path(images_path).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS]
+
+    if image_files:
+        images = len(image_files)
+        megapixels = _image_megapixels(image_files)
+        input_bytes = sum(p.stat().st_size for p in image_files)
+    else:
+        images = DEFAULT_IMAGE_COUNT
+        megapixels = DEFAULT_MEGAPIXELS
+        input_bytes = DEFAULT_IMAGE_COUNT * DEFAULT_IMAGE_BYTES
+
+    pc_factor = PC_QUALITY_FACTORS.get(str(options.get("pc-quality", DEFAULT_QUALITY)), 1.0)
+    feature_factor = FEATURE_QUALITY_FACTORS.get(str(options.get("feature-quality", DEFAULT_QUALITY)), 1.0)
+
+    memory = ADMISSION_BASE_MEMORY_MB * MB + int(
+        images * megapixels * ADMISSION_KB_PER_MEGAPIXEL * 1024 * pc_factor * feature_factor
+    )
+    # Dichte Punktwolken wachsen mit pc-quality, der Rest mit den Eingabedaten
+    disk = int(input_bytes * ADMISSION_DISK_FACTOR * max(pc_factor, 1.0))
+    return TaskEstimate(images, round(megapixels, 1), memory, disk)
+
+
+def available_memory() -> int:
+    """Derzeit verfügbarer Speicher: MemAvailable bzw. Rest bis zum cgroup-Limit"""
+    available = 0
+    try:
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemAvailable:"):
+                available = int(line.split()[1]) * 1024
+                break
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        cgroup_path = Path("/proc/self/cgroup").read_text().strip().split("::", 1)[1].lstrip("/")
+        cgroup_dir = Path("/sys/fs/cgroup") / cgroup_path
+        limit = (cgroup_dir / "memory.max").read_text().strip()
+        if limit.isdigit():
+            headroom = int(limit) - int((cgroup_dir / "memory.current").read_text().strip())
+            available = min(available, headroom) if available else headroom
+    except (OSError, ValueError, IndexError):
+        pass
+    return available
+
+
+class AdmissionController:
+    """Entscheidet, welcher wartende Auftrag als nächstes starten darf"""
+
+    def __init__(self, scratch_path: Path = Path("data/webodm_projects")):
+        self.scratch_path = Path(scratch_path)
+        self.head_waiting_since: Optional[float] = None
+        self.head_task_id: Optional[str] = None
+        self.last_decision: Dict[str, Any] = {}
+        self.backfilled = 0
+        self.deferred = 0
+
+    def free_resources(self) -> Dict[str, int]:
+        disk_path = self.scratch_path if self.scratch_path.exists() else Path(".")
+        return {
+            "memory_bytes": available_memory(),
+            "disk_bytes": shutil.disk_usage(disk_path).free
+        }
+
+    def select(self, queue: Sequence, running: Sequence,
+               running_rss: Optional[Dict[str, int]] = None) -> Optional[int]:
+        """
+        Index des nächsten startbaren Auftrags in der Queue oder None
+        Aufträge brauchen ein Attribut estimate (TaskEstimate-Dict); laufende Aufträge sind
+        mit ihrer Schätzung reserviert, soweit sie ihren Bedarf noch nicht belegt haben
+        (running_rss: aktueller RSS je Task-ID)
+        """
+        if not queue:
+            self.head_task_id = None
+            return None
+
+        free = self.free_resources()
+        # Laufende Aufträge erreichen ihre Spitze meist erst später: reserviert wird der Rest
+        # bis zur Schätzung. Beim Plattenplatz zählt die volle Schätzung (konservativ, das
+        # Temp-Verzeichnis wird nicht vermessen)
+        running_rss = running_rss or {}
+        reserved_memory = sum(
+            max(self._estimate(task).memory_bytes - running_rss.get(task.task_id, 0), 0) for task in running
+        )
+        reserved_disk = sum(self._estimate(task).disk_bytes for task in running)
+        projected_memory = free["memory_bytes"] - reserved_memory
+        projected_disk = free["disk_bytes"] - reserved_disk
+
+        head = queue[0]
+        if head.task_id != self.head_task_id:
+            self.head_task_id = head.task_id
+            self.head_waiting_since = time.monotonic()
+
+        for index, task in enumerate(queue):
+            estimate = self._estimate(task)
+            fits = estimate.memory_bytes <= projected_memory and estimate.disk_bytes <= projected_disk
+            if index == 0:
+                # Zu groß für das gesamte Budget: allein starten statt ewig zu warten
+                if fits or not running:
+                    self._decide(task, "start" if fits else "start_alone", estimate, projected_memory, projected_disk)
+                    return 0
+                head_wait = time.monotonic() - self.head_waiting_since
+                if head_wait >= ADMISSION_MAX_HEAD_WAIT:
+                    # Vordersten Auftrag nicht länger aushungern: kein Backfill mehr
+                    self._decide(task, "drain", estimate, projected_memory, projected_disk)
+                    self.deferred += 1
+                    return None
+                continue
+            if fits:
+                self.backfilled += 1
+                self._decide(task, "backfill", estimate, projected_memory, projected_disk)
+                return index
+
+        self.deferred += 1
+        self._decide(head, "wait", self._estimate(head), projected_memory, projected_disk)
+        return None
+
+    @staticmethod
+    def _estimate(task) -> TaskEstimate:
+        return TaskEstimate.from_dict(getattr(task, "estimate", None)) or estimate_task(None)
+
+    def _decide(self, task, decision: str, estimate: TaskEstimate, projected_memory: int, projected_disk: int):
+        decision_data = {
+            "task_id": task.task_id,
+            "decision": decision,
+            "memory_mb": estimate.memory_bytes // MB,
+            "disk_mb": estimate.disk_bytes // MB,
+            "projected_free_memory_mb": projected_memory // MB,
+            "projected_free_disk_mb": projected_disk // MB
+        }
+        if (task.task_id, decision) != (self.last_decision.get("task_id"), self.last_decision.get("decision")):
+            logger.info(f"Zulassung {decision} für Task {task.task_id}: {estimate.memory_bytes // MB} MB RAM, "
+                        f"{estimate.disk_bytes // MB} MB Temp (frei projiziert {projected_memory // MB} MB / "
+                        f"{projected_disk // MB} MB)")
+        self.last_decision = decision_data
+
+    def stats(self) -> Dict[str, Any]:
+        free = self.free_resources()
+        return {
+            "free_memory_mb": free["memory_bytes"] // MB,
+            "free_disk_mb": free["disk_bytes"] // MB,
+            "max_head_wait_seconds": ADMISSION_MAX_HEAD_WAIT,
+            "backfilled": self.backfilled,
+            "deferred": self.deferred,
+            "last_decision": self.last_decision
+        }
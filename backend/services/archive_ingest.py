@@ -0,0 +1,395 @@
+"""
+Archiv-Ingest für ChiliView
+Entpackt ZIP- und TAR-Archive (auch gz/bz2/xz) während des Empfangs
+
+Der Archiv-Body wird nicht auf die Platte geschrieben: die empfangenen Blöcke gehen
+über eine begrenzte Queue an einen Extraktions-Thread, jedes passende Mitglied läuft
+direkt durch die fusionierte IngestStage (Schreiben, Hash, MIME-Prüfung, Virenscan).
+Entpackte Gesamtgröße, Anzahl der Einträge und Kompressionsrate werden laufend
+geprüft, damit Zip-Bomben früh abbrechen.
+"""
+
+import logging
+import queue
+import struct
+import tarfile
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+
+from services.ingest import (
+    STREAM_CHUNK_SIZE, IngestCancelled, IngestRejected, IngestResult, IngestStage,
+    UploadBudget, UploadLimitExceeded
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tgz', '.tar.gz', '.tbz2', '.tar.bz2', '.txz', '.tar.xz')
+
+# Maximales Verhältnis entpackter zu empfangener Bytes (Bilder komprimieren kaum)
+ARCHIVE_MAX_RATIO = 100
+# Ab dieser entpackten Menge wird die Kompressionsrate geprüft
+ARCHIVE_RATIO_GRACE_BYTES = 16 * 1024 * 1024
+
+_ZIP_LOCAL_HEADER = b"PK\x03\x04"
+_ZIP_DATA_DESCRIPTOR = b"PK\x07\x08"
+_ZIP_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06", b"PK\x06\x07")
+_ZIP_MAX_32 = 0xFFFFFFFF
+
+
+class ArchiveLimitExceeded(UploadLimitExceeded):
+    """Archiv überschreitet entpackte Größe, Eintragsanzahl oder Kompressionsrate"""
+    pass
+
+
+class ArchiveFormatError(IngestRejected):
+    """Archiv ist beschädigt oder nutzt ein nicht unterstütztes Format"""
+    pass
+
+
+def is_archive_filename(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+class QueueReader:
+    """
+    Dateiähnlicher Leser über eine begrenzte Queue
+    Der Event-Loop liefert Blöcke mit feed(), der Extraktions-Thread liest mit read()
+    """
+
+    def __init__(self, max_chunks: int = 16):
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_chunks)
+        self._buffer = bytearray()
+        self._eof = False
+        self._aborted = threading.Event()
+        self.bytes_received = 0
+
+    # Seite des Event-Loops
+    def feed_nowait(self, data: bytes) -> bool:
+        """Reiht einen Block ein, ohne zu blockieren; False wenn die Queue voll ist"""
+        if self._aborted.is_set():
+            return True
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            return False
+        self.bytes_received += len(data)
+        return True
+
+    def feed(self, data: bytes):
+        """Reiht einen Block ein und wartet bei voller Queue (für asyncio.to_thread)"""
+        while not self._aborted.is_set():
+            try:
+                self._queue.put(data, timeout=0.5)
+            except queue.Full:
+                continue
+            self.bytes_received += len(data)
+            return
+
+    def close(self):
+        """Markiert das Ende des Archivs"""
+        while not self._aborted.is_set():
+            try:
+                self._queue.put(None, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def abort(self):
+        """Bricht das Lesen ab und gibt einen wartenden Produzenten frei"""
+        self._aborted.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    # Seite des Extraktions-Threads
+    def _fill(self, size: int):
+        while len(self._buffer) < size and not self._eof:
+            if self._aborted.is_set():
+                raise IngestCancelled("Archiv-Ingest abgebrochen")
+            try:
+                data = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if data is None:
+                self._eof = True
+            else:
+                self._buffer += data
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = STREAM_CHUNK_SIZE
+        if not self._buffer:
+            self._fill(1)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read_exact(self, size: int) -> bytes:
+        self._fill(size)
+        if len(self._buffer) < size:
+            raise ArchiveFormatError("Archiv ist unvollständig")
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def peek(self, size: int) -> bytes:
+        self._fill(size)
+        return bytes(self._buffer[:size])
+
+    def unread(self, data: bytes):
+        """Gibt zu viel gelesene Bytes an den Anfang des Puffers zurück"""
+        self._buffer[:0] = data
+
+    def drain(self):
+        """Liest den Rest des Bodys (z.B. zentrales ZIP-Verzeichnis) ungenutzt"""
+        while self.read(STREAM_CHUNK_SIZE):
+            pass
+
+
+class ArchiveLimits:
+    """
+    Laufende Grenzen für ein Archiv, unabhängig davon, ob ein Eintrag übernommen wird
+    """
+
+    def __init__(self, reader: QueueReader, max_uncompressed_bytes: int, max_entries: int,
+                 max_ratio: int = ARCHIVE_MAX_RATIO):
+        self.reader = reader
+        self.max_uncompressed_bytes = max_uncompressed_bytes
+        self.max_entries = max_entries
+        self.max_ratio = max_ratio
+        self.uncompressed_bytes = 0
+        self.entries = 0
+
+    def count_entry(self):
+        self.entries += 1
+        if self.entries > self.max_entries:
+            raise ArchiveLimitExceeded(f"Archiv enthält zu viele Einträge (über {self.max_entries})")
+
+    def consume(self, size: int):
+        self.uncompressed_bytes += size
+        if self.uncompressed_bytes > self.max_uncompressed_bytes:
+            raise ArchiveLimitExceeded(
+                f"Archiv entpackt zu groß (über {self.max_uncompressed_bytes} bytes)"
+            )
+        if (self.uncompressed_bytes > ARCHIVE_RATIO_GRACE_BYTES
+                and self.uncompressed_bytes > self.max_ratio * max(self.reader.bytes_received, 1)):
+            raise ArchiveLimitExceeded("Archiv hat eine unplausible Kompressionsrate")
+
+
+def _zip64_sizes(extra: bytes, compressed_size: int, uncompressed_size: int) -> Tuple[int, int, bool]:
+    """Liest Zip64-Größen aus dem Extra-Feld eines lokalen Headers"""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, offset)
+        if header_id == 0x0001:
+            data = extra[offset + 4:offset + 4 + length]
+            position = 0
+            if uncompressed_size == _ZIP_MAX_32 and position + 8 <= len(data):
+                uncompressed_size = struct.unpack_from("<Q", data, position)[0]
+                position += 8
+            if compressed_size == _ZIP_MAX_32 and position + 8 <= len(data):
+                compressed_size = struct.unpack_from("<Q", data, position)[0]
+            return compressed_size, uncompressed_size, True
+        offset += 4 + length
+    return compressed_size, uncompressed_size, False
+
+
+class _ZipMemberData:
+    """
+    Entpackte Daten eines ZIP-Eintrags in Blöcken von höchstens STREAM_CHUNK_SIZE
+    Nach vollständigem Lesen steht die berechnete CRC in crc
+    """
+
+    def __init__(self, reader: QueueReader, method: int, compressed_size: Optional[int],
+                 expected_crc: Optional[int]):
+        self.reader = reader
+        self.method = method
+        self.compressed_size = compressed_size
+        self.expected_crc = expected_crc
+        self.crc = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self.method == 0:
+            yield from self._iter_stored()
+        else:
+            yield from self._iter_deflated()
+
+        if self.expected_crc is not None and self.crc != self.expected_crc:
+            raise ArchiveFormatError("CRC-Prüfung des Archiv-Eintrags fehlgeschlagen")
+
+    def _iter_stored(self) -> Iterator[bytes]:
+        remaining = self.compressed_size
+        while remaining > 0:
+            data = self.reader.read(min(remaining, STREAM_CHUNK_SIZE))
+            if not data:
+                raise ArchiveFormatError("Archiv ist unvollständig")
+            remaining -= len(data)
+            self.crc = zlib.crc32(data, self.crc)
+            yield data
+
+    def _iter_deflated(self) -> Iterator[bytes]:
+        decompressor = zlib.decompressobj(-15)
+        remaining = self.compressed_size
+
+        while not decompressor.eof:
+            if remaining is not None and remaining <= 0:
+                raise ArchiveFormatError("Deflate-Daten sind unvollständig")
+            size = STREAM_CHUNK_SIZE if remaining is None else min(remaining, STREAM_CHUNK_SIZE)
+            data = self.reader.read(size)
+            if not data:
+                raise ArchiveFormatError("Archiv ist unvollständig")
+            if remaining is not None:
+                remaining -= len(data)
+
+            try:
+                # max_length begrenzt den Speicher pro Schritt (Schutz vor Zip-Bomben)
+                output = decompressor.decompress(data, STREAM_CHUNK_SIZE)
+                while True:
+                    if output:
+                        self.crc = zlib.crc32(output, self.crc)
+                        yield output
+                    if not decompressor.unconsumed_tail:
+                        break
+                    output = decompressor.decompress(decompressor.unconsumed_tail, STREAM_CHUNK_SIZE)
+            except zlib.error as e:
+                raise ArchiveFormatError(f"Deflate-Daten ungültig: {e}")
+
+        if remaining is None:
+            # Ohne Größenangabe gehören überzählige Bytes bereits zum Datendeskriptor
+            if decompressor.unused_data:
+                self.reader.unread(decompressor.unused_data)
+        elif remaining:
+            self.reader.read_exact(remaining)
+
+
+def iter_zip_members(reader: QueueReader) -> Iterator[Tuple[str, bool, Iterator[bytes]]]:
+    """
+    Liest ein ZIP-Archiv sequenziell über die lokalen Header (ohne zentrales Verzeichnis)
+    Liefert (name, ist_datei, daten_iterator); der Iterator muss vollständig gelesen werden
+    """
+    while True:
+        signature = reader.peek(4)
+        if len(signature) < 4 or signature in _ZIP_END_SIGNATURES:
+            reader.drain()
+            return
+        if signature != _ZIP_LOCAL_HEADER:
+            raise ArchiveFormatError("Ungültiger ZIP-Header")
+
+        header = reader.read_exact(30)
+        (_, _, flags, method, _, _, crc, compressed_size, uncompressed_size,
+         name_length, extra_length) = struct.unpack("<4s5H3L2H", header)
+        raw_name = reader.read_exact(name_length)
+        extra = reader.read_exact(extra_length)
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437", "replace")
+
+        if flags & 0x1:
+            raise ArchiveFormatError(f"Verschlüsselte Archive werden nicht unterstützt: {name}")
+
+        compressed_size, uncompressed_size, zip64 = _zip64_sizes(
+            extra, compressed_size, uncompressed_size
+        )
+        has_descriptor = bool(flags & 0x8)
+
+        if method not in (0, 8):
+            raise ArchiveFormatError(f"Kompressionsmethode {method} nicht unterstützt: {name}")
+        if has_descriptor and method == 0:
+            raise ArchiveFormatError(f"Ungepackte Einträge ohne Größenangabe nicht unterstützt: {name}")
+
+        is_file = not name.endswith("/")
+        member_data = _ZipMemberData(
+            reader, method,
+            None if has_descriptor else compressed_size,
+            None if has_descriptor else crc
+        )
+        yield name, is_file, member_data
+
+        if has_descriptor:
+            # Datendeskriptor: optionale Signatur, CRC, Größen (Zip64: 8 Bytes)
+            size_length = 16 if zip64 else 8
+            if reader.peek(4) == _ZIP_DATA_DESCRIPTOR:
+                reader.read_exact(4)
+            descriptor_crc = struct.unpack("<L", reader.read_exact(4))[0]
+            reader.read_exact(size_length)
+            if descriptor_crc != member_data.crc:
+                raise ArchiveFormatError(f"CRC-Prüfung fehlgeschlagen: {name}")
+
+
+def iter_tar_members(reader: QueueReader) -> Iterator[Tuple[str, bool, Iterator[bytes]]]:
+    """Liest ein TAR-Archiv im Stream-Modus (Kompression wird automatisch erkannt)"""
+    try:
+        with tarfile.open(fileobj=reader, mode="r|*") as tar:
+            for member in tar:
+                if not member.isfile():
+                    yield member.name, False, iter(())
+                    continue
+
+                source = tar.extractfile(member)
+                yield member.name, True, iter(lambda: source.read(STREAM_CHUNK_SIZE), b"")
+    except tarfile.TarError as e:
+        raise ArchiveFormatError(f"TAR-Archiv ungültig: {e}")
+    reader.drain()
+
+
+def _is_wanted_member(name: str, allowed_extensions: Set[str]) -> bool:
+    path = Path(name)
+    if any(part.startswith(".") or part == "__MACOSX" for part in path.parts):
+        return False
+    return path.suffix.lower() in allowed_extensions
+
+
+def extract_archive(reader: QueueReader, upload_dir: Path, allowed_extensions: Set[str],
+                    budget: UploadBudget, limits: ArchiveLimits, max_files: int,
+                    scan_factory=None, on_result: Optional[Callable[[IngestResult], None]] = None,
+                    cancelled: Optional[threading.Event] = None) -> List[IngestResult]:
+    """
+    Entpackt ein Archiv aus dem QueueReader direkt ins Upload-Verzeichnis
+    Läuft in einem eigenen Thread; jedes übernommene Mitglied wird über on_result gemeldet
+    """
+    results: List[IngestResult] = []
+    try:
+        members = (
+            iter_zip_members(reader) if reader.peek(4) == _ZIP_LOCAL_HEADER
+            else iter_tar_members(reader)
+        )
+
+        for name, is_file, chunks in members:
+            limits.count_entry()
+            wanted = is_file and _is_wanted_member(name, allowed_extensions)
+
+            if wanted and len(results) >= max_files:
+                raise ArchiveLimitExceeded(f"Zu viele Dateien im Archiv (Maximum: {max_files})")
+
+            stage = None
+            if wanted:
+                filename = Path(name).name
+                stage = IngestStage(
+                    upload_dir / f"{len(results):04d}_{filename}", filename, budget,
+                    scan_factory() if scan_factory else None
+                )
+
+            try:
+                for chunk in chunks:
+                    if cancelled is not None and cancelled.is_set():
+                        raise IngestCancelled("Archiv-Ingest abgebrochen")
+                    limits.consume(len(chunk))
+                    if stage is not None:
+                        stage.write(chunk)
+
+                if stage is not None:
+                    result = stage.finish()
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+            except Exception:
+                if stage is not None:
+                    stage.abort()
+                raise
+
+        return results
+    except Exception:
+        reader.abort()
+        raise
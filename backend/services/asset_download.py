@@ -0,0 +1,256 @@
+"""
+Asset-Download für ChiliView
+Streamt WebODM-Ergebnisse blockweise auf die Platte, parallel und per HTTP-Range wiederaufnehmbar
+
+Jedes Asset wird in {name}.part geschrieben und erst nach der Prüfung umbenannt:
+Größe (Content-Length/Content-Range), SHA-256 gegen einen vom Server gelieferten
+Digest-Header (falls vorhanden) und Formatprüfung (ZIP-CRCs, TIFF-Header). Größen und
+SHA-256 landen in assets.json im Ausgabeverzeichnis, damit spätere Schritte die Dateien
+ohne WebODM verifizieren können.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import re
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.ingest import STREAM_CHUNK_SIZE
+from services.webodm_client import (
+    WEBODM_DOWNLOAD_CONCURRENCY, WEBODM_DOWNLOAD_RETRIES, WebODMClient
+)
+
+logger = logging.getLogger(__name__)
+
+ASSET_MANIFEST = "assets.json"
+
+# Assets, die nach Abschluss einer WebODM-Aufgabe übernommen werden
+RESULT_ASSETS = ["textured_model.zip", "orthophoto.tif", "dsm.tif"]
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+_TIFF_MAGIC = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+
+
+class AssetDownloadError(Exception):
+    """Asset konnte nicht vollständig oder nicht unversehrt heruntergeladen werden"""
+    pass
+
+
+class AssetNotFoundError(AssetDownloadError):
+    """Asset existiert auf dem Server nicht (404)"""
+    pass
+
+
+def _hash_existing(path: Path) -> "hashlib._Hash":
+    """SHA-256 über bereits vorhandene Bytes einer Teildatei (für die Wiederaufnahme)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+def _server_sha256(response: httpx.Response) -> Optional[str]:
+    """SHA-256 aus Digest/Repr-Digest (RFC 3230/9530), hex-kodiert"""
+    for header in ("repr-digest", "digest"):
+        value = response.headers.get(header)
+        if not value:
+            continue
+        match = re.search(r"sha-256=:?([A-Za-z0-9+/=]+):?", value, re.IGNORECASE)
+        if match:
+            try:
+                return base64.b64decode(match.group(1)).hex()
+            except ValueError:
+                return None
+    return None
+
+
+def verify_asset_format(path: Path, name: str):
+    """Formatprüfung nach Dateityp (blockierend)"""
+    suffix = Path(name).suffix.lower()
+    if suffix == ".zip":
+        try:
+            with zipfile.ZipFile(path) as archive:
+                broken = archive.testzip()
+        except zipfile.BadZipFile as e:
+            raise AssetDownloadError(f"{name}: ungültiges ZIP-Archiv ({e})")
+        if broken is not None:
+            raise AssetDownloadError(f"{name}: CRC-Fehler in {broken}")
+    elif suffix in (".tif", ".tiff"):
+        with open(path, "rb") as f:
+            if f.read(4) not in _TIFF_MAGIC:
+                raise AssetDownloadError(f"{name}: kein gültiger TIFF-Header")
+
+
+class _AssetTransfer:
+    """Zustand eines Asset-Downloads über mehrere Versuche"""
+
+    def __init__(self, target: Path):
+        self.target = target
+        self.part = target.with_name(target.name + ".part")
+        self.total_size: Optional[int] = None
+        self.expected_sha256: Optional[str] = None
+        self._hash = None
+
+    def received(self) -> int:
+        return self.part.stat().st_size if self.part.exists() else 0
+
+    def start(self, response: httpx.Response, offset: int) -> int:
+        """Wertet die Antwort auf einen (Range-)Request aus und liefert den Schreib-Offset"""
+        if response.status_code == 206:
+            match = _CONTENT_RANGE.match(response.headers.get("content-range", ""))
+            if not match or int(match.group(1)) != offset:
+                self.part.unlink(missing_ok=True)
+                self._hash = None
+                raise AssetDownloadError("Content-Range passt nicht zur Teildatei")
+            if match.group(3) != "*":
+                self.total_size = int(match.group(3))
+            if self._hash is None:
+                self._hash = _hash_existing(self.part)
+        elif response.status_code == 200:
+            # Server ignoriert Range: von vorn beginnen
+            offset = 0
+            self._hash = hashlib.sha256()
+            if "content-length" in response.headers:
+                self.total_size = int(response.headers["content-length"])
+        else:
+            raise httpx.HTTPStatusError(
+                f"HTTP {response.status_code}", request=response.request, response=response
+            )
+
+        self.expected_sha256 = _server_sha256(response) or self.expected_sha256
+        return offset
+
+    def write(self, f, chunk: bytes):
+        f.write(chunk)
+        self._hash.update(chunk)
+
+    def sha256(self) -> str:
+        if self._hash is None:
+            self._hash = _hash_existing(self.part)
+        return self._hash.hexdigest()
+
+
+async def download_asset(client: WebODMClient, url: str, target: Path,
+                         retries: int = WEBODM_DOWNLOAD_RETRIES) -> Dict[str, Any]:
+    """
+    Lädt ein Asset gestreamt herunter und setzt abgebrochene Übertragungen per Range fort
+    Liefert Größe und SHA-256 der geprüften Datei
+    """
+    transfer = _AssetTransfer(target)
+    name = target.name
+    last_error = None
+
+    for attempt in range(retries + 1):
+        offset = transfer.received()
+        if transfer.total_size is not None and offset == transfer.total_size:
+            break
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            async with client.stream(
+                "GET", url, headers=headers,
+                timeout=httpx.Timeout(60.0, connect=10.0)
+            ) as response:
+                if response.status_code == 416 and offset:
+                    # Teildatei ist bereits vollständig (oder größer als das Asset)
+                    match = re.match(r"bytes \*/(\d+)", response.headers.get("content-range", ""))
+                    if match and int(match.group(1)) == offset:
+                        transfer.total_size = offset
+                        break
+                    transfer.part.unlink(missing_ok=True)
+                    raise AssetDownloadError("Teildatei passt nicht zum Asset")
+
+                offset = transfer.start(response, offset)
+                with open(transfer.part, "r+b" if offset else "wb") as f:
+                    f.seek(offset)
+                    f.truncate()
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        transfer.write(f, chunk)
+
+            if transfer.total_size is None or transfer.received() == transfer.total_size:
+                break
+            last_error = f"unvollständig ({transfer.received()} von {transfer.total_size} bytes)"
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise AssetNotFoundError(f"{name}: nicht vorhanden")
+            if e.response.status_code < 500:
+                raise AssetDownloadError(f"{name}: {e}")
+            last_error = str(e)
+        except (httpx.TransportError, AssetDownloadError) as e:
+            last_error = str(e) or type(e).__name__
+
+        if attempt < retries:
+            delay = min(2 ** attempt, 30)
+            logger.warning(f"Download von {name} unterbrochen ({last_error}), "
+                           f"setze bei {transfer.received()} bytes in {delay}s fort")
+            await asyncio.sleep(delay)
+    else:
+        raise AssetDownloadError(f"{name}: Download nach {retries + 1} Versuchen fehlgeschlagen ({last_error})")
+
+    # Prüfen, bevor das Asset sichtbar wird
+    size = transfer.received()
+    if transfer.total_size is not None and size != transfer.total_size:
+        raise AssetDownloadError(f"{name}: Größe {size} statt {transfer.total_size} bytes")
+
+    sha256 = transfer.sha256()
+    if transfer.expected_sha256 and sha256 != transfer.expected_sha256:
+        transfer.part.unlink(missing_ok=True)
+        raise AssetDownloadError(f"{name}: SHA-256 stimmt nicht mit dem Server überein")
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, verify_asset_format, transfer.part, name)
+    except AssetDownloadError:
+        transfer.part.unlink(missing_ok=True)
+        raise
+
+    transfer.part.replace(target)
+    logger.info(f"Asset heruntergeladen und geprüft: {name} ({size} bytes)")
+    return {"size": size, "sha256": sha256, "server_checksum": transfer.expected_sha256 is not None}
+
+
+async def download_assets(client: WebODMClient, base_url: str, assets: List[str],
+                          output_path: Path, skip_missing: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Lädt mehrere Assets parallel (WEBODM_DOWNLOAD_CONCURRENCY) und schreibt assets.json
+    Schlägt ein Asset fehl, wird der Fehler nach Abschluss der übrigen Downloads geworfen;
+    deren Teildateien bleiben für die Wiederaufnahme liegen. Mit skip_missing werden
+    Assets, die der Server nicht kennt (404), ausgelassen (Server ohne Asset-Liste)
+    """
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    slots = asyncio.Semaphore(WEBODM_DOWNLOAD_CONCURRENCY)
+
+    async def fetch(asset: str) -> Dict[str, Any]:
+        async with slots:
+            return await download_asset(client, f"{base_url}/download/{asset}", output_path / asset)
+
+    results = await asyncio.gather(*(fetch(asset) for asset in assets), return_exceptions=True)
+    manifest = {}
+    for asset, result in zip(assets, results):
+        if skip_missing and isinstance(result, AssetNotFoundError):
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        manifest[asset] = result
+
+    with open(output_path / ASSET_MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+async def download_task_results(client: WebODMClient, webodm_project_id, task_id,
+                                available_assets: List[str], output_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Lädt die verfügbaren RESULT_ASSETS einer WebODM-Aufgabe herunter"""
+    assets = [asset for asset in RESULT_ASSETS if asset in available_assets]
+    return await download_assets(
+        client, f"/api/projects/{webodm_project_id}/tasks/{task_id}", assets, output_path
+    )
@@ -0,0 +1,353 @@
+"""
+ClamAV-Client für ChiliView
+Langlebige, gepoolte clamd-Verbindungen mit INSTREAM-Scans
+Funktioniert über Unix-Socket oder TCP (clamav-Container ohne gemeinsames Dateisystem)
+"""
+
+import logging
+import os
+import queue
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# clamd beendet inaktive Sessions nach IdleTimeout (Standard 30s)
+DEFAULT_IDLE_TIMEOUT = 20.0
+# Engine-/Signaturversion wird nur periodisch neu abgefragt
+DEFAULT_VERSION_TTL = 300.0
+
+
+def parse_signature_version(engine_version: Optional[str]) -> Optional[str]:
+    """
+    Liest die Signatur-DB-Version aus einer clamd-VERSION-Antwort
+    "ClamAV 1.2.1/27123/Mon Nov 11 08:00:00 2024" -> "27123"
+    """
+    if not engine_version:
+        return None
+    parts = engine_version.split("/")
+    if len(parts) < 2 or not parts[1].strip().isdigit():
+        return None
+    return parts[1].strip()
+
+
+class ClamdError(Exception):
+    """Fehler in der Kommunikation mit clamd"""
+    pass
+
+
+class ClamdConnection:
+    """
+    Eine clamd-Verbindung im IDSESSION-Modus
+    Mehrere Befehle (PING, VERSION, INSTREAM) laufen über denselben Socket
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.last_used = time.monotonic()
+        self._request_id = 0
+        self._buffer = b""
+        self.sock.sendall(b"zIDSESSION\0")
+
+    def _next_id(self) -> int:
+        self._request_id += 1
+        return self._request_id
+
+    def _read_reply(self, request_id: int) -> str:
+        """Liest eine nullterminierte Antwort der Form '<id>: <antwort>'"""
+        while b"\0" not in self._buffer:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ClamdError("clamd hat die Verbindung geschlossen")
+            self._buffer += data
+
+        raw, self._buffer = self._buffer.split(b"\0", 1)
+        reply = raw.decode("utf-8", "replace").strip()
+
+        prefix, _, answer = reply.partition(": ")
+        if prefix != str(request_id):
+            raise ClamdError(f"Unerwartete clamd-Antwort: {reply}")
+
+        self.last_used = time.monotonic()
+        return answer.strip()
+
+    def is_alive(self) -> bool:
+        """Prüft ohne Blockieren, ob clamd die Verbindung inzwischen geschlossen hat"""
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if readable:
+                # Im Leerlauf sendet clamd nichts; lesbar heißt EOF oder Fehler
+                return False
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def command(self, name: str) -> str:
+        """Sendet einen einfachen Befehl (PING, VERSION) und liefert die Antwort"""
+        request_id = self._next_id()
+        self.sock.sendall(f"z{name}\0".encode())
+        return self._read_reply(request_id)
+
+    def begin_instream(self) -> int:
+        request_id = self._next_id()
+        self.sock.sendall(b"zINSTREAM\0")
+        return request_id
+
+    def send_chunk(self, data: bytes):
+        self.sock.sendall(struct.pack("!L", len(data)) + data)
+
+    def end_instream(self, request_id: int) -> str:
+        self.sock.sendall(struct.pack("!L", 0))
+        return self._read_reply(request_id)
+
+    def close(self):
+        try:
+            self.sock.sendall(b"zEND\0")
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ClamdStreamSession:
+    """
+    INSTREAM-Scan einer Datei, deren Bytes blockweise an clamd übergeben werden
+    Fehler werden fail-open behandelt (Datei gilt als sauber, Version "error"/"unavailable")
+    """
+
+    def __init__(self, client: "ClamdClient"):
+        self.client = client
+        self.connection: Optional[ClamdConnection] = None
+        self.error: Optional[str] = None
+        self._request_id = 0
+
+        try:
+            self.connection = client.acquire()
+            self._request_id = self.connection.begin_instream()
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error: Exception):
+        logger.error(f"Fehler beim Virenscan: {error}")
+        self.error = "unavailable" if isinstance(error, OSError) else "error"
+        if self.connection is not None:
+            self.client.discard(self.connection)
+            self.connection = None
+
+    def feed(self, data: bytes):
+        """Sendet einen Datenblock als INSTREAM-Chunk"""
+        if self.connection is None or not data:
+            return
+        try:
+            self.connection.send_chunk(data)
+        except Exception as e:
+            self._fail(e)
+
+    def finish(self) -> Dict[str, Any]:
+        """Beendet den Stream und wertet die clamd-Antwort aus"""
+        if self.connection is not None:
+            try:
+                reply = self.connection.end_instream(self._request_id)
+            except Exception as e:
+                self._fail(e)
+            else:
+                self.client.release(self.connection)
+                self.connection = None
+                return self.client.parse_scan_reply(reply)
+
+        return {
+            "is_clean": True,  # Bei Fehler durchlassen
+            "threat_name": None,
+            "scan_engine_version": self.error or "error"
+        }
+
+    def close(self):
+        """Bricht einen offenen Stream ab (Verbindung ist danach unbrauchbar)"""
+        if self.connection is not None:
+            self.client.discard(self.connection)
+            self.connection = None
+
+
+class ClamdClient:
+    """
+    Prozessweiter clamd-Client mit Verbindungspool und gecachter Engine-Version
+    Thread-sicher, wird aus dem Ingest-Thread-Pool verwendet
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, host: Optional[str] = None,
+                 port: int = 3310, pool_size: int = 8, timeout: float = 60.0,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 version_ttl: float = DEFAULT_VERSION_TTL):
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.version_ttl = version_ttl
+
+        self._idle: "queue.LifoQueue[ClamdConnection]" = queue.LifoQueue()
+        self._version: Optional[str] = None
+        self._version_fetched_at = 0.0
+        self._version_lock = threading.Lock()
+
+        # Statistik für Monitoring/Benchmarks
+        self.connections_opened = 0
+
+    @classmethod
+    def from_env(cls) -> "ClamdClient":
+        """Erstellt den Client aus CLAMD_HOST/CLAMD_PORT oder CLAMD_SOCKET"""
+        pool_size = os.getenv("CLAMD_POOL_SIZE")
+        return cls(
+            socket_path=os.getenv("CLAMD_SOCKET", "/var/run/clamav/clamd.ctl"),
+            host=os.getenv("CLAMD_HOST") or None,
+            port=int(os.getenv("CLAMD_PORT", "3310")),
+            pool_size=int(pool_size) if pool_size and pool_size.isdigit() else 8,
+            timeout=float(os.getenv("CLAMD_TIMEOUT", "60"))
+        )
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}" if self.host else str(self.socket_path)
+
+    def _connect(self) -> ClamdConnection:
+        if self.host:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            # Abschluss-Chunk und Befehle nicht durch Nagle verzögern
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        self.connections_opened += 1
+        return ClamdConnection(sock)
+
+    def acquire(self) -> ClamdConnection:
+        """Liefert eine freie Verbindung aus dem Pool oder öffnet eine neue"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            # Von clamd wegen Inaktivität geschlossene Sessions verwerfen
+            if (time.monotonic() - connection.last_used < self.idle_timeout
+                    and connection.is_alive()):
+                return connection
+            connection.close()
+
+    def release(self, connection: ClamdConnection):
+        """Gibt eine gesunde Verbindung in den Pool zurück"""
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(connection)
+        else:
+            connection.close()
+
+    def discard(self, connection: ClamdConnection):
+        connection.close()
+
+    def close(self):
+        """Schließt alle Verbindungen im Pool"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _command(self, name: str) -> str:
+        """Führt einen Befehl aus, bei einer abgelaufenen Session mit einem Wiederholungsversuch"""
+        for attempt in range(2):
+            connection = self.acquire()
+            try:
+                reply = connection.command(name)
+            except (OSError, ClamdError):
+                self.discard(connection)
+                if attempt:
+                    raise
+                continue
+            self.release(connection)
+            return reply
+
+    def ping(self) -> bool:
+        try:
+            return self._command("PING") == "PONG"
+        except Exception as e:
+            logger.warning(f"ClamAV-Daemon nicht erreichbar ({self.address}): {e}")
+            return False
+
+    def version(self, refresh: bool = False) -> str:
+        """
+        Engine- und Signaturversion, z.B. "ClamAV 1.2.1/27123/Mon Nov 11 08:00:00 2024"
+        Wird für version_ttl Sekunden gecacht
+        """
+        with self._version_lock:
+            now = time.monotonic()
+            if (refresh or self._version is None
+                    or now - self._version_fetched_at >= self.version_ttl):
+                try:
+                    self._version = self._command("VERSION")
+                    self._version_fetched_at = now
+                except Exception as e:
+                    logger.warning(f"ClamAV-Version nicht abrufbar: {e}")
+                    if self._version is None:
+                        return "unknown"
+            return self._version
+
+    def parse_scan_reply(self, reply: str) -> Dict[str, Any]:
+        """Wertet 'stream: OK' bzw. 'stream: <Signatur> FOUND' aus"""
+        if reply.endswith("ERROR"):
+            logger.error(f"Fehler beim Virenscan: {reply}")
+            return {
+                "is_clean": True,  # Bei Fehler durchlassen (fail-open)
+                "threat_name": None,
+                "scan_engine_version": "error"
+            }
+
+        if reply.endswith("FOUND"):
+            threat_name = reply.split(":", 1)[-1].rsplit(" ", 1)[0].strip()
+            return {
+                "is_clean": False,
+                "threat_name": threat_name or "Unknown",
+                "scan_engine_version": self.version()
+            }
+
+        return {
+            "is_clean": True,
+            "threat_name": None,
+            "scan_engine_version": self.version()
+        }
+
+    def open_stream(self) -> ClamdStreamSession:
+        """Startet einen INSTREAM-Scan über eine gepoolte Verbindung"""
+        return ClamdStreamSession(self)
+
+    def scan_path(self, file_path: str, chunk_size: int = 1024 * 1024) -> Dict[str, Any]:
+        """Scannt eine lokale Datei per INSTREAM (clamd braucht keinen Zugriff auf den Pfad)"""
+        session = self.open_stream()
+        try:
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    session.feed(chunk)
+            return session.finish()
+        except Exception:
+            session.close()
+            raise
+
+
+_clamd_client: Optional[ClamdClient] = None
+_clamd_client_lock = threading.Lock()
+
+
+def get_clamd_client() -> ClamdClient:
+    """Prozessweite ClamdClient-Instanz"""
+    global _clamd_client
+    with _clamd_client_lock:
+        if _clamd_client is None:
+            _clamd_client = ClamdClient.from_env()
+        return _clamd_client
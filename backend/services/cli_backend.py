@@ -0,0 +1,98 @@
+"""
+WebODM-CLI-Backend für ChiliView
+Lokale Verarbeitung mit webodm.sh über die Processing Queue
+
+Der Auftrag wird als ProcessingTask eingereiht; Task-Referenz ist die Queue-Task-ID.
+Die Ergebnisse liegen bereits lokal im Instanz-Ausgabeverzeichnis und werden per
+Reflink/Hardlink ins Projektverzeichnis übernommen (services/staging.py).
+"""
+
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.asset_download import ASSET_MANIFEST, AssetDownloadError
+from services.processing_backend import BackendTaskStatus, ProcessingBackend, ProcessingJob, list_image_files
+from services.processing_queue import QueueStatus, processing_queue
+from services.staging import image_stager
+from services.webodm_cli_service import webodm_cli_service
+
+logger = logging.getLogger(__name__)
+
+_QUEUE_STATUS = {
+    QueueStatus.QUEUED: "queued",
+    QueueStatus.RUNNING: "running",
+    QueueStatus.COMPLETED: "completed",
+    QueueStatus.FAILED: "failed",
+    QueueStatus.CANCELLED: "canceled"
+}
+
+
+class CLIBackend(ProcessingBackend):
+    """WebODM-CLI-Instanzen der Processing Queue als Verarbeitungs-Backend"""
+
+    name = "cli"
+
+    async def submit(self, job: ProcessingJob, on_progress=None, on_node_selected=None) -> str:
+        image_files = list_image_files(job.images_path)
+        project_path = await webodm_cli_service.create_project(f"project_{job.project_id}", job.reseller_id)
+        task_id = await processing_queue.add_task(
+            job.project_id, job.reseller_id, job.user_id, project_path, job.images_path
+        )
+        # Keine Übertragung: Bilder werden erst beim Start der Instanz bereitgestellt
+        if on_progress is not None:
+            on_progress(len(image_files), len(image_files))
+        return task_id
+
+    async def fetch_statuses(self, task_refs: List[str]) -> Dict[str, Optional[BackendTaskStatus]]:
+        statuses: Dict[str, Optional[BackendTaskStatus]] = {}
+        for task_ref in task_refs:
+            task = processing_queue.get_task(task_ref)
+            if task is None:
+                statuses[task_ref] = None
+                continue
+            statuses[task_ref] = BackendTaskStatus(
+                status=_QUEUE_STATUS[task.status],
+                progress=min(max(task.progress, 0), 100) / 100.0,
+                error=task.error_message
+            )
+        return statuses
+
+    async def download_results(self, task_ref: str, output_path: Path,
+                               task_status: BackendTaskStatus) -> Dict[str, Dict[str, Any]]:
+        task = processing_queue.get_task(task_ref)
+        if task is None:
+            raise AssetDownloadError(f"Queue-Task {task_ref} nicht mehr vorhanden")
+
+        source = Path(task.project_path) / f"output_{task.instance_id}"
+        if not source.is_dir():
+            raise AssetDownloadError(f"Ausgabeverzeichnis {source} fehlt")
+
+        loop = asyncio.get_running_loop()
+        staging = await loop.run_in_executor(None, image_stager.stage_directory, source, Path(output_path))
+
+        manifest = {
+            entry.name: {"size": entry.stat().st_size}
+            for entry in sorted(Path(output_path).iterdir())
+            if entry.is_file() and entry.name != ASSET_MANIFEST
+        }
+        with open(Path(output_path) / ASSET_MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f"WebODM-CLI Ergebnisse übernommen ({task_ref}, {staging.files} Dateien, "
+                    f"{staging.bytes_saved} bytes ohne Kopie)")
+        return manifest
+
+    async def cancel(self, task_ref: str):
+        task = processing_queue.get_task(task_ref)
+        if task is not None and not await processing_queue.cancel_task(task_ref, task.user_id):
+            logger.warning(f"Queue-Task {task_ref} kann nicht abgebrochen werden (Instanz nicht aktiv)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "queue_size": len(processing_queue.queue),
+            "running_jobs": len(processing_queue.running_tasks)
+        }
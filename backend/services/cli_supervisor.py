@@ -0,0 +1,232 @@
+"""
+Supervisor für WebODM-CLI-Instanzen
+Entkoppelt laufende Verarbeitungen vom Backend-Prozess
+
+Jede Instanz läuft unter einem kleinen Supervisor-Prozess in eigener Session
+(start_new_session), der den CLI-Prozess startet, dessen Ausgabe direkt in die
+Log-Datei schreibt und PID sowie Exit-Status in einer Status-Datei
+(supervisor_<instanz>.json im Projekt-Verzeichnis) festhält. Ein Neustart von
+uvicorn beendet die Verarbeitung daher nicht mehr: das Backend liest die Ausgabe
+aus der Log-Datei (follow_log) und kann sich nach dem Neustart anhand der
+Status-Datei wieder an laufende oder inzwischen beendete Instanzen hängen.
+
+Das Modul wird auch direkt als Supervisor ausgeführt und nutzt dafür nur die
+Standardbibliothek:
+    python services/cli_supervisor.py --state S --log L --cwd D [--cpus 0,1] [--cgroup C] -- cmd ...
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SUPERVISOR_SCRIPT = Path(__file__).resolve()
+
+# Abfrageintervall für neue Log-Zeilen und Wartezeit auf den Start des Supervisors
+_env_poll_interval = os.getenv("SUPERVISOR_POLL_INTERVAL_MS")
+SUPERVISOR_POLL_INTERVAL = (
+    int(_env_poll_interval) if _env_poll_interval and _env_poll_interval.isdigit() else 250
+) / 1000.0
+SUPERVISOR_START_TIMEOUT = 30.0
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def state_path(project_path, instance_id: Optional[str]) -> Path:
+    """Status-Datei des Supervisors einer Instanz"""
+    instance_suffix = f"_{instance_id}" if instance_id else ""
+    return Path(project_path) / f"supervisor{instance_suffix}.json"
+
+
+def read_state(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(path: Path, state: Dict[str, Any]):
+    tmp_file = path.with_name(path.name + ".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_file, path)
+
+
+def _pid_alive(pid: Optional[int], marker: Optional[str] = None) -> bool:
+    """
+    Läuft der Prozess noch? Zombies zählen nicht als laufend; marker muss in der
+    Kommandozeile vorkommen, damit eine wiederverwendete PID nicht verwechselt wird
+    """
+    if not pid:
+        return False
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().decode(errors="replace")
+    except FileNotFoundError:
+        return False
+    except OSError:
+        # Ohne /proc nur prüfen, ob die PID existiert
+        try:
+            os.kill(pid, 0)
+            return True
+        except (ProcessLookupError, PermissionError):
+            return False
+    if not cmdline:
+        return False
+    return marker is None or marker in cmdline
+
+
+def is_active(state: Optional[Dict[str, Any]]) -> bool:
+    """Läuft der Supervisor oder (nach dessen Absturz) noch der CLI-Prozess?"""
+    if not state or state.get("status") == "exited":
+        return False
+    if _pid_alive(state.get("pid"), SUPERVISOR_SCRIPT.name):
+        return True
+    cmd = state.get("cmd") or []
+    return _pid_alive(state.get("child_pid"), Path(cmd[0]).name if cmd else None)
+
+
+def terminate(state: Optional[Dict[str, Any]]):
+    """Beendet eine laufende Instanz (der Supervisor gibt SIGTERM an den CLI-Prozess weiter)"""
+    if is_active(state):
+        try:
+            os.kill(state["pid"], signal.SIGTERM)
+        except (ProcessLookupError, PermissionError, KeyError):
+            pass
+
+
+async def launch(cmd: List[str], state_file: Path, log_file: Path, cwd: Path,
+                 env: Optional[Dict[str, str]] = None, cpus: Optional[List[int]] = None,
+                 cgroup: Optional[str] = None, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Startet cmd unter einem eigenen Supervisor und wartet, bis dieser den CLI-Prozess
+    gestartet hat; liefert den Inhalt der Status-Datei
+    """
+    state_file.unlink(missing_ok=True)
+    args = [sys.executable, str(SUPERVISOR_SCRIPT),
+            "--state", str(state_file), "--log", str(log_file), "--cwd", str(cwd)]
+    if cpus:
+        args += ["--cpus", ",".join(str(cpu) for cpu in cpus)]
+    if cgroup:
+        args += ["--cgroup", cgroup]
+    if info:
+        args += ["--info", json.dumps(info)]
+
+    process = await asyncio.create_subprocess_exec(
+        *args, "--", *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+        env=env,
+        start_new_session=True  # Überlebt Neustart und Signale des Backends
+    )
+
+    # Beendet sich der Supervisor, reaped asyncio ihn; die Status-Datei bleibt maßgeblich
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SUPERVISOR_START_TIMEOUT
+    while loop.time() < deadline:
+        state = read_state(state_file)
+        if state is not None:
+            return state
+        if process.returncode is not None:
+            raise Exception(f"Supervisor beendet mit Code {process.returncode}, bevor die Instanz startete")
+        await asyncio.sleep(SUPERVISOR_POLL_INTERVAL / 5)
+    raise Exception(f"Supervisor hat die Instanz nicht innerhalb von {SUPERVISOR_START_TIMEOUT:.0f}s gestartet")
+
+
+async def follow_log(log_file: Path, state_file: Path) -> AsyncIterator[str]:
+    """
+    Liefert die Zeilen der Log-Datei ab Anfang, bis der Supervisor beendet ist
+    (auch nach einem Backend-Neustart für bereits laufende Instanzen)
+    """
+    loop = asyncio.get_running_loop()
+    partial = b""
+    with open(log_file, "rb") as f:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, READ_CHUNK_SIZE)
+            if chunk:
+                *lines, partial = (partial + chunk).split(b"\n")
+                for line in lines:
+                    yield line.decode(errors="replace").strip()
+                continue
+
+            if not is_active(read_state(state_file)):
+                # Nach dem Ende noch geschriebenen Rest lesen
+                rest = partial + await loop.run_in_executor(None, f.read)
+                for line in rest.split(b"\n"):
+                    if line:
+                        yield line.decode(errors="replace").strip()
+                return
+            await asyncio.sleep(SUPERVISOR_POLL_INTERVAL)
+
+
+def _bind_resources(cpus: Optional[str], cgroup: Optional[str], log_file):
+    """Bindet den Supervisor (und damit den CLI-Prozess) an die Kerne und cgroup des Slots"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, [int(cpu) for cpu in cpus.split(",")])
+        except (OSError, ValueError) as e:
+            log_file.write(f"[WARNING] CPU-Affinität nicht setzbar: {e}\n".encode())
+    if cgroup:
+        try:
+            (Path(cgroup) / "cgroup.procs").write_text(str(os.getpid()))
+        except OSError as e:
+            log_file.write(f"[WARNING] Nicht in cgroup {cgroup} verschiebbar: {e}\n".encode())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ChiliView Supervisor für WebODM-CLI-Instanzen")
+    parser.add_argument("--state", required=True, help="Status-Datei (PID, Exit-Status)")
+    parser.add_argument("--log", required=True, help="Log-Datei für die Ausgabe")
+    parser.add_argument("--cwd", required=True)
+    parser.add_argument("--cpus", help="Kerne, kommagetrennt")
+    parser.add_argument("--cgroup")
+    parser.add_argument("--info", default="{}", help="Zusatzangaben des Backends (JSON)")
+    parser.add_argument("cmd", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+    state_file = Path(args.state)
+    state = {
+        "pid": os.getpid(),
+        "cmd": cmd,
+        "log_file": args.log,
+        "info": json.loads(args.info),
+        "started_at": datetime.now().isoformat(),
+        "status": "running"
+    }
+
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    with open(args.log, "ab", buffering=0) as log_file:
+        _bind_resources(args.cpus, args.cgroup, log_file)
+        try:
+            child = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log_file,
+                                     stderr=subprocess.STDOUT, cwd=args.cwd)
+        except OSError as e:
+            log_file.write(f"[ERROR] Start fehlgeschlagen: {e}\n".encode())
+            _write_state(state_file, {**state, "status": "exited", "return_code": 127,
+                                      "finished_at": datetime.now().isoformat()})
+            return 127
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: child.terminate())
+        _write_state(state_file, {**state, "child_pid": child.pid})
+        return_code = child.wait()
+
+    _write_state(state_file, {**state, "child_pid": child.pid, "status": "exited",
+                              "return_code": return_code, "finished_at": datetime.now().isoformat()})
+    return return_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Bild-Metadaten für ChiliView
+EXIF-Extraktion (GPS, Höhe, Kamera, Auflösung, Aufnahmezeit) während des Uploads
+
+Die Ingest-Stufe führt die ersten HEAD_CAPTURE_SIZE Bytes jeder Datei mit; daraus wird
+EXIF in einem Prozess-Pool gelesen (Pillow-Parsing ist CPU-gebunden und hält die GIL).
+Nur wenn der Dateianfang nicht reicht (z.B. TIFF mit IFDs am Dateiende), wird die Datei
+selbst geöffnet. Die Ergebnisse landen in der Tabelle image_metadata der Reseller-Datenbank.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+
+from database.models import ImageMetadata
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# EXIF-Tags (TIFF/EXIF 2.3)
+_TAG_MAKE = 0x010F
+_TAG_MODEL = 0x0110
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_GPS_IFD = 0x8825
+_TAG_DATETIME_ORIGINAL = 0x9003
+
+_GPS_LATITUDE_REF = 1
+_GPS_LATITUDE = 2
+_GPS_LONGITUDE_REF = 3
+_GPS_LONGITUDE = 4
+_GPS_ALTITUDE_REF = 5
+_GPS_ALTITUDE = 6
+
+
+def _configured_metadata_workers() -> int:
+    """Anzahl Prozesse für die EXIF-Extraktion (UPLOAD_METADATA_WORKERS, 0 = deaktiviert)"""
+    env_workers = os.getenv("UPLOAD_METADATA_WORKERS")
+    if env_workers and env_workers.isdigit():
+        return int(env_workers)
+    return max(1, min(os.cpu_count() or 2, 4))
+
+
+METADATA_WORKERS = _configured_metadata_workers()
+
+_metadata_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_metadata_executor() -> ProcessPoolExecutor:
+    """
+    Prozess-Pool für die EXIF-Extraktion
+    spawn statt fork, damit keine Locks oder Datenbankverbindungen des Servers geerbt werden
+    """
+    global _metadata_executor
+    if _metadata_executor is None:
+        _metadata_executor = ProcessPoolExecutor(
+            max_workers=METADATA_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _metadata_executor
+
+
+def shutdown_metadata_executor():
+    global _metadata_executor
+    if _metadata_executor is not None:
+        _metadata_executor.shutdown(wait=False, cancel_futures=True)
+        _metadata_executor = None
+
+
+def _rational(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def _gps_coordinate(values, ref) -> Optional[float]:
+    """Grad/Minuten/Sekunden nach Dezimalgrad, Süd und West negativ"""
+    if not values or len(values) != 3:
+        return None
+    parts = [_rational(v) for v in values]
+    if any(p is None for p in parts):
+        return None
+
+    coordinate = parts[0] + parts[1] / 60.0 + parts[2] / 3600.0
+    if isinstance(ref, bytes):
+        ref = ref.decode("ascii", "ignore")
+    if ref and ref.strip().upper() in ("S", "W"):
+        coordinate = -coordinate
+    return round(coordinate, 8)
+
+
+def _exif_text(value, max_length: int) -> Optional[str]:
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "ignore")
+    if not isinstance(value, str):
+        return None
+    value = value.strip("\x00 ").strip()
+    return value[:max_length] or None
+
+
+def _exif_datetime(value) -> Optional[str]:
+    text = _exif_text(value, 32)
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text[:19], "%Y:%m:%d %H:%M:%S").isoformat()
+    except ValueError:
+        return None
+
+
+def _read_metadata(image) -> Dict[str, Any]:
+    exif = image.getexif()
+    exif_ifd = exif.get_ifd(_TAG_EXIF_IFD)
+    gps = exif.get_ifd(_TAG_GPS_IFD)
+
+    altitude = _rational(gps.get(_GPS_ALTITUDE))
+    if altitude is not None and gps.get(_GPS_ALTITUDE_REF) in (1, b"\x01"):
+        altitude = -altitude
+
+    return {
+        "latitude": _gps_coordinate(gps.get(_GPS_LATITUDE), gps.get(_GPS_LATITUDE_REF)),
+        "longitude": _gps_coordinate(gps.get(_GPS_LONGITUDE), gps.get(_GPS_LONGITUDE_REF)),
+        "altitude_m": round(altitude, 3) if altitude is not None else None,
+        "camera_make": _exif_text(exif.get(_TAG_MAKE), 64),
+        "camera_model": _exif_text(exif.get(_TAG_MODEL), 128),
+        "width": image.size[0],
+        "height": image.size[1],
+        "captured_at": _exif_datetime(
+            exif_ifd.get(_TAG_DATETIME_ORIGINAL) or exif.get(_TAG_DATETIME)
+        )
+    }
+
+
+def extract_image_metadata(head: Optional[bytes], file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Liest EXIF aus dem Dateianfang, bei Bedarf aus der Datei selbst
+    Läuft im Prozess-Pool und liefert nur picklebare Werte
+    """
+    if not PIL_AVAILABLE:
+        return None
+
+    if head:
+        try:
+            with Image.open(BytesIO(head)) as image:
+                return _read_metadata(image)
+        except Exception:
+            pass
+
+    try:
+        with Image.open(file_path) as image:
+            return _read_metadata(image)
+    except Exception:
+        return None
+
+
+async def read_image_metadata(head: Optional[bytes], file_path) -> Optional[Dict[str, Any]]:
+    """
+    Extrahiert die Metadaten im Prozess-Pool
+    Fehler werden nur protokolliert, Metadaten sind für den Upload nie verpflichtend
+    """
+    if METADATA_WORKERS == 0 or not PIL_AVAILABLE:
+        return None
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            get_metadata_executor(), extract_image_metadata, head, str(file_path)
+        )
+    except Exception as e:
+        logger.warning(f"EXIF-Extraktion fehlgeschlagen für {file_path}: {e}")
+        return None
+
+
+def build_image_metadata(project_id: int, file_name: str,
+                         metadata: Dict[str, Any]) -> ImageMetadata:
+    captured_at = metadata.get("captured_at")
+    return ImageMetadata(
+        project_id=project_id,
+        file_name=file_name,
+        latitude=metadata.get("latitude"),
+        longitude=metadata.get("longitude"),
+        altitude_m=metadata.get("altitude_m"),
+        camera_make=metadata.get("camera_make"),
+        camera_model=metadata.get("camera_model"),
+        width=metadata.get("width"),
+        height=metadata.get("height"),
+        captured_at=datetime.fromisoformat(captured_at) if captured_at else None
+    )
+
+
+def summarize_project_metadata(reseller_db, project_id: int) -> Dict[str, Any]:
+    """
+    Kennzahlen eines Projekts aus dem Metadaten-Index (ohne die Bilder zu öffnen)
+    Bildanzahl, Megapixel, Ausdehnung der GPS-Positionen, Aufnahmezeitraum, Kameras
+    """
+    row = reseller_db.query(
+        func.count(ImageMetadata.id),
+        func.count(ImageMetadata.latitude),
+        func.sum(ImageMetadata.width * ImageMetadata.height),
+        func.min(ImageMetadata.latitude),
+        func.max(ImageMetadata.latitude),
+        func.min(ImageMetadata.longitude),
+        func.max(ImageMetadata.longitude),
+        func.min(ImageMetadata.altitude_m),
+        func.max(ImageMetadata.altitude_m),
+        func.min(ImageMetadata.captured_at),
+        func.max(ImageMetadata.captured_at)
+    ).filter(ImageMetadata.project_id == project_id).one()
+
+    cameras = reseller_db.query(
+        ImageMetadata.camera_make, ImageMetadata.camera_model, func.count(ImageMetadata.id)
+    ).filter(
+        ImageMetadata.project_id == project_id
+    ).group_by(ImageMetadata.camera_make, ImageMetadata.camera_model).all()
+
+    image_count, geotagged, pixels = row[0], row[1], row[2] or 0
+    return {
+        "image_count": image_count,
+        "geotagged_count": geotagged,
+        "total_megapixels": round(pixels / 1_000_000, 1),
+        "bounds": {
+            "min_latitude": row[3],
+            "max_latitude": row[4],
+            "min_longitude": row[5],
+            "max_longitude": row[6]
+        } if geotagged else None,
+        "altitude_range_m": [row[7], row[8]] if row[7] is not None else None,
+        "captured_from": row[9].isoformat() if row[9] else None,
+        "captured_until": row[10].isoformat() if row[10] else None,
+        "cameras": [
+            {"make": make, "model": model, "images": count}
+            for make, model, count in cameras
+        ]
+    }
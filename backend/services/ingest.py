@@ -0,0 +1,518 @@
+"""
+Upload-Ingest Service für ChiliView
+Streaming-Verarbeitung von Multipart-Uploads direkt ins Projekt-Upload-Verzeichnis
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# Windows-kompatible magic-Implementierung
+try:
+    import magic
+    MAGIC_AVAILABLE = True
+except ImportError:
+    MAGIC_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Schreibblockgröße für Streaming-Uploads (feste Blöcke statt beliebiger Netzwerk-Chunks)
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Anzahl Bytes vom Dateianfang für die MIME-Erkennung
+SNIFF_SIZE = 8192
+
+# Anzahl Bytes vom Dateianfang, die für die EXIF-Auswertung mitgeführt werden
+# (APP1/EXIF liegt bei JPEGs am Dateianfang, siehe services/image_metadata.py)
+HEAD_CAPTURE_SIZE = 256 * 1024
+
+
+def _env_int(name: str, default: int) -> int:
+    env_value = os.getenv(name)
+    if env_value and env_value.isdigit():
+        return int(env_value)
+    return default
+
+
+# Grenzen für Formularfelder ohne Datei im Streaming-Parser (vgl. max_part_size/max_fields
+# bei Starlette); Felder werden im Speicher gesammelt und zählen nicht zum Upload-Budget
+MULTIPART_MAX_FIELD_SIZE = _env_int("MULTIPART_MAX_FIELD_SIZE", 1024 * 1024)
+MULTIPART_MAX_FIELDS_SIZE = _env_int("MULTIPART_MAX_FIELDS_SIZE", 4 * 1024 * 1024)
+MULTIPART_MAX_FIELDS = _env_int("MULTIPART_MAX_FIELDS", 2048)  # je Datei optional ein sha256-Feld
+MULTIPART_MAX_HEADER_SIZE = 16 * 1024
+
+
+def _configured_ingest_workers() -> int:
+    """Anzahl paralleler Ingest-Worker (UPLOAD_INGEST_WORKERS oder CPU-basiert)"""
+    env_workers = os.getenv("UPLOAD_INGEST_WORKERS")
+    if env_workers and env_workers.isdigit():
+        return max(1, int(env_workers))
+    return max(1, min(os.cpu_count() or 4, 8))
+
+
+# Begrenzt gleichzeitig validierte Dateien pro Upload und die Größe des Thread-Pools
+INGEST_WORKERS = _configured_ingest_workers()
+
+_ingest_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_ingest_executor() -> ThreadPoolExecutor:
+    """Thread-Pool für synchrone Ingest-Arbeit (Dateisystem, Hashing, libmagic, clamd)"""
+    global _ingest_executor
+    if _ingest_executor is None:
+        _ingest_executor = ThreadPoolExecutor(
+            max_workers=INGEST_WORKERS, thread_name_prefix="ingest"
+        )
+    return _ingest_executor
+
+
+async def run_in_ingest_pool(func, *args):
+    """Führt eine blockierende Funktion im Ingest-Thread-Pool aus"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_ingest_executor(), func, *args)
+
+
+class UploadLimitExceeded(Exception):
+    """Upload-Budget (max_upload_size_mb) wurde überschritten"""
+    pass
+
+
+class IngestRejected(Exception):
+    """Datei wurde bei der Validierung abgelehnt (kein Bild oder Virus gefunden)"""
+    pass
+
+
+class IngestCancelled(Exception):
+    """Ingest wurde abgebrochen, weil eine andere Datei desselben Uploads fehlgeschlagen ist"""
+    pass
+
+
+class MultipartStreamError(Exception):
+    """Multipart-Body ist ungültig oder unvollständig"""
+    pass
+
+
+class UploadBudget:
+    """
+    Verfolgt die bisher empfangenen Bytes gegen das Upload-Limit des Users
+    Thread-sicher, da parallele Ingest-Worker dasselbe Budget belasten
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._lock = threading.Lock()
+
+    def consume(self, size: int):
+        """Bucht Bytes auf das Budget, wirft UploadLimitExceeded sobald das Limit überschritten ist"""
+        with self._lock:
+            self.used_bytes += size
+            used_bytes = self.used_bytes
+        if used_bytes > self.max_bytes:
+            raise UploadLimitExceeded(
+                f"Upload zu groß (über {self.max_bytes} bytes)"
+            )
+
+
+class ChunkedFileWriter:
+    """
+    Schreibt eine Datei in festen Blöcken auf die Platte
+    Eingehende Daten werden gesammelt und erst bei STREAM_CHUNK_SIZE geschrieben
+    """
+
+    def __init__(self, file_path: Path, budget: Optional[UploadBudget] = None,
+                 chunk_size: int = STREAM_CHUNK_SIZE):
+        self.file_path = Path(file_path)
+        self.budget = budget
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._buffer = bytearray()
+        self._file = open(self.file_path, "wb")
+
+    def write(self, data: bytes):
+        """Nimmt Daten entgegen und schreibt volle Blöcke sofort"""
+        if self.budget is not None:
+            self.budget.consume(len(data))
+        self.size += len(data)
+        self._buffer += data
+
+        while len(self._buffer) >= self.chunk_size:
+            self._file.write(self._buffer[:self.chunk_size])
+            del self._buffer[:self.chunk_size]
+
+    def close(self):
+        """Schreibt den Rest-Puffer und schließt die Datei"""
+        if self._file.closed:
+            return
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+        self._file.close()
+
+    def abort(self):
+        """Schließt und entfernt eine unvollständige Datei"""
+        self._buffer.clear()
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+
+
+class StoredFileReader:
+    """
+    Writer-Ersatz für Dateien, die bereits vollständig auf der Platte liegen
+    (z.B. zusammengesetzte Chunked-Uploads); zählt nur die Bytes, schreibt nichts
+    """
+
+    def __init__(self, file_path: Path, budget: Optional[UploadBudget] = None):
+        self.file_path = Path(file_path)
+        self.budget = budget
+        self.size = 0
+
+    def write(self, data: bytes):
+        if self.budget is not None:
+            self.budget.consume(len(data))
+        self.size += len(data)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        """Die Datei gehört dem Aufrufer und bleibt liegen"""
+        pass
+
+
+def sniff_mime_type(head: bytes) -> Optional[str]:
+    """
+    Ermittelt den MIME-Typ aus den ersten Bytes einer Datei
+    Gibt None zurück, wenn libmagic nicht verfügbar ist (Windows-Fallback)
+    """
+    if not MAGIC_AVAILABLE:
+        return None
+
+    try:
+        return magic.from_buffer(head, mime=True)
+    except Exception as e:
+        logger.warning(f"Magic-Dateityp-Prüfung fehlgeschlagen: {e}")
+        return None
+
+
+@dataclass
+class IngestResult:
+    """Ergebnis der Ingest-Stufe für eine Datei"""
+    file_path: Path
+    filename: str
+    size: int
+    sha256: str
+    mime_type: Optional[str]
+    scan_result: Dict[str, Any]
+    # Dateianfang (HEAD_CAPTURE_SIZE) für die Metadaten-Extraktion, danach freigeben
+    head: Optional[bytes] = None
+
+
+class IngestStage:
+    """
+    Fusionierte Ingest-Stufe für eine hochgeladene Datei
+    Schreiben, SHA-256, MIME-Erkennung und Virenscan laufen über dieselben Blöcke,
+    die Datei wird nach dem Schreiben nicht erneut gelesen.
+
+    scan_session muss feed(data) und finish() -> Dict anbieten (siehe VirusScanner.open_stream)
+    writer ersetzt den ChunkedFileWriter, z.B. StoredFileReader für vorhandene Dateien
+    """
+
+    def __init__(self, file_path: Path, filename: str, budget: Optional[UploadBudget] = None,
+                 scan_session=None, writer=None):
+        self.filename = filename
+        self.scan_session = scan_session
+        self.mime_type: Optional[str] = None
+        self._writer = writer if writer is not None else ChunkedFileWriter(file_path, budget)
+        self._hash = hashlib.sha256()
+        self._head = bytearray()
+        self._sniffed = False
+
+    @property
+    def file_path(self) -> Path:
+        return self._writer.file_path
+
+    def write(self, data: bytes):
+        """Verarbeitet einen Datenblock in allen Teilschritten"""
+        self._writer.write(data)
+        self._hash.update(data)
+
+        if len(self._head) < HEAD_CAPTURE_SIZE:
+            self._head += data[:HEAD_CAPTURE_SIZE - len(self._head)]
+        if not self._sniffed and len(self._head) >= SNIFF_SIZE:
+            self._sniff()
+
+        if self.scan_session is not None:
+            self.scan_session.feed(data)
+
+    def _sniff(self):
+        """Prüft den MIME-Typ, sobald genug Bytes vom Dateianfang vorliegen"""
+        self._sniffed = True
+        self.mime_type = sniff_mime_type(bytes(self._head[:SNIFF_SIZE]))
+
+        if self.mime_type is not None and not self.mime_type.startswith("image/"):
+            raise IngestRejected(f"Datei ist kein gültiges Bild: {self.filename}")
+
+    def finish(self) -> IngestResult:
+        """Schließt die Datei ab und liefert Hash, Typ und Scan-Ergebnis"""
+        if not self._sniffed:
+            self._sniff()
+
+        self._writer.close()
+
+        if self.scan_session is not None:
+            scan_result = self.scan_session.finish()
+        else:
+            scan_result = {
+                "is_clean": True,
+                "threat_name": None,
+                "scan_engine_version": "disabled"
+            }
+
+        if not scan_result["is_clean"]:
+            self._writer.abort()
+            raise IngestRejected(
+                f"Virus gefunden in {self.filename}: {scan_result['threat_name']}"
+            )
+
+        return IngestResult(
+            file_path=self.file_path,
+            filename=self.filename,
+            size=self._writer.size,
+            sha256=self._hash.hexdigest(),
+            mime_type=self.mime_type,
+            scan_result=scan_result,
+            head=bytes(self._head)
+        )
+
+    def abort(self):
+        """Bricht die Stufe ab und entfernt die Teildatei"""
+        self._writer.abort()
+        if self.scan_session is not None:
+            self.scan_session.close()
+
+
+def ingest_upload_file(source, file_path: Path, filename: str,
+                       budget: Optional[UploadBudget] = None, scan_factory=None,
+                       cancelled: Optional[threading.Event] = None) -> IngestResult:
+    """
+    Führt eine bereits gespoolte Upload-Datei blockweise durch die Ingest-Stufe
+    Läuft im Ingest-Thread-Pool; cancelled bricht zwischen zwei Blöcken ab
+    """
+    stage = IngestStage(file_path, filename, budget, scan_factory() if scan_factory else None)
+    try:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(STREAM_CHUNK_SIZE), b""):
+            if cancelled is not None and cancelled.is_set():
+                raise IngestCancelled(f"Ingest abgebrochen: {filename}")
+            stage.write(chunk)
+        return stage.finish()
+    except Exception:
+        stage.abort()
+        raise
+
+
+def hash_spooled_file(source) -> str:
+    """SHA-256 einer bereits gespoolten Upload-Datei (Verdict-Cache vor dem Ingest)"""
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(STREAM_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def ingest_stored_file(file_path: Path, filename: str, scan_factory=None,
+                       cancelled: Optional[threading.Event] = None) -> IngestResult:
+    """
+    Prüft eine bereits vollständig gespeicherte Datei in einem Lesedurchgang
+    (Hash, MIME-Erkennung, Virenscan), ohne sie erneut zu schreiben
+    """
+    stage = IngestStage(
+        file_path, filename, scan_session=scan_factory() if scan_factory else None,
+        writer=StoredFileReader(file_path)
+    )
+    try:
+        with open(file_path, "rb") as source:
+            for chunk in iter(lambda: source.read(STREAM_CHUNK_SIZE), b""):
+                if cancelled is not None and cancelled.is_set():
+                    raise IngestCancelled(f"Ingest abgebrochen: {filename}")
+                stage.write(chunk)
+        return stage.finish()
+    except Exception:
+        stage.abort()
+        raise
+
+
+def first_ingest_error(results: List[Any]) -> Optional[BaseException]:
+    """
+    Liefert den ersten echten Fehler aus asyncio.gather(..., return_exceptions=True)
+    Folgefehler durch IngestCancelled werden übersprungen
+    """
+    errors = [r for r in results if isinstance(r, BaseException)]
+    for error in errors:
+        if not isinstance(error, IngestCancelled):
+            return error
+    return errors[0] if errors else None
+
+
+def _decode_header(value: bytes, charset: str) -> str:
+    """Dekodiert Header-Werte tolerant"""
+    try:
+        return value.decode(charset)
+    except (UnicodeDecodeError, LookupError):
+        return value.decode("latin-1")
+
+
+class StreamingMultipartParser:
+    """
+    Multipart-Parser ohne Spooling
+    Liefert die Teile eines multipart/form-data Bodys als Ereignisse, während die Bytes ankommen:
+
+    - ("field", name, value) für normale Formularfelder
+    - ("file_start", name, filename, content_type) zu Beginn eines Datei-Teils
+    - ("file_data", data) für jeden empfangenen Datenblock
+    - ("file_end",) am Ende eines Datei-Teils
+    """
+
+    def __init__(self, content_type: str, stream: AsyncIterator[bytes]):
+        from multipart.multipart import parse_options_header
+
+        _, params = parse_options_header(content_type or "")
+        charset = params.get(b"charset", b"utf-8")
+        self.charset = charset.decode("latin-1") if isinstance(charset, bytes) else charset
+
+        if b"boundary" not in params:
+            raise MultipartStreamError("Multipart-Boundary fehlt")
+
+        self.boundary = params[b"boundary"]
+        self.stream = stream
+        self._events: List[Tuple] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._is_file = False
+        self._field_name = ""
+        self._field_data = bytearray()
+        self._fields = 0
+        self._fields_size = 0
+        self._finished = False
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._is_file = False
+        self._field_name = ""
+        self._field_data = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+        self._check_header_size()
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+        self._check_header_size()
+
+    def _check_header_size(self):
+        if len(self._header_name) + len(self._header_value) > MULTIPART_MAX_HEADER_SIZE:
+            raise MultipartStreamError("Multipart-Header zu groß")
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        from multipart.multipart import parse_options_header
+
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise MultipartStreamError('Content-Disposition ohne "name"')
+
+        self._field_name = _decode_header(options[b"name"], self.charset)
+
+        if b"filename" in options:
+            self._is_file = True
+            filename = _decode_header(options[b"filename"], self.charset)
+            content_type = _decode_header(
+                self._headers.get(b"content-type", b"application/octet-stream"), self.charset
+            )
+            self._events.append(("file_start", self._field_name, filename, content_type))
+        else:
+            self._fields += 1
+            if self._fields > MULTIPART_MAX_FIELDS:
+                raise MultipartStreamError(f"Zu viele Formularfelder (max {MULTIPART_MAX_FIELDS})")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._is_file:
+            self._events.append(("file_data", data[start:end]))
+        else:
+            self._field_data += data[start:end]
+            self._fields_size += end - start
+            if len(self._field_data) > MULTIPART_MAX_FIELD_SIZE:
+                raise UploadLimitExceeded(
+                    f"Formularfeld {self._field_name} zu groß (max {MULTIPART_MAX_FIELD_SIZE} bytes)"
+                )
+            if self._fields_size > MULTIPART_MAX_FIELDS_SIZE:
+                raise UploadLimitExceeded(
+                    f"Formularfelder zu groß (max {MULTIPART_MAX_FIELDS_SIZE} bytes insgesamt)"
+                )
+
+    def _on_part_end(self):
+        if self._is_file:
+            self._events.append(("file_end",))
+        else:
+            self._events.append((
+                "field", self._field_name, _decode_header(bytes(self._field_data), self.charset)
+            ))
+
+    def _on_end(self):
+        self._finished = True
+
+    async def events(self) -> AsyncIterator[Tuple]:
+        """Iteriert über die Multipart-Ereignisse, während der Body gestreamt wird"""
+        from multipart.multipart import MultipartParser
+
+        callbacks = {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_end": self._on_end,
+        }
+        parser = MultipartParser(self.boundary, callbacks)
+
+        async for chunk in self.stream:
+            if not chunk:
+                continue
+            try:
+                parser.write(chunk)
+            except (MultipartStreamError, UploadLimitExceeded):
+                raise
+            except Exception as e:
+                raise MultipartStreamError(f"Multipart-Body ungültig: {e}")
+
+            # Ereignisse sofort abgeben, damit Dateien direkt geschrieben werden
+            events, self._events = self._events, []
+            for event in events:
+                yield event
+
+        parser.finalize()
+        for event in self._events:
+            yield event
+        self._events = []
+
+        if not self._finished:
+            raise MultipartStreamError("Multipart-Body unvollständig")
@@ -0,0 +1,155 @@
+"""
+Job-Logs für ChiliView
+Ringpuffer der letzten Ausgabezeilen laufender WebODM-CLI-Instanzen
+
+Jede Instanz hält die letzten JOB_LOG_BUFFER_LINES Zeilen im Speicher, damit Benutzer
+und Admins eine laufende Verarbeitung live verfolgen können (SSE in routers/queue.py),
+ohne die Log-Datei zu lesen. Auf die Platte wird blockweise geschrieben: gesammelt
+bis JOB_LOG_FLUSH_LINES Zeilen oder JOB_LOG_FLUSH_INTERVAL_MS vergangen sind, dann
+in einem Schreibvorgang im Thread-Pool. Abgeschlossene Logs bleiben noch
+JOB_LOG_RETENTION_SECONDS abrufbar.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    env_value = os.getenv(name)
+    if env_value and env_value.isdigit():
+        return int(env_value)
+    return default
+
+
+JOB_LOG_BUFFER_LINES = max(_env_int("JOB_LOG_BUFFER_LINES", 2000), 1)
+JOB_LOG_FLUSH_LINES = max(_env_int("JOB_LOG_FLUSH_LINES", 256), 1)
+JOB_LOG_FLUSH_INTERVAL = _env_int("JOB_LOG_FLUSH_INTERVAL_MS", 1000) / 1000.0
+JOB_LOG_RETENTION_SECONDS = _env_int("JOB_LOG_RETENTION_SECONDS", 600)
+
+
+class JobLog:
+    """Ausgabe einer Instanz: Ringpuffer, blockweise Log-Datei, Benachrichtigung von Lesern"""
+
+    def __init__(self, key: str, log_path: Optional[Path] = None,
+                 max_lines: int = JOB_LOG_BUFFER_LINES):
+        self.key = key
+        self.log_path = Path(log_path) if log_path else None
+        # Einträge (Sequenznummer, Zeile); Sequenznummern beginnen bei 1
+        self.lines: Deque[Tuple[int, str]] = deque(maxlen=max_lines)
+        self.seq = 0
+        self.finished = False
+        self.status: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self._pending: List[str] = []
+        self._last_flush = time.monotonic()
+        self._flush_lock = asyncio.Lock()
+        self._changed = asyncio.Event()
+
+    async def append(self, line: str):
+        self.seq += 1
+        self.lines.append((self.seq, line))
+        self._notify()
+
+        if self.log_path is None:
+            return
+        self._pending.append(line)
+        if (len(self._pending) >= JOB_LOG_FLUSH_LINES
+                or time.monotonic() - self._last_flush >= JOB_LOG_FLUSH_INTERVAL):
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending or self.log_path is None:
+                return
+            block, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_block, block)
+
+    def _write_block(self, block: List[str]):
+        try:
+            with open(self.log_path, "a") as log_file:
+                log_file.write("\n".join(block) + "\n")
+        except OSError as e:
+            logger.warning(f"Log-Datei {self.log_path} nicht schreibbar: {e}")
+
+    async def finish(self, status: str):
+        await self.flush()
+        self.finished = True
+        self.status = status
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def _notify(self):
+        # Wartende Leser wecken, neue Leser warten auf das nächste Ereignis
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def since(self, seq: int) -> List[Tuple[int, str]]:
+        """Zeilen mit Sequenznummer > seq, soweit noch im Puffer"""
+        if seq >= self.seq:
+            return []
+        return [entry for entry in self.lines if entry[0] > seq]
+
+    def tail(self, count: int) -> List[Tuple[int, str]]:
+        if count <= 0:
+            return []
+        return list(self.lines)[-count:]
+
+    async def wait(self, seq: int, timeout: float) -> bool:
+        """Wartet auf Zeilen nach seq oder das Ende; False bei Zeitüberschreitung"""
+        if self.seq > seq or self.finished:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class JobLogRegistry:
+    """
+    Job-Logs laufender und kürzlich beendeter Instanzen
+    Schlüssel ist die Task-ID der Queue; Instanz-IDs (inst_HHMMSS) sind nur je Projekt
+    eindeutig und würden Logs verschiedener Reseller vermischen
+    """
+
+    def __init__(self):
+        self.logs: Dict[str, JobLog] = {}
+
+    def open(self, key: str, log_path: Optional[Path] = None) -> JobLog:
+        self._prune()
+        job_log = JobLog(key, log_path)
+        self.logs[key] = job_log
+        return job_log
+
+    def get(self, key: Optional[str]) -> Optional[JobLog]:
+        if key is None:
+            return None
+        return self.logs.get(key)
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            key for key, job_log in self.logs.items()
+            if job_log.finished and now - job_log.finished_at > JOB_LOG_RETENTION_SECONDS
+        ]
+        for key in expired:
+            del self.logs[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "logs": len(self.logs),
+            "running": sum(1 for job_log in self.logs.values() if not job_log.finished)
+        }
+
+
+# Globale Instanz
+job_logs = JobLogRegistry()
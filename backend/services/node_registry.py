@@ -0,0 +1,337 @@
+"""
+Knoten-Registry für ChiliView
+Lastabhängige Auswahl des NodeODM-Verarbeitungsknotens statt WebODM-Automatik
+
+Die Knotenliste kommt von WebODM (/api/processingnodes/), Auslastung und Ausstattung
+fragt die Registry regelmäßig direkt beim Knoten ab (NodeODM /info: taskQueueCount,
+cpuCores, totalMemory, availableMemory, maxImages). Jede neue Aufgabe geht an den Knoten
+mit der kleinsten vorhergesagten Fertigstellungszeit:
+
+    (Aufgaben in der Warteschlange * mittlere Bildzahl + eigene Bilder)
+        * NODE_IMAGE_CORE_SECONDS / CPU-Kerne
+
+Knoten, die offline sind, zu wenig Speicher für die Aufgabe haben oder deren maxImages
+überschritten wird, scheiden aus. Zwischen zwei Abfragen zählt die Registry eigene
+Zuweisungen mit, damit ein Schub neuer Aufgaben nicht auf denselben Knoten fällt.
+Ist kein Knoten geeignet, entscheidet wie bisher WebODM (processing_node = None).
+
+Mit static_nodes (Liste "host:port") kommt die Knotenliste nicht von WebODM; so nutzt
+das NodeODM-Backend die Registry ohne WebODM-Webapp.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.webodm_client import WebODMClient, get_webodm_client
+
+logger = logging.getLogger(__name__)
+
+NODE_SELECTION_MODES = ("load", "auto")
+
+
+def _configured_selection_mode() -> str:
+    """Knotenauswahl (PROCESSING_NODE_SELECTION: load = lastabhängig, auto = WebODM entscheidet)"""
+    mode = os.getenv("PROCESSING_NODE_SELECTION", "load").strip().lower()
+    if mode not in NODE_SELECTION_MODES:
+        logger.warning(f"Unbekannte PROCESSING_NODE_SELECTION '{mode}', verwende 'load'")
+        return "load"
+    return mode
+
+
+def _configured_number(name: str, default: int) -> int:
+    env_value = os.getenv(name)
+    if env_value and env_value.isdigit():
+        return max(1, int(env_value))
+    return default
+
+
+PROCESSING_NODE_SELECTION = _configured_selection_mode()
+
+# Abfrageintervall der /info-Probes (Sekunden)
+NODE_PROBE_INTERVAL = _configured_number("NODE_PROBE_INTERVAL", 30)
+
+# Rechenaufwand pro Bild in CPU-Kern-Sekunden und Speicherbedarf pro Bild (Schätzwerte)
+NODE_IMAGE_CORE_SECONDS = _configured_number("NODE_IMAGE_CORE_SECONDS", 40)
+NODE_MEMORY_PER_IMAGE_MB = _configured_number("NODE_MEMORY_PER_IMAGE_MB", 32)
+
+# Startwert für die mittlere Bildzahl fremder Aufgaben in der Warteschlange eines Knotens
+DEFAULT_TASK_IMAGES = 150
+
+
+@dataclass
+class ProcessingNode:
+    """Verarbeitungsknoten mit dem Stand der letzten /info-Abfrage"""
+    node_id: int
+    label: str
+    hostname: str
+    port: int
+    online: bool = False
+    queue_count: int = 0
+    cpu_cores: Optional[int] = None
+    total_memory: Optional[int] = None
+    available_memory: Optional[int] = None
+    max_images: Optional[int] = None
+    max_parallel_tasks: Optional[int] = None
+    probed_at: Optional[float] = None
+    probe_error: Optional[str] = None
+    # Eigene Zuweisungen seit der letzten Abfrage
+    assigned_since_probe: int = 0
+
+    @property
+    def address(self) -> str:
+        return f"{self.hostname}:{self.port}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "label": self.label,
+            "address": self.address,
+            "online": self.online,
+            "queue_count": self.queue_count,
+            "assigned_since_probe": self.assigned_since_probe,
+            "cpu_cores": self.cpu_cores,
+            "total_memory": self.total_memory,
+            "available_memory": self.available_memory,
+            "max_images": self.max_images,
+            "probe_age_s": round(time.monotonic() - self.probed_at, 1) if self.probed_at else None,
+            "probe_error": self.probe_error
+        }
+
+
+@dataclass
+class NodeSelection:
+    """Ergebnis der Knotenauswahl für eine Aufgabe"""
+    node_id: int
+    label: str
+    address: str
+    predicted_seconds: float
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "label": self.label,
+            "address": self.address,
+            "predicted_seconds": round(self.predicted_seconds),
+            "candidates": self.candidates
+        }
+
+
+class NodeRegistry:
+    """Verwaltet die Verarbeitungsknoten und wählt den Knoten für neue Aufgaben"""
+
+    def __init__(self, client: Optional[WebODMClient] = None,
+                 probe_interval: int = NODE_PROBE_INTERVAL,
+                 node_token: Optional[str] = None,
+                 static_nodes: Optional[List[str]] = None):
+        self.client = client
+        self.probe_interval = probe_interval
+        self.static_nodes = static_nodes or []
+        self.node_token = node_token if node_token is not None else os.getenv("NODEODM_TOKEN", "")
+        self.nodes: Dict[int, ProcessingNode] = {}
+        self.average_task_images = float(DEFAULT_TASK_IMAGES)
+
+        self._probe_client: Optional[httpx.AsyncClient] = None
+        self._refresh_lock = asyncio.Lock()
+        self._worker: Optional[asyncio.Task] = None
+        self._refreshed_at: Optional[float] = None
+
+        # Statistik für Monitoring
+        self.probes_total = 0
+        self.probe_failures = 0
+        self.selections = 0
+
+    @property
+    def probe_client(self) -> httpx.AsyncClient:
+        if self._probe_client is None or self._probe_client.is_closed:
+            self._probe_client = httpx.AsyncClient(timeout=httpx.Timeout(5.0, connect=3.0))
+        return self._probe_client
+
+    async def start(self):
+        if self._worker is not None or PROCESSING_NODE_SELECTION != "load":
+            return
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Knoten-Registry gestartet (Abfrage alle {self.probe_interval}s)")
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._probe_client is not None:
+            await self._probe_client.aclose()
+            self._probe_client = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Knoten-Registry konnte nicht aktualisiert werden: {e}")
+            await asyncio.sleep(self.probe_interval)
+
+    async def refresh(self):
+        """Lädt die Knotenliste (WebODM oder statisch) und fragt alle Knoten parallel ab"""
+        async with self._refresh_lock:
+            if self.static_nodes:
+                listed = self._static_node_list()
+            else:
+                listed = await self._webodm_node_list()
+
+            self.nodes = listed
+            await asyncio.gather(*(self._probe(node) for node in listed.values()))
+            self._refreshed_at = time.monotonic()
+
+    def _static_node_list(self) -> Dict[int, ProcessingNode]:
+        listed: Dict[int, ProcessingNode] = {}
+        for node_id, address in enumerate(self.static_nodes, start=1):
+            hostname, _, port = address.rpartition(":")
+            node = self.nodes.get(node_id) or ProcessingNode(
+                node_id=node_id, label=address, hostname=hostname, port=int(port)
+            )
+            # Ohne WebODM gibt es keinen Rückfall: online nur nach erfolgreicher Abfrage
+            node.online = False
+            listed[node_id] = node
+        return listed
+
+    async def _webodm_node_list(self) -> Dict[int, ProcessingNode]:
+        if self.client is None:
+            self.client = get_webodm_client()
+        response = await self.client.get("/api/processingnodes/", timeout=10.0)
+        if response.status_code != 200:
+            raise Exception(f"WebODM-Knotenliste: HTTP {response.status_code}")
+
+        listed: Dict[int, ProcessingNode] = {}
+        for entry in response.json():
+            node_id = entry["id"]
+            node = self.nodes.get(node_id) or ProcessingNode(
+                node_id=node_id, label="", hostname=entry["hostname"], port=entry["port"]
+            )
+            node.hostname = entry["hostname"]
+            node.port = entry["port"]
+            node.label = entry.get("label") or node.address
+            listed[node_id] = node
+
+            # Werte aus WebODM als Rückfall, falls die direkte Abfrage scheitert
+            node.online = bool(entry.get("online", False))
+            node.queue_count = int(entry.get("queue_count") or 0)
+            node.max_images = entry.get("max_images")
+        return listed
+
+    async def _probe(self, node: ProcessingNode):
+        self.probes_total += 1
+        params = {"token": self.node_token} if self.node_token else None
+        try:
+            response = await self.probe_client.get(f"http://{node.address}/info", params=params)
+            response.raise_for_status()
+            info = response.json()
+        except Exception as e:
+            self.probe_failures += 1
+            node.probe_error = str(e) or type(e).__name__
+            logger.debug(f"Knoten {node.label} nicht direkt erreichbar: {node.probe_error}")
+            return
+
+        node.online = True
+        node.queue_count = int(info.get("taskQueueCount") or 0)
+        node.cpu_cores = info.get("cpuCores") or node.cpu_cores
+        node.total_memory = info.get("totalMemory")
+        node.available_memory = info.get("availableMemory")
+        node.max_images = info.get("maxImages") or node.max_images
+        node.max_parallel_tasks = info.get("maxParallelTasks")
+        node.probed_at = time.monotonic()
+        node.probe_error = None
+        node.assigned_since_probe = 0
+
+    def predict_seconds(self, node: ProcessingNode, image_count: int) -> float:
+        """Vorhergesagte Zeit bis zur Fertigstellung einer Aufgabe mit image_count Bildern"""
+        queued_tasks = node.queue_count + node.assigned_since_probe
+        pending_images = queued_tasks * self.average_task_images + image_count
+        # Ohne bekannte Kernzahl (nur WebODM-Werte) konservativ mit einem Kern rechnen
+        cores = max(1, node.cpu_cores or 1)
+        return pending_images * NODE_IMAGE_CORE_SECONDS / cores
+
+    def _exclusion_reason(self, node: ProcessingNode, image_count: int) -> Optional[str]:
+        if not node.online:
+            return "offline"
+        if node.max_images and image_count > node.max_images:
+            return f"max_images {node.max_images}"
+        if node.total_memory:
+            required = image_count * NODE_MEMORY_PER_IMAGE_MB * 1024 * 1024
+            if required > node.total_memory:
+                return "zu wenig Speicher"
+        return None
+
+    async def select_node(self, image_count: int) -> Optional[NodeSelection]:
+        """
+        Wählt den Knoten mit der kleinsten vorhergesagten Fertigstellungszeit
+        None, wenn die Auswahl deaktiviert ist oder kein Knoten infrage kommt
+        """
+        if PROCESSING_NODE_SELECTION != "load":
+            return None
+
+        stale = self._refreshed_at is None or time.monotonic() - self._refreshed_at > 2 * self.probe_interval
+        if stale:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Knotenauswahl ohne aktuelle Daten: {e}")
+
+        candidates = []
+        best: Optional[ProcessingNode] = None
+        best_seconds = None
+        for node in sorted(self.nodes.values(), key=lambda n: n.label):
+            reason = self._exclusion_reason(node, image_count)
+            seconds = self.predict_seconds(node, image_count) if reason is None else None
+            candidates.append({
+                "label": node.label,
+                "queue_count": node.queue_count + node.assigned_since_probe,
+                "cpu_cores": node.cpu_cores,
+                "predicted_seconds": round(seconds) if seconds is not None else None,
+                "excluded": reason
+            })
+            if seconds is not None and (best_seconds is None or seconds < best_seconds):
+                best, best_seconds = node, seconds
+
+        if best is None:
+            if self.nodes:
+                logger.warning(f"Kein geeigneter Verarbeitungsknoten für {image_count} Bilder, WebODM wählt")
+            return None
+
+        best.assigned_since_probe += 1
+        self.average_task_images = 0.8 * self.average_task_images + 0.2 * image_count
+        self.selections += 1
+
+        selection = NodeSelection(
+            node_id=best.node_id, label=best.label, address=best.address,
+            predicted_seconds=best_seconds, candidates=candidates
+        )
+        logger.info(
+            f"Verarbeitungsknoten {best.label} gewählt für {image_count} Bilder "
+            f"(Prognose {round(best_seconds / 60)} min, {len(candidates)} Knoten)"
+        )
+        return selection
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": PROCESSING_NODE_SELECTION,
+            "nodes": [node.to_dict() for node in self.nodes.values()],
+            "average_task_images": round(self.average_task_images, 1),
+            "probes_total": self.probes_total,
+            "probe_failures": self.probe_failures,
+            "selections": self.selections
+        }
+
+
+# Globale Instanz
+node_registry = NodeRegistry()
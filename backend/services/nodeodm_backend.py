@@ -0,0 +1,268 @@
+"""
+NodeODM-Backend für ChiliView
+Verarbeitung direkt auf NodeODM-Knoten, ohne WebODM-Webapp und ohne Django-Projekt pro Upload
+
+Ablauf nach NodeODM-API: /task/new/init (mit webhook-URL), Bilder batchweise parallel
+an /task/new/upload/{uuid}, dann /task/new/commit/{uuid}. Der Fortschritt kommt aus
+/task/{uuid}/info, die Ergebnisse werden über /task/{uuid}/download/{asset} gestreamt
+und per Range fortgesetzt (services/asset_download.py). Die Knoten stehen in
+NODEODM_NODES ("host:port,host:port", sonst NODEODM_URL); gewählt wird wie beim
+WebODM-Backend über die Knoten-Registry. Task-Referenz ist "{host:port}/{uuid}".
+"""
+
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from services.asset_download import RESULT_ASSETS, AssetDownloadError, download_assets
+from services.node_registry import NodeRegistry
+from services.processing_backend import (
+    DEFAULT_TASK_OPTIONS, BackendTaskStatus, ProcessingBackend, ProcessingJob,
+    list_image_files, send_image_batch, upload_in_batches
+)
+from services.webhooks import webhook_url
+from services.webodm_client import (
+    WEBODM_UPLOAD_BATCH_FILES, WEBODM_UPLOAD_CONCURRENCY, WEBODM_UPLOAD_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Statuscodes von NodeODM-Tasks (abweichend von WebODM)
+NODEODM_TASK_STATUS = {
+    10: "queued",
+    20: "running",
+    30: "failed",
+    40: "completed",
+    50: "canceled"
+}
+
+# Gleichzeitige /info-Abfragen pro Synchronisationsdurchlauf
+NODEODM_STATUS_CONCURRENCY = 8
+
+
+def _configured_nodes() -> List[str]:
+    """NodeODM-Knoten als "host:port" (NODEODM_NODES, sonst NODEODM_URL)"""
+    nodes = [node.strip() for node in os.getenv("NODEODM_NODES", "").split(",") if node.strip()]
+    if nodes:
+        return nodes
+    url = urlparse(os.getenv("NODEODM_URL", "http://nodeodm:3000"))
+    return [f"{url.hostname}:{url.port or 80}"]
+
+
+def split_task_ref(task_ref: str):
+    """Task-Referenz in (Knotenadresse, UUID) zerlegen"""
+    address, task_uuid = task_ref.rsplit("/", 1)
+    return address, task_uuid
+
+
+class NodeODMClient:
+    """
+    HTTP-Client für NodeODM-Knoten (ein Verbindungspool für alle Knoten)
+    Das Token wird als Query-Parameter angehängt; Schnittstelle wie WebODMClient,
+    damit der Asset-Download beide bedienen kann
+    """
+
+    def __init__(self, token: str = "", max_connections: int = 20):
+        self.token = token
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests_total = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=120.0
+                )
+            )
+        return self._client
+
+    def _with_token(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if self.token:
+            kwargs["params"] = {**(kwargs.get("params") or {}), "token": self.token}
+        return kwargs
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self.requests_total += 1
+        return await self.client.request(method, url, **self._with_token(kwargs))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        self.requests_total += 1
+        response = await self.client.send(
+            self.client.build_request(method, url, **self._with_token(kwargs)), stream=True
+        )
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _json_or_error(response: httpx.Response, action: str) -> Dict[str, Any]:
+    """NodeODM meldet Fehler teils mit Status 200 und {"error": ...}"""
+    if response.status_code != 200:
+        raise Exception(f"NodeODM {action} fehlgeschlagen: HTTP {response.status_code}")
+    body = response.json()
+    if isinstance(body, dict) and body.get("error"):
+        raise Exception(f"NodeODM {action} fehlgeschlagen: {body['error']}")
+    return body
+
+
+class NodeODMBackend(ProcessingBackend):
+    """NodeODM-Knoten direkt als Verarbeitungs-Backend"""
+
+    name = "nodeodm"
+
+    def __init__(self, nodes: Optional[List[str]] = None, token: Optional[str] = None):
+        token = token if token is not None else os.getenv("NODEODM_TOKEN", "")
+        self.nodes = nodes or _configured_nodes()
+        self.http = NodeODMClient(token)
+        self.registry = NodeRegistry(static_nodes=self.nodes, node_token=token)
+        self.info_requests = 0
+
+    async def submit(self, job: ProcessingJob, on_progress=None, on_node_selected=None) -> str:
+        image_files = list_image_files(job.images_path)
+
+        selection = await self.registry.select_node(len(image_files))
+        if on_node_selected:
+            on_node_selected(selection)
+        address = selection.address if selection else self.nodes[0]
+        node_url = f"http://{address}"
+
+        init_data = {
+            "name": f"ChiliView_Project_{job.project_id}",
+            "options": json.dumps(DEFAULT_TASK_OPTIONS)
+        }
+        callback = webhook_url(job.reseller_id, job.project_id)
+        if callback:
+            init_data["webhook"] = callback
+
+        task_uuid = None
+        try:
+            response = await self.http.post(f"{node_url}/task/new/init", data=init_data)
+            task_uuid = _json_or_error(response, "Task-Erstellung")["uuid"]
+
+            await upload_in_batches(
+                image_files,
+                lambda batch: send_image_batch(
+                    self.http, f"{node_url}/task/new/upload/{task_uuid}", batch,
+                    WEBODM_UPLOAD_RETRIES, "NodeODM"
+                ),
+                WEBODM_UPLOAD_BATCH_FILES, WEBODM_UPLOAD_CONCURRENCY, on_progress
+            )
+
+            response = await self.http.post(f"{node_url}/task/new/commit/{task_uuid}")
+            _json_or_error(response, "Task-Commit")
+
+        except Exception as e:
+            logger.error(f"Fehler bei NodeODM Task-Erstellung auf {address}: {e}")
+            if task_uuid is not None:
+                await self._remove(address, task_uuid)
+            raise
+
+        task_ref = f"{address}/{task_uuid}"
+        logger.info(f"NodeODM Task {task_ref} erstellt für Projekt {job.project_id} ({len(image_files)} Bilder)")
+        return task_ref
+
+    async def fetch_statuses(self, task_refs: List[str]) -> Dict[str, Optional[BackendTaskStatus]]:
+        slots = asyncio.Semaphore(NODEODM_STATUS_CONCURRENCY)
+
+        async def fetch(task_ref: str):
+            address, task_uuid = split_task_ref(task_ref)
+            async with slots:
+                self.info_requests += 1
+                response = await self.http.get(f"http://{address}/task/{task_uuid}/info", timeout=15.0)
+            if response.status_code == 404:
+                return None
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}")
+            info = response.json()
+            if "error" in info:
+                # Unbekannte UUID
+                return None
+            return self._to_status(info)
+
+        results = await asyncio.gather(*(fetch(task_ref) for task_ref in task_refs), return_exceptions=True)
+
+        statuses: Dict[str, Optional[BackendTaskStatus]] = {}
+        for task_ref, result in zip(task_refs, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"NodeODM-Status für {task_ref} nicht abrufbar: {result}")
+                continue
+            statuses[task_ref] = result
+        return statuses
+
+    @staticmethod
+    def _to_status(info: Dict[str, Any]) -> BackendTaskStatus:
+        task_status = info.get("status") or {}
+        progress = min(max(float(info.get("progress") or 0.0), 0.0), 100.0) / 100.0
+        return BackendTaskStatus(
+            status=NODEODM_TASK_STATUS.get(task_status.get("code"), "unknown"),
+            progress=progress,
+            error=task_status.get("errorMessage")
+        )
+
+    async def download_results(self, task_ref: str, output_path: Path,
+                               task_status: BackendTaskStatus) -> Dict[str, Dict[str, Any]]:
+        """NodeODM liefert keine Asset-Liste: fehlende Assets (404) werden ausgelassen"""
+        address, task_uuid = split_task_ref(task_ref)
+        manifest = await download_assets(
+            self.http, f"http://{address}/task/{task_uuid}", RESULT_ASSETS, Path(output_path),
+            skip_missing=True
+        )
+        if not manifest:
+            raise AssetDownloadError(f"NodeODM Task {task_ref} hat keine Ergebnisse geliefert")
+
+        logger.info(f"NodeODM-Ergebnisse heruntergeladen ({task_ref}, {len(manifest)} Assets, "
+                    f"{sum(entry['size'] for entry in manifest.values())} bytes)")
+        # Speicher auf dem Knoten freigeben
+        await self._remove(address, task_uuid)
+        return manifest
+
+    async def cancel(self, task_ref: str):
+        address, task_uuid = split_task_ref(task_ref)
+        try:
+            await self.http.post(f"http://{address}/task/cancel", data={"uuid": task_uuid})
+        except Exception as e:
+            logger.warning(f"NodeODM Task {task_ref} konnte nicht abgebrochen werden: {e}")
+
+    async def _remove(self, address: str, task_uuid: str):
+        try:
+            await self.http.post(f"http://{address}/task/remove", data={"uuid": task_uuid})
+        except Exception as e:
+            logger.warning(f"NodeODM Task {address}/{task_uuid} konnte nicht entfernt werden: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "nodes": self.nodes,
+            "requests_total": self.http.requests_total,
+            "info_requests": self.info_requests,
+            "registry": self.registry.stats()
+        }
+
+    async def close(self):
+        await self.registry.stop()
+        await self.http.close()
@@ -0,0 +1,251 @@
+"""
+ODM-Fortschritt für ChiliView
+Stufengewichteter Fortschritt aus der Ausgabe von ODM/WebODM-CLI und gedrosselte Status-Datei
+
+ODM meldet den Beginn jeder Pipeline-Stufe ("Running opensfm stage"); Angaben wie "x/y"
+oder "NN%" beziehen sich nur auf die laufende Stufe. Jede Stufe erhält daher einen festen
+Anteil am Gesamtfortschritt (grob nach typischer Laufzeit), Angaben innerhalb der Stufe
+werden in diesen Bereich abgebildet. Der Gesamtfortschritt fällt nie zurück.
+Vor der ersten Stufenmeldung (Downloads, Laden der Bilder) zählen solche Angaben nicht;
+nur Ausgaben ganz ohne Stufenmeldungen werden als Gesamtfortschritt gewertet.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pipeline-Stufen in ODM-Reihenfolge mit Anteil am Gesamtfortschritt (Summe 100)
+ODM_STAGES: List[Tuple[str, float]] = [
+    ("dataset", 2),
+    ("split", 0),
+    ("merge", 0),
+    ("opensfm", 35),
+    ("openmvs", 28),
+    ("filterpoints", 3),
+    ("meshing", 8),
+    ("texturing", 10),
+    ("georeferencing", 5),
+    ("dem", 4),
+    ("orthophoto", 5),
+    ("report", 0),
+    ("postprocess", 0)
+]
+
+# Kurzname -> Stufenname für --rerun-from
+ODM_STAGE_NAMES = {
+    "dataset": "dataset",
+    "split": "split",
+    "merge": "merge",
+    "opensfm": "opensfm",
+    "openmvs": "openmvs",
+    "filterpoints": "odm_filterpoints",
+    "meshing": "odm_meshing",
+    "texturing": "mvs_texturing",
+    "georeferencing": "odm_georeferencing",
+    "dem": "odm_dem",
+    "orthophoto": "odm_orthophoto",
+    "report": "odm_report",
+    "postprocess": "odm_postprocess"
+}
+
+# Stufe -> (Beginn, Anteil) in Prozent
+_STAGE_RANGES: Dict[str, Tuple[float, float]] = {}
+_offset = 0.0
+for _stage, _weight in ODM_STAGES:
+    _STAGE_RANGES[_stage] = (_offset, _weight)
+    _offset += _weight
+
+# ODM-Stufennamen tragen teils ein Präfix (odm_meshing, mvs_texturing)
+_STAGE_RE = re.compile(r"Running (?:odm_|mvs_)?(\w+) stage")
+# "x/y" ohne Pfade wie /var/www/1/2
+_FRACTION_RE = re.compile(r"(?<![\w/.])(\d+)\s?/\s?(\d+)(?![\w/.])")
+_PERCENT_RE = re.compile(r"(\d{1,3}(?:\.\d+)?)\s?%")
+_PROGRESS_RE = re.compile(r"Progress: (\d{1,3})")
+
+# Zeilen ohne Stufenmeldung, nach denen "x/y" und "NN%" als Gesamtfortschritt gelten
+STAGELESS_OUTPUT_LINES = 500
+
+# Mindestabstand zwischen zwei Schreibvorgängen der Status-Datei
+_env_write_interval = os.getenv("ODM_STATUS_WRITE_INTERVAL_MS")
+STATUS_WRITE_INTERVAL = (
+    int(_env_write_interval) if _env_write_interval and _env_write_interval.isdigit() else 250
+) / 1000.0
+
+
+def rerun_from_stage(completed_stage: Optional[str]) -> Optional[str]:
+    """ODM-Stufe, mit der nach completed_stage fortgesetzt wird (None: keine weitere Stufe)"""
+    stages = [stage for stage, _ in ODM_STAGES]
+    if completed_stage not in stages:
+        return None
+    index = stages.index(completed_stage) + 1
+    return ODM_STAGE_NAMES[stages[index]] if index < len(stages) else None
+
+
+def checkpoint_path(project_path, instance_id: Optional[str]) -> Path:
+    """Checkpoint-Datei einer Instanz (zuletzt abgeschlossene ODM-Stufe)"""
+    instance_suffix = f"_{instance_id}" if instance_id else ""
+    return Path(project_path) / f"checkpoint{instance_suffix}.json"
+
+
+def write_checkpoint(path: Path, completed_stage: str):
+    """Schreibt den Checkpoint atomar (blockierend, im Thread-Pool aufrufen)"""
+    tmp_file = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_file, "w") as f:
+            json.dump({"completed_stage": completed_stage, "timestamp": datetime.now().isoformat()}, f)
+        os.replace(tmp_file, path)
+    except OSError as e:
+        logger.warning(f"Checkpoint {path} nicht schreibbar: {e}")
+
+
+def read_checkpoint(path: Path) -> Optional[str]:
+    try:
+        with open(path) as f:
+            stage = json.load(f).get("completed_stage")
+    except (OSError, ValueError):
+        return None
+    return stage if stage in _STAGE_RANGES else None
+
+
+class ODMProgressTracker:
+    """
+    Gesamtfortschritt (0-100) aus ODM-Ausgabezeilen
+    Beginnt eine neue Stufe, gilt die vorherige als abgeschlossen (completed_stage);
+    bei fortgesetzten Läufen startet der Fortschritt hinter resume_after
+    """
+
+    def __init__(self, resume_after: Optional[str] = None):
+        self.stage: Optional[str] = None
+        self.completed_stage: Optional[str] = None
+        self.progress = 0.0
+        self._lines_without_stage = 0
+        if resume_after in _STAGE_RANGES:
+            self.completed_stage = resume_after
+            start, weight = _STAGE_RANGES[resume_after]
+            self.progress = start + weight
+
+    def feed(self, line: str) -> Optional[float]:
+        """
+        Verarbeitet eine Ausgabezeile
+        Liefert den neuen Gesamtfortschritt, wenn er gestiegen ist, sonst None
+        """
+        if self.stage is None:
+            self._lines_without_stage += 1
+
+        # Günstige Vorprüfung: die meisten Zeilen enthalten keine Fortschrittsangabe
+        if "stage" in line:
+            match = _STAGE_RE.search(line)
+            if match and match.group(1) in _STAGE_RANGES:
+                if self.stage is not None and self.stage != match.group(1):
+                    self.completed_stage = self.stage
+                self.stage = match.group(1)
+                return self._advance(_STAGE_RANGES[self.stage][0])
+
+        fraction = self._stage_fraction(line)
+        if fraction is None:
+            return None
+
+        if self.stage is None:
+            # Vor der ersten Stufe (Downloads, Laden der Bilder) nichts werten, sonst
+            # stünde der Fortschritt bis zum Ende nahe 100%; erst bei einer Ausgabe
+            # ganz ohne Stufenmeldungen gilt die Angabe als Gesamtfortschritt
+            if self._lines_without_stage <= STAGELESS_OUTPUT_LINES:
+                return None
+            return self._advance(fraction * 100.0)
+        start, weight = _STAGE_RANGES[self.stage]
+        return self._advance(start + weight * fraction)
+
+    @staticmethod
+    def _stage_fraction(line: str) -> Optional[float]:
+        if "%" in line:
+            match = _PERCENT_RE.search(line)
+            if match:
+                return min(float(match.group(1)), 100.0) / 100.0
+        if "/" in line:
+            match = _FRACTION_RE.search(line)
+            if match:
+                current, total = int(match.group(1)), int(match.group(2))
+                if 0 < total and current <= total:
+                    return current / total
+        if "Progress:" in line:
+            match = _PROGRESS_RE.search(line)
+            if match:
+                return min(int(match.group(1)), 100) / 100.0
+        return None
+
+    def _advance(self, progress: float) -> Optional[float]:
+        progress = min(progress, 99.0)
+        if progress <= self.progress:
+            return None
+        self.progress = progress
+        return progress
+
+
+class StatusFileWriter:
+    """
+    Schreibt die Status-Datei einer Verarbeitung höchstens alle STATUS_WRITE_INTERVAL Sekunden
+    Zwischenstände werden zusammengefasst; der letzte wird nach Ablauf des Intervalls
+    nachgeschrieben. Abschlussmeldungen (force=True) werden sofort geschrieben.
+    Geschrieben wird im Thread-Pool und atomar über eine temporäre Datei.
+    """
+
+    def __init__(self, status_file: Path, min_interval: float = STATUS_WRITE_INTERVAL):
+        self.status_file = Path(status_file)
+        self.min_interval = min_interval
+        self._last_write = 0.0
+        self._pending: Optional[Dict] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+        self.writes = 0
+        self.skipped = 0
+
+    async def update(self, status: str, message: str, progress: float,
+                     stage: Optional[str] = None, force: bool = False):
+        self._pending = {
+            "status": status,
+            "message": message,
+            "progress": int(progress),
+            "stage": stage,
+            "timestamp": datetime.now().isoformat()
+        }
+
+        remaining = self.min_interval - (time.monotonic() - self._last_write)
+        if force or remaining <= 0:
+            await self.flush()
+            return
+
+        self.skipped += 1
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(remaining, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        async with self._lock:
+            status_data, self._pending = self._pending, None
+            if status_data is None:
+                return
+            self._last_write = time.monotonic()
+            self.writes += 1
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write, status_data)
+
+    def _write(self, status_data: Dict):
+        tmp_file = self.status_file.with_name(self.status_file.name + ".tmp")
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(status_data, f)
+            os.replace(tmp_file, self.status_file)
+        except OSError as e:
+            logger.warning(f"Status-Datei {self.status_file} nicht schreibbar: {e}")
@@ -0,0 +1,225 @@
+"""
+Verarbeitungs-Backends für ChiliView
+Gemeinsame Schnittstelle für WebODM (REST über die Webapp), NodeODM (direkt) und WebODM-CLI (lokal)
+
+Ein Backend nimmt einen Auftrag an (submit) und liefert eine Task-Referenz, die in
+Project.webodm_task_id gespeichert wird; Project.processing_backend hält den Namen des
+Backends. Die Status-Synchronisation fragt den Stand gebündelt über fetch_statuses() ab
+und holt die Ergebnisse mit download_results(). Auswahl über PROCESSING_BACKEND
+(webodm, nodeodm, cli).
+"""
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_BACKENDS = ("webodm", "nodeodm", "cli")
+
+# Für Projekte ohne gespeichertes Backend (vor Einführung der Backends angelegt)
+LEGACY_BACKEND = "webodm"
+
+# Aufgabenstatus, einheitlich über alle Backends
+TASK_FINAL_STATUSES = ("completed", "failed", "canceled")
+
+# Eingabebilder, die an die Backends übergeben werden (entspricht den Upload-Endungen)
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tiff', '.tif', '.raw', '.dng'}
+
+# Standard-Optionen für Drohnenfotografie (REST-Backends)
+DEFAULT_TASK_OPTIONS = [
+    {"name": "mesh-octree-depth", "value": "11"},
+    {"name": "mesh-size", "value": "200000"},
+    {"name": "texturing-data-term", "value": "area"},
+    {"name": "texturing-nadir-weight", "value": "16"}
+]
+
+
+def _configured_backend() -> str:
+    """Standard-Backend für neue Aufträge (PROCESSING_BACKEND)"""
+    backend = os.getenv("PROCESSING_BACKEND", "webodm").strip().lower()
+    if backend not in PROCESSING_BACKENDS:
+        logger.warning(f"Unbekanntes PROCESSING_BACKEND '{backend}', verwende 'webodm'")
+        return "webodm"
+    return backend
+
+
+PROCESSING_BACKEND = _configured_backend()
+
+
+@dataclass
+class ProcessingJob:
+    """Auftrag für ein Verarbeitungs-Backend"""
+    reseller_id: str
+    project_id: int
+    user_id: int
+    images_path: str
+
+
+@dataclass
+class BackendTaskStatus:
+    """Stand einer Aufgabe im Backend (progress als Anteil 0..1)"""
+    status: str  # queued, running, completed, failed, canceled
+    progress: float = 0.0
+    error: Optional[str] = None
+    assets: List[str] = field(default_factory=list)
+
+    @property
+    def final(self) -> bool:
+        return self.status in TASK_FINAL_STATUSES
+
+
+class ProcessingBackend(ABC):
+    """Schnittstelle der Verarbeitungs-Backends"""
+
+    name: str = ""
+
+    @abstractmethod
+    async def submit(self, job: ProcessingJob, on_progress=None, on_node_selected=None) -> str:
+        """
+        Legt die Aufgabe an, überträgt die Bilder und startet die Verarbeitung
+        on_progress(uploaded_files, total_files) während der Übertragung,
+        on_node_selected(selection) nach der Knotenauswahl (None = Backend entscheidet).
+        Liefert die Task-Referenz
+        """
+
+    @abstractmethod
+    async def fetch_statuses(self, task_refs: List[str]) -> Dict[str, Optional[BackendTaskStatus]]:
+        """
+        Fragt mehrere Aufgaben ab
+        None = Aufgabe existiert nicht mehr; fehlende Referenzen = nicht erreichbar
+        """
+
+    @abstractmethod
+    async def download_results(self, task_ref: str, output_path: Path,
+                               task_status: BackendTaskStatus) -> Dict[str, Dict[str, Any]]:
+        """Übernimmt die Ergebnisse nach output_path und liefert das Asset-Manifest"""
+
+    @abstractmethod
+    async def cancel(self, task_ref: str):
+        """Bricht eine laufende Aufgabe ab (best effort)"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name}
+
+
+def list_image_files(images_path) -> List[Path]:
+    """Eingabebilder eines Upload-Verzeichnisses, sortiert"""
+    image_files = sorted(
+        image_file for image_file in Path(images_path).glob("*")
+        if image_file.suffix.lower() in IMAGE_EXTENSIONS
+    )
+    if not image_files:
+        raise Exception("Keine Bilder für die Verarbeitung gefunden")
+    return image_files
+
+
+async def upload_in_batches(image_files: List[Path], send_batch: Callable[[List[Path]], Awaitable[None]],
+                            batch_files: int, concurrency: int, on_progress=None):
+    """
+    Überträgt Bilder in Batches von batch_files, höchstens concurrency Batches gleichzeitig
+    Nach dem ersten endgültig fehlgeschlagenen Batch werden keine weiteren gestartet
+    """
+    batches = [image_files[i:i + batch_files] for i in range(0, len(image_files), batch_files)]
+    slots = asyncio.Semaphore(concurrency)
+    failed = asyncio.Event()
+    uploaded = 0
+
+    async def upload_batch(batch: List[Path]):
+        nonlocal uploaded
+        async with slots:
+            if failed.is_set():
+                return
+            try:
+                await send_batch(batch)
+            except Exception:
+                failed.set()
+                raise
+
+        uploaded += len(batch)
+        if on_progress is not None:
+            on_progress(uploaded, len(image_files))
+
+    results = await asyncio.gather(*(upload_batch(batch) for batch in batches), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def send_image_batch(client, url: str, batch: List[Path], retries: int, service: str):
+    """
+    Sendet einen Batch als Multipart-Feld "images", wiederholt bei Netzwerkfehlern und 5xx
+    Dateien sind nur während des jeweiligen Versuchs geöffnet. Eine 200-Antwort mit
+    "error" im JSON (NodeODM meldet Fehler so) gilt als endgültiger Fehler.
+    """
+    for attempt in range(retries + 1):
+        files = [
+            ("images", (image_file.name, open(image_file, "rb"), "image/jpeg"))
+            for image_file in batch
+        ]
+        try:
+            response = await client.post(url, files=files, timeout=httpx.Timeout(300.0, connect=10.0))
+            if response.status_code == 200:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = None
+                if isinstance(body, dict) and body.get("error"):
+                    raise Exception(f"{service} Bild-Upload fehlgeschlagen: {body['error']}")
+                return
+            if response.status_code < 500:
+                raise Exception(f"{service} Bild-Upload fehlgeschlagen: {response.status_code}")
+            error = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            error = str(e) or type(e).__name__
+        finally:
+            # Dateien schließen
+            for _, (_, file_obj, _) in files:
+                file_obj.close()
+
+        if attempt < retries:
+            delay = 2 ** attempt
+            logger.warning(f"{service} Bild-Upload fehlgeschlagen ({error}), "
+                           f"neuer Versuch in {delay}s ({attempt + 1}/{retries})")
+            await asyncio.sleep(delay)
+
+    raise Exception(f"{service} Bild-Upload nach {retries + 1} Versuchen fehlgeschlagen: {error}")
+
+
+_backends: Dict[str, ProcessingBackend] = {}
+
+
+def get_processing_backend(name: Optional[str] = None) -> ProcessingBackend:
+    """Backend-Instanz nach Name (Standard: PROCESSING_BACKEND)"""
+    name = name or PROCESSING_BACKEND
+    if name not in _backends:
+        if name == "webodm":
+            from services.webodm_backend import WebODMBackend
+            _backends[name] = WebODMBackend()
+        elif name == "nodeodm":
+            from services.nodeodm_backend import NodeODMBackend
+            _backends[name] = NodeODMBackend()
+        elif name == "cli":
+            from services.cli_backend import CLIBackend
+            _backends[name] = CLIBackend()
+        else:
+            raise ValueError(f"Unbekanntes Verarbeitungs-Backend: {name}")
+    return _backends[name]
+
+
+def active_backends() -> List[ProcessingBackend]:
+    """Bereits verwendete Backend-Instanzen (für Monitoring und Shutdown)"""
+    return list(_backends.values())
+
+
+async def close_processing_backends():
+    for backend in active_backends():
+        close = getattr(backend, "close", None)
+        if close is not None:
+            await close()
@@ -5,16 +5,30 @@ Verwaltet gleichzeitige Verarbeitungsanfragen mit parallelen WebODM-CLI Instanze
 
 import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 import json
 import os
+import uuid
 from pathlib import Path
 
+from services.admission import AdmissionController, estimate_task
+from services.cli_supervisor import is_active as is_supervisor_active, read_state, state_path, terminate
+from services.odm_progress import checkpoint_path, read_checkpoint, rerun_from_stage
+from services.resource_allocator import ResourceAllocator
+
 logger = logging.getLogger(__name__)
 
+# SystemConfig-Schlüssel, in die tools/calibrate_processing.py die Empfehlung schreibt
+CALIBRATED_INSTANCES_KEY = "processing_max_concurrent_jobs"
+CALIBRATED_THREADS_KEY = "processing_threads_per_instance"
+
+# Wie oft eine nach Server-Neustart unterbrochene Task fortgesetzt wird, bevor sie fehlschlägt
+_env_max_resumes = os.getenv("QUEUE_MAX_RESUMES")
+QUEUE_MAX_RESUMES = int(_env_max_resumes) if _env_max_resumes and _env_max_resumes.isdigit() else 3
+
 class QueueStatus(Enum):
     QUEUED = "queued"
     RUNNING = "running" 
@@ -40,6 +54,12 @@ class ProcessingTask:
     progress: int = 0
     error_message: Optional[str] = None
     instance_id: Optional[str] = None
+    staging: Optional[Dict] = None  # Staging-Statistik (bytes_saved usw.)
+    processing_node: Optional[str] = None  # Knoten, auf dem die Task läuft
+    resources: Optional[Dict] = None  # Zugeteilte Kerne/Speicher (ResourceSlot)
+    estimate: Optional[Dict] = None  # Geschätzter Spitzenbedarf (TaskEstimate)
+    checkpoint_stage: Optional[str] = None  # Zuletzt abgeschlossene ODM-Stufe
+    resume_count: int = 0  # Fortsetzungen nach Server-Neustart
     
     def __post_init__(self):
         if self.created_at is None:
@@ -53,7 +73,8 @@ class ProcessingQueueManager:
         if max_concurrent_jobs is None:
             # Zuerst aus .env-Datei versuchen
             env_instances = os.getenv("MAX_WEBODM_INSTANCES")
-            if env_instances and env_instances.isdigit():
+            self.instances_configured = bool(env_instances and env_instances.isdigit())
+            if self.instances_configured:
                 self.max_concurrent_jobs = int(env_instances)
             else:
                 # Fallback: Automatische Erkennung basierend auf Hardware
@@ -61,13 +82,21 @@ class ProcessingQueueManager:
                 self.max_concurrent_jobs = max(1, min(cpu_count // 2, 8))
         else:
             self.max_concurrent_jobs = max_concurrent_jobs
+            self.instances_configured = True
             
         self.max_queue_size = max_queue_size
         
+        # Kerne und Speicher auf die parallelen Instanzen aufteilen
+        self.resources = ResourceAllocator(self.max_concurrent_jobs)
+        # Start nur bei genügend projiziertem RAM und Temp-Platz
+        self.admission = AdmissionController()
+        
         # Queue-Verwaltung
         self.queue: List[ProcessingTask] = []
         self.running_tasks: Dict[str, ProcessingTask] = {}
         self.completed_tasks: Dict[str, ProcessingTask] = {}
+        # Laufende Tasks, deren Instanz auf Wunsch des Besitzers beendet wird
+        self.cancelling: Set[str] = set()
         
         # Locks für Thread-Sicherheit
         self.queue_lock = asyncio.Lock()
@@ -86,12 +115,47 @@ class ProcessingQueueManager:
             return
             
         self.is_running = True
+        self.load_calibration()
         await self.load_queue_state()
         
         # Worker-Task starten
         self.worker_task = asyncio.create_task(self._queue_worker())
         logger.info(f"Processing Queue Manager gestartet (max {self.max_concurrent_jobs} parallele WebODM-CLI Instanzen)")
         
+    def load_calibration(self):
+        """
+        Übernimmt das Ergebnis von tools/calibrate_processing.py aus der SystemConfig
+        MAX_WEBODM_INSTANCES hat Vorrang vor der kalibrierten Instanzanzahl
+        """
+        from database.database import get_database
+        from database.models import SystemConfig
+
+        try:
+            db = get_database()
+            try:
+                configs = {
+                    config.key: config.value
+                    for config in db.query(SystemConfig).filter(
+                        SystemConfig.key.in_([CALIBRATED_INSTANCES_KEY, CALIBRATED_THREADS_KEY])
+                    )
+                }
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"Kalibrierung nicht lesbar: {e}")
+            return
+
+        instances = configs.get(CALIBRATED_INSTANCES_KEY) or ""
+        threads = configs.get(CALIBRATED_THREADS_KEY) or ""
+        if instances.isdigit() and int(instances) > 0 and not self.instances_configured:
+            self.max_concurrent_jobs = int(instances)
+        self.resources.configure(
+            self.max_concurrent_jobs, int(threads) if threads.isdigit() else None
+        )
+        if instances or threads:
+            threads_info = f"{threads} Threads pro Instanz" if threads else "Threads nach Slot-Größe"
+            logger.info(f"Kalibrierung übernommen: {self.max_concurrent_jobs} Instanzen, {threads_info}")
+
     async def stop(self):
         """Stoppt den Queue-Manager"""
         self.is_running = False
@@ -115,13 +179,17 @@ class ProcessingQueueManager:
         Returns:
             task_id: Eindeutige Task-ID
         """
+        # Spitzenbedarf vorab schätzen (liest Bild-Header, daher im Thread-Pool)
+        loop = asyncio.get_running_loop()
+        estimate = await loop.run_in_executor(None, estimate_task, images_path, options)
+        
         async with self.queue_lock:
             # Queue-Größe prüfen
             if len(self.queue) >= self.max_queue_size:
                 raise Exception(f"Queue ist voll (max {self.max_queue_size} Tasks)")
                 
-            # Task-ID generieren
-            task_id = f"task_{project_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            # Task-ID generieren; Projekt-IDs wiederholen sich zwischen Resellern, daher mit Zufallsanteil
+            task_id = f"task_{project_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
             
             # Task erstellen
             task = ProcessingTask(
@@ -132,7 +200,8 @@ class ProcessingQueueManager:
                 project_path=project_path,
                 images_path=images_path,
                 options=options or {},
-                priority=priority
+                priority=priority,
+                estimate=estimate.to_dict()
             )
             
             # Zur Queue hinzufügen (nach Priorität sortiert)
@@ -168,6 +237,17 @@ class ProcessingQueueManager:
             
         return None
         
+    def get_task(self, task_id: str) -> Optional[ProcessingTask]:
+        """Liefert die Task selbst (wartend, laufend oder abgeschlossen)"""
+        if task_id in self.running_tasks:
+            return self.running_tasks[task_id]
+        if task_id in self.completed_tasks:
+            return self.completed_tasks[task_id]
+        for task in self.queue:
+            if task.task_id == task_id:
+                return task
+        return None
+        
     async def cancel_task(self, task_id: str, user_id: int) -> bool:
         """Bricht eine Task ab (nur vom Besitzer)"""
         # In Queue suchen und entfernen
@@ -181,9 +261,20 @@ class ProcessingQueueManager:
                     logger.info(f"Task {task_id} abgebrochen")
                     return True
                     
-        # Laufende Tasks können nicht abgebrochen werden
-        # (WebODM-CLI unterstützt kein graceful cancellation)
-        return False
+        # Laufende Tasks: der Supervisor beendet den CLI-Prozess (SIGTERM), _process_task
+        # schließt die Task danach als abgebrochen ab
+        async with self.running_lock:
+            task = self.running_tasks.get(task_id)
+            if task is None or task.user_id != user_id or not task.instance_id:
+                return False
+            supervisor_state = read_state(state_path(task.project_path, task.instance_id))
+            if not is_supervisor_active(supervisor_state):
+                # Instanz noch nicht gestartet oder bereits beendet
+                return False
+            self.cancelling.add(task_id)
+            terminate(supervisor_state)
+            logger.info(f"Task {task_id} wird abgebrochen (Instanz {task.instance_id})")
+            return True
         
     async def get_queue_info(self) -> Dict:
         """Ruft Informationen über die Queue ab"""
@@ -194,12 +285,15 @@ class ProcessingQueueManager:
                     "running_jobs": len(self.running_tasks),
                     "max_concurrent_jobs": self.max_concurrent_jobs,
                     "max_queue_size": self.max_queue_size,
+                    "resources": self.resources.stats(),
+                    "admission": self.admission.stats(),
                     "next_tasks": [
                         {
                             "task_id": task.task_id,
                             "project_id": task.project_id,
                             "created_at": task.created_at.isoformat(),
-                            "priority": task.priority
+                            "priority": task.priority,
+                            "estimate": task.estimate
                         }
                         for task in self.queue[:5]  # Nächste 5 Tasks
                     ]
@@ -215,17 +309,21 @@ class ProcessingQueueManager:
                         await asyncio.sleep(5)
                         continue
                         
-                # Nächste Task aus Queue holen
+                # Nächste zulässige Task aus Queue holen (vorderste oder Backfill)
                 next_task = None
                 async with self.queue_lock:
                     if self.queue:
-                        next_task = self.queue.pop(0)
+                        index = self.admission.select(
+                            self.queue, list(self.running_tasks.values()), self.resources.task_rss()
+                        )
+                        if index is not None:
+                            next_task = self.queue.pop(index)
                         
                 if next_task:
                     # Task starten
                     await self._start_task(next_task)
                 else:
-                    # Keine Tasks in Queue, kurz warten
+                    # Keine (zulässige) Task in der Queue, kurz warten
                     await asyncio.sleep(2)
                     
             except Exception as e:
@@ -235,8 +333,11 @@ class ProcessingQueueManager:
     async def _start_task(self, task: ProcessingTask):
         """Startet eine einzelne Verarbeitungsaufgabe"""
         try:
-            # Eindeutige Instanz-ID generieren
-            task.instance_id = f"inst_{task.task_id.split('_')[-1]}"
+            # Eindeutige Instanz-ID generieren; fortgesetzte Tasks behalten ihre Verzeichnisse
+            if not task.instance_id:
+                task.instance_id = f"inst_{task.task_id.split('_')[-1]}"
+            task.processing_node = "local"
+            task.resources = self.resources.allocate(task.task_id).to_dict()
             
             # Task zu laufenden Tasks hinzufügen
             async with self.running_lock:
@@ -253,25 +354,58 @@ class ProcessingQueueManager:
             logger.error(f"Fehler beim Starten der Task {task.task_id}: {e}")
             await self._complete_task(task.task_id, QueueStatus.FAILED, str(e))
             
-    async def _process_task(self, task: ProcessingTask):
-        """Führt die WebODM-CLI Verarbeitung mit paralleler Instanz aus"""
+    async def _process_task(self, task: ProcessingTask, reattach: bool = False):
+        """
+        Führt die WebODM-CLI Verarbeitung mit paralleler Instanz aus
+        reattach: Instanz läuft bereits unter ihrem Supervisor (Backend-Neustart)
+        """
         try:
             from services.webodm_cli_service import get_webodm_cli_service
             
             webodm_service = await get_webodm_cli_service()
             
-            logger.info(f"Starte WebODM-CLI Instanz {task.instance_id} für Task {task.task_id}")
+            async def on_checkpoint(stage: str):
+                task.checkpoint_stage = stage
+                await self.save_queue_state()
+            
+            if reattach:
+                result = await webodm_service.attach_instance(
+                    project_path=task.project_path,
+                    instance_id=task.instance_id,
+                    resources=self.resources.slot_for(task.task_id),
+                    on_progress=lambda progress, stage: setattr(task, "progress", progress),
+                    on_checkpoint=on_checkpoint,
+                    task_id=task.task_id
+                )
+                if result is None:
+                    raise Exception(f"Supervisor der Instanz {task.instance_id} nicht mehr vorhanden")
+            else:
+                logger.info(f"Starte WebODM-CLI Instanz {task.instance_id} für Task {task.task_id}")
+                
+                # WebODM-CLI Verarbeitung mit Instanz-ID starten
+                result = await webodm_service.process_images(
+                    project_path=task.project_path,
+                    images_path=task.images_path,
+                    options=task.options,
+                    instance_id=task.instance_id,
+                    resources=self.resources.slot_for(task.task_id),
+                    on_progress=lambda progress, stage: setattr(task, "progress", progress),
+                    resume_after=task.checkpoint_stage,
+                    on_checkpoint=on_checkpoint,
+                    task_id=task.task_id
+                )
             
-            # WebODM-CLI Verarbeitung mit Instanz-ID starten
-            result = await webodm_service.process_images(
-                project_path=task.project_path,
-                images_path=task.images_path,
-                options=task.options,
-                instance_id=task.instance_id
-            )
+            task.staging = result.get("staging")
+            if task.staging:
+                logger.info(
+                    f"Task {task.task_id}: {task.staging['bytes_saved']} bytes durch Staging eingespart"
+                )
             
             # Ergebnis verarbeiten
-            if result["status"] == "completed":
+            if task.task_id in self.cancelling:
+                await self._complete_task(task.task_id, QueueStatus.CANCELLED, "Vom Benutzer abgebrochen")
+                logger.info(f"WebODM-CLI Instanz {task.instance_id} abgebrochen")
+            elif result["status"] == "completed":
                 await self._complete_task(task.task_id, QueueStatus.COMPLETED)
                 
                 # Aufräumen (behält Ergebnisse, löscht Temp-Dateien)
@@ -290,12 +424,15 @@ class ProcessingQueueManager:
         except Exception as e:
             logger.error(f"Fehler bei Task-Verarbeitung {task.task_id} (Instanz {task.instance_id}): {e}")
             await self._complete_task(task.task_id, QueueStatus.FAILED, str(e))
+        finally:
+            self.cancelling.discard(task.task_id)
             
     async def _complete_task(self, task_id: str, status: QueueStatus, error_message: str = None):
         """Schließt eine Task ab"""
         async with self.running_lock:
             if task_id in self.running_tasks:
                 task = self.running_tasks.pop(task_id)
+                self.resources.release(task_id)
                 task.status = status
                 task.completed_at = datetime.now()
                 task.error_message = error_message
@@ -345,16 +482,34 @@ class ProcessingQueueManager:
             "started_at": task.started_at.isoformat() if task.started_at else None,
             "completed_at": task.completed_at.isoformat() if task.completed_at else None,
             "error_message": task.error_message,
-            "instance_id": task.instance_id
+            "instance_id": task.instance_id,
+            "staging": task.staging,
+            "processing_node": task.processing_node,
+            "resources": task.resources,
+            "estimate": task.estimate,
+            "checkpoint_stage": task.checkpoint_stage,
+            "resume_count": task.resume_count
+        }
+        
+    def _task_to_state(self, task: ProcessingTask) -> Dict:
+        """Task für die Queue-Datei: inkl. Pfaden und Optionen, die die API nicht ausgibt"""
+        return {
+            **self._task_to_dict(task),
+            "reseller_id": task.reseller_id,
+            "user_id": task.user_id,
+            "project_path": task.project_path,
+            "images_path": task.images_path,
+            "options": task.options,
+            "priority": task.priority
         }
         
     async def save_queue_state(self):
         """Speichert Queue-Status in Datei"""
         try:
             state = {
-                "queue": [self._task_to_dict(task) for task in self.queue],
-                "running": [self._task_to_dict(task) for task in self.running_tasks.values()],
-                "completed": [self._task_to_dict(task) for task in list(self.completed_tasks.values())[-100:]]  # Nur letzte 100
+                "queue": [self._task_to_state(task) for task in self.queue],
+                "running": [self._task_to_state(task) for task in self.running_tasks.values()],
+                "completed": [self._task_to_state(task) for task in list(self.completed_tasks.values())[-100:]]  # Nur letzte 100
             }
             
             with open(self.queue_file, 'w') as f:
@@ -377,24 +532,84 @@ class ProcessingQueueManager:
                 task = self._dict_to_task(task_data)
                 self.queue.append(task)
                 
-            # Laufende Tasks als fehlgeschlagen markieren (Server-Neustart)
+            # Laufende Tasks: an weiterlaufende Instanzen anhängen, sonst ab der letzten
+            # abgeschlossenen Stufe fortsetzen (Server-Neustart)
             for task_data in state.get("running", []):
                 task = self._dict_to_task(task_data)
-                task.status = QueueStatus.FAILED
-                task.error_message = "Server-Neustart während Verarbeitung"
-                task.completed_at = datetime.now()
-                self.completed_tasks[task.task_id] = task
+                if self._reattach_task(task):
+                    continue
+                if self._resume_task(task):
+                    self.queue.append(task)
+                else:
+                    task.status = QueueStatus.FAILED
+                    task.error_message = "Server-Neustart während Verarbeitung"
+                    task.completed_at = datetime.now()
+                    self.completed_tasks[task.task_id] = task
+            self.queue.sort(key=lambda t: (-t.priority, t.created_at))
                 
             # Abgeschlossene Tasks wiederherstellen
             for task_data in state.get("completed", []):
                 task = self._dict_to_task(task_data)
                 self.completed_tasks[task.task_id] = task
                 
-            logger.info(f"Queue-Status geladen: {len(self.queue)} wartende Tasks")
+            logger.info(f"Queue-Status geladen: {len(self.queue)} wartende Tasks, "
+                        f"{len(self.running_tasks)} laufende Instanzen wieder aufgenommen")
             
         except Exception as e:
             logger.error(f"Fehler beim Laden des Queue-Status: {e}")
             
+    def _reattach_task(self, task: ProcessingTask) -> bool:
+        """
+        Übernimmt eine Task, deren Instanz unter ihrem Supervisor weiterläuft oder seit dem
+        Neustart beendet wurde; Fortschritt und Ergebnis liest attach_instance aus deren Dateien
+        """
+        if not task.instance_id or not task.project_path:
+            return False
+        supervisor_state = read_state(state_path(task.project_path, task.instance_id))
+        if supervisor_state is None:
+            return False
+        if supervisor_state.get("status") != "exited" and not is_supervisor_active(supervisor_state):
+            return False
+
+        # Möglichst den Slot, an dessen Kerne die Instanz noch gebunden ist
+        previous_slot = (task.resources or {}).get("index")
+        task.resources = self.resources.allocate(task.task_id, previous_slot).to_dict()
+        task.status = QueueStatus.RUNNING
+        self.running_tasks[task.task_id] = task
+        logger.info(f"Task {task.task_id}: Instanz {task.instance_id} läuft weiter, wird wieder aufgenommen")
+        asyncio.create_task(self._process_task(task, reattach=True))
+        return True
+        
+    def _resume_task(self, task: ProcessingTask) -> bool:
+        """
+        Bereitet eine durch Neustart unterbrochene Task zum erneuten Einreihen vor
+        Output-/Temp-Verzeichnisse der Instanz bleiben erhalten; process_images setzt
+        mit --rerun-from hinter checkpoint_stage fort (ohne Checkpoint von vorn)
+        """
+        if not task.project_path or not Path(task.project_path).is_dir():
+            return False
+        if not task.images_path or not Path(task.images_path).is_dir():
+            return False
+        if task.resume_count >= QUEUE_MAX_RESUMES:
+            logger.warning(f"Task {task.task_id} bereits {task.resume_count}x fortgesetzt, wird nicht erneut gestartet")
+            return False
+
+        # Die Checkpoint-Datei der Instanz ist aktueller als die Queue-Datei
+        if task.instance_id:
+            task.checkpoint_stage = read_checkpoint(
+                checkpoint_path(task.project_path, task.instance_id)
+            ) or task.checkpoint_stage
+
+        task.resume_count += 1
+        task.status = QueueStatus.QUEUED
+        task.started_at = None
+        task.error_message = None
+        task.resources = None
+        rerun_from = rerun_from_stage(task.checkpoint_stage)
+        logger.info(f"Task {task.task_id} wird nach Neustart fortgesetzt "
+                    f"({'ab ' + rerun_from if rerun_from else 'von vorn'}, Versuch {task.resume_count})")
+        return True
+        
     def _dict_to_task(self, data: Dict) -> ProcessingTask:
         """Konvertiert Dictionary zu Task"""
         return ProcessingTask(
@@ -405,13 +620,20 @@ class ProcessingQueueManager:
             project_path=data.get("project_path", ""),
             images_path=data.get("images_path", ""),
             options=data.get("options", {}),
+            priority=data.get("priority", 0),
             created_at=datetime.fromisoformat(data["created_at"]),
             started_at=datetime.fromisoformat(data["started_at"]) if data.get("started_at") else None,
             completed_at=datetime.fromisoformat(data["completed_at"]) if data.get("completed_at") else None,
             status=QueueStatus(data["status"]),
             progress=data.get("progress", 0),
             error_message=data.get("error_message"),
-            instance_id=data.get("instance_id")
+            instance_id=data.get("instance_id"),
+            staging=data.get("staging"),
+            processing_node=data.get("processing_node"),
+            resources=data.get("resources"),
+            estimate=data.get("estimate"),
+            checkpoint_stage=data.get("checkpoint_stage"),
+            resume_count=data.get("resume_count", 0)
         )
 
 
@@ -0,0 +1,247 @@
+"""
+Ressourcen-Zuteilung für parallele WebODM-CLI-Instanzen
+Teilt CPU-Kerne und Arbeitsspeicher in feste Slots, eine Instanz pro Slot
+
+Ohne Zuteilung startet jede Instanz mit --max-concurrency auto und nutzt alle Kerne;
+parallele Instanzen verdrängen sich dann gegenseitig und der Rechner lagert aus.
+Jeder Slot erhält einen zusammenhängenden Block von Kernen (Basis: die eigene
+CPU-Affinität, abzüglich CLI_RESERVED_CORES für API und Datenbank) und den
+entsprechenden Anteil am Speicher (cgroup-v2-Limit des Containers oder MemTotal,
+abzüglich CLI_RESERVED_MEMORY_MB). Die Instanz bekommt --max-concurrency mit der
+Kernzahl ihres Slots und wird per sched_setaffinity auf diese Kerne gebunden (durch
+ihren Supervisor, services/cli_supervisor.py, vor dem Start des CLI-Prozesses).
+
+Speicherlimits werden nur gesetzt, wenn unter CLI_CGROUP_ROOT (Standard
+/sys/fs/cgroup/chiliview) eine cgroup mit Memory-Controller angelegt werden kann,
+z.B. bei delegierter cgroup oder als root. Sonst bleibt es bei der CPU-Aufteilung.
+"""
+
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CGROUP_MOUNT = Path("/sys/fs/cgroup")
+
+MB = 1024 * 1024
+
+
+def _env_int(name: str, default: int) -> int:
+    env_value = os.getenv(name)
+    if env_value and env_value.isdigit():
+        return int(env_value)
+    return default
+
+
+def _available_cpus() -> List[int]:
+    """Kerne, auf denen dieser Prozess laufen darf"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _available_memory() -> int:
+    """Speicherlimit der eigenen cgroup (v2), sonst physischer Speicher, in Bytes"""
+    try:
+        cgroup_path = Path("/proc/self/cgroup").read_text().strip().split("::", 1)[1]
+        limit = (CGROUP_MOUNT / cgroup_path.lstrip("/") / "memory.max").read_text().strip()
+        if limit.isdigit():
+            return int(limit)
+    except (OSError, IndexError):
+        pass
+
+    try:
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemTotal:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def process_tree_rss(root_pid: int, include_root: bool = True) -> int:
+    """Summe des RSS eines Prozesses und aller Nachfahren in Bytes (Linux /proc)"""
+    parents: Dict[int, int] = {}
+    rss: Dict[int, int] = {}
+    try:
+        entries = list(os.scandir("/proc"))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/status") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+            pid = int(entry.name)
+            parents[pid] = int(fields.get("PPid", "0").strip())
+            rss[pid] = int(fields.get("VmRSS", "0 kB").split()[0]) * 1024
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total = rss.get(root_pid, 0) if include_root else 0
+    for pid, pid_rss in rss.items():
+        parent = parents.get(pid)
+        while parent and parent != root_pid:
+            parent = parents.get(parent)
+        if parent == root_pid and pid != root_pid:
+            total += pid_rss
+    return total
+
+
+@dataclass
+class ResourceSlot:
+    """CPU- und Speicheranteil einer Instanz"""
+    index: int
+    cpus: List[int]
+    memory_bytes: int
+    cgroup: Optional[str] = None
+    task_id: Optional[str] = field(default=None, compare=False)
+    max_threads: Optional[int] = None  # Kalibrierte Threads pro Instanz
+    pid: Optional[int] = None  # Supervisor der Instanz, sobald gestartet
+
+    @property
+    def threads(self) -> int:
+        threads = max(len(self.cpus), 1)
+        if self.max_threads:
+            threads = min(threads, self.max_threads)
+        return threads
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["threads"] = self.threads
+        data["memory_mb"] = self.memory_bytes // MB
+        return data
+
+
+class ResourceAllocator:
+    """Verwaltet die Slots für die Processing Queue"""
+
+    def __init__(self, slot_count: int = 1, cpus: Optional[List[int]] = None,
+                 memory_bytes: Optional[int] = None, cgroup_root: Optional[str] = None):
+        reserved_cores = _env_int("CLI_RESERVED_CORES", 0)
+        all_cpus = cpus if cpus is not None else _available_cpus()
+        # Mindestens ein Kern bleibt für die Instanzen
+        self.cpus = all_cpus[reserved_cores:] if reserved_cores < len(all_cpus) else all_cpus[-1:]
+
+        total_memory = memory_bytes if memory_bytes is not None else _available_memory()
+        reserved_memory = _env_int("CLI_RESERVED_MEMORY_MB", 1024) * MB
+        self.memory_bytes = max(total_memory - reserved_memory, total_memory // 2)
+
+        self.cgroup_root = Path(cgroup_root or os.getenv("CLI_CGROUP_ROOT", str(CGROUP_MOUNT / "chiliview")))
+        self.cgroups_enabled: Optional[bool] = None  # wird beim ersten Bedarf geprüft
+
+        self.slots: List[ResourceSlot] = []
+        self.assigned: Dict[str, ResourceSlot] = {}
+        self.threads_per_slot: Optional[int] = None
+        self.configure(slot_count)
+
+    def configure(self, slot_count: int, threads_per_slot: Optional[int] = None):
+        """
+        Teilt Kerne und Speicher neu auf (z.B. nach Änderung von max_concurrent_jobs)
+        threads_per_slot begrenzt --max-concurrency zusätzlich (Kalibrierung);
+        laufende Instanzen behalten ihren bisherigen Slot bis zum Ende
+        """
+        slot_count = max(slot_count, 1)
+        if threads_per_slot is not None:
+            self.threads_per_slot = threads_per_slot or None
+        cpu_count = len(self.cpus)
+        slots = []
+        if slot_count <= cpu_count:
+            # Zusammenhängende Blöcke, die ersten Slots erhalten überzählige Kerne
+            base, extra = divmod(cpu_count, slot_count)
+            start = 0
+            for index in range(slot_count):
+                size = base + (1 if index < extra else 0)
+                slots.append(ResourceSlot(index, self.cpus[start:start + size], self.memory_bytes // slot_count))
+                start += size
+        else:
+            # Mehr Instanzen als Kerne: je ein Kern, reihum geteilt
+            for index in range(slot_count):
+                slots.append(ResourceSlot(index, [self.cpus[index % cpu_count]], self.memory_bytes // slot_count))
+
+        for slot in slots:
+            slot.max_threads = self.threads_per_slot
+        self.slots = slots
+        logger.info(f"Ressourcen-Zuteilung: {slot_count} Slots à {slots[0].threads} Kerne, "
+                    f"{slots[0].memory_bytes // MB} MB")
+
+    def allocate(self, task_id: str, preferred_index: Optional[int] = None) -> ResourceSlot:
+        """
+        Freien Slot für eine Task belegen
+        preferred_index: Slot, an den eine wieder aufgenommene Instanz noch gebunden ist
+        """
+        if task_id in self.assigned:
+            return self.assigned[task_id]
+
+        busy = {slot.index for slot in self.assigned.values()}
+        free = [slot for slot in self.slots if slot.index not in busy]
+        free.sort(key=lambda slot: slot.index != preferred_index)
+        # Mehr Tasks als Slots sollte die Queue verhindern; dann den ersten Slot teilen
+        template = free[0] if free else self.slots[0]
+
+        slot = ResourceSlot(template.index, list(template.cpus), template.memory_bytes,
+                            task_id=task_id, max_threads=template.max_threads)
+        if self._cgroups_available():
+            slot.cgroup = self._prepare_cgroup(slot)
+        self.assigned[task_id] = slot
+        return slot
+
+    def release(self, task_id: str):
+        self.assigned.pop(task_id, None)
+
+    def slot_for(self, task_id: str) -> Optional[ResourceSlot]:
+        return self.assigned.get(task_id)
+
+    def task_rss(self) -> Dict[str, int]:
+        """Aktueller RSS der laufenden Instanzen je Task-ID"""
+        return {
+            task_id: process_tree_rss(slot.pid)
+            for task_id, slot in self.assigned.items()
+            if slot.pid is not None
+        }
+
+    def _cgroups_available(self) -> bool:
+        if self.cgroups_enabled is None:
+            self.cgroups_enabled = self._setup_cgroup_root()
+        return self.cgroups_enabled
+
+    def _setup_cgroup_root(self) -> bool:
+        controllers = CGROUP_MOUNT / "cgroup.controllers"
+        try:
+            if not controllers.exists() or "memory" not in controllers.read_text().split():
+                logger.info("cgroup v2 mit Memory-Controller nicht verfügbar, nur CPU-Aufteilung")
+                return False
+            self.cgroup_root.mkdir(exist_ok=True)
+            (self.cgroup_root / "cgroup.subtree_control").write_text("+memory")
+            return True
+        except OSError as e:
+            logger.info(f"cgroup {self.cgroup_root} nicht nutzbar ({e}), nur CPU-Aufteilung")
+            return False
+
+    def _prepare_cgroup(self, slot: ResourceSlot) -> Optional[str]:
+        path = self.cgroup_root / f"slot_{slot.index}"
+        try:
+            path.mkdir(exist_ok=True)
+            (path / "memory.max").write_text(str(slot.memory_bytes))
+            # Nicht auslagern: lieber gezielt an der Grenze scheitern als den Rechner lähmen
+            swap_max = path / "memory.swap.max"
+            if swap_max.exists():
+                swap_max.write_text("0")
+            return str(path)
+        except OSError as e:
+            logger.warning(f"cgroup für Slot {slot.index} nicht einrichtbar: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cpus": len(self.cpus),
+            "memory_mb": self.memory_bytes // MB,
+            "cgroups_enabled": bool(self.cgroups_enabled),
+            "threads_per_slot": self.threads_per_slot,
+            "slots": [slot.to_dict() for slot in self.slots],
+            "assigned": {task_id: slot.to_dict() for task_id, slot in self.assigned.items()}
+        }
@@ -0,0 +1,141 @@
+"""
+Virenscan-Verdict-Cache für ChiliView
+Überspringt den Scan für Inhalte, die mit derselben ClamAV-Signaturversion bereits sauber waren
+
+Schlüssel ist (SHA-256, Signatur-DB-Version). Vor der Reseller-Datenbank
+(virus_scan_results, Index auf file_hash + signature_version) liegt ein prozessweiter LRU.
+Ändert sich die Signaturversion, wird der LRU geleert; alte Datenbankeinträge passen
+durch den Versionsschlüssel automatisch nicht mehr.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from database.models import VirusScanResult
+
+logger = logging.getLogger(__name__)
+
+
+def _configured_cache_size() -> int:
+    """Maximale Anzahl LRU-Einträge (VIRUS_SCAN_CACHE_SIZE)"""
+    env_size = os.getenv("VIRUS_SCAN_CACHE_SIZE")
+    if env_size and env_size.isdigit():
+        return int(env_size)
+    return 100000
+
+
+class ScanVerdictCache:
+    """
+    Zweistufiger Cache für saubere Scan-Ergebnisse (LRU im Prozess, Reseller-DB dahinter)
+    Der LRU ist pro Reseller getrennt, damit keine Information zwischen Mandanten durchsickert
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.signature_version: Optional[str] = None
+        self._entries: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Statistik für Monitoring
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def observe_signature_version(self, signature_version: Optional[str]):
+        """Leert den LRU, sobald clamd eine neue Signaturversion meldet"""
+        if not signature_version:
+            return
+        with self._lock:
+            if signature_version != self.signature_version:
+                if self.signature_version is not None:
+                    logger.info(
+                        f"ClamAV-Signaturen aktualisiert ({self.signature_version} -> "
+                        f"{signature_version}), Verdict-Cache geleert"
+                    )
+                self._entries.clear()
+                self.signature_version = signature_version
+
+    def lookup(self, reseller_db, reseller_id: str, sha256: str,
+               signature_version: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Liefert ein gecachtes sauberes Ergebnis oder None
+        Muss im Thread der reseller_db-Session aufgerufen werden
+        """
+        if not signature_version:
+            return None
+
+        self.observe_signature_version(signature_version)
+        key = (reseller_id, sha256, signature_version)
+
+        with self._lock:
+            engine_version = self._entries.get(key)
+            if engine_version is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        if engine_version is None:
+            record = reseller_db.query(VirusScanResult.scan_engine_version).filter(
+                VirusScanResult.file_hash == sha256,
+                VirusScanResult.signature_version == signature_version,
+                VirusScanResult.is_clean == True
+            ).first()
+
+            if record is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            engine_version = record.scan_engine_version
+            self._remember(key, engine_version)
+            with self._lock:
+                self.db_hits += 1
+
+        return {
+            "is_clean": True,
+            "threat_name": None,
+            "scan_engine_version": engine_version
+        }
+
+    def store(self, reseller_id: str, sha256: str, signature_version: Optional[str],
+              scan_result: Dict[str, Any]):
+        """Merkt sich ein sauberes Ergebnis (Fehler und Funde werden nie gecacht)"""
+        if not signature_version or not scan_result.get("is_clean"):
+            return
+        self.observe_signature_version(signature_version)
+        self._remember((reseller_id, sha256, signature_version), scan_result["scan_engine_version"])
+
+    def _remember(self, key: Tuple[str, str, str], engine_version: str):
+        with self._lock:
+            # Ergebnisse einer inzwischen veralteten Signaturversion nicht aufnehmen
+            if key[2] != self.signature_version:
+                return
+            self._entries[key] = engine_version
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "signature_version": self.signature_version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses
+            }
+
+
+_scan_cache: Optional[ScanVerdictCache] = None
+_scan_cache_lock = threading.Lock()
+
+
+def get_scan_cache() -> ScanVerdictCache:
+    """Prozessweite ScanVerdictCache-Instanz"""
+    global _scan_cache
+    with _scan_cache_lock:
+        if _scan_cache is None:
+            _scan_cache = ScanVerdictCache(_configured_cache_size())
+        return _scan_cache
@@ -0,0 +1,172 @@
+"""
+Staging von Eingabebildern für ChiliView
+Stellt Upload-Dateien im Instanz-Verzeichnis eines WebODM-CLI Projekts bereit, ohne sie zu kopieren
+
+Reihenfolge im Modus "auto": Reflink (Copy-on-Write, z.B. Btrfs/XFS), dann Hardlink,
+Kopie nur, wenn beides scheitert (anderes Dateisystem, fehlende Rechte). Reflinks sind
+unabhängige Dateien; Hardlinks teilen den Inode mit der Upload-Datei, WebODM liest die
+Eingabebilder aber nur. Scheitert ein Verfahren für ein Gerätepaar mit "nicht unterstützt",
+wird es für dieses Paar nicht erneut versucht.
+"""
+
+import errno
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Set, Tuple
+
+# FICLONE gibt es nur unter Linux
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# ioctl FICLONE aus linux/fs.h
+FICLONE = 0x40049409
+
+STAGING_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# Fehler, nach denen ein Verfahren für das Gerätepaar dauerhaft als nicht verfügbar gilt
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS}
+if hasattr(errno, "ENOTSUP"):
+    _UNSUPPORTED_ERRNOS.add(errno.ENOTSUP)
+
+
+def _configured_staging_mode() -> str:
+    """Staging-Verfahren (IMAGE_STAGING_MODE: auto, reflink, hardlink, copy)"""
+    mode = os.getenv("IMAGE_STAGING_MODE", "auto").strip().lower()
+    if mode not in STAGING_MODES:
+        logger.warning(f"Unbekannter IMAGE_STAGING_MODE '{mode}', verwende 'auto'")
+        return "auto"
+    return mode
+
+
+IMAGE_STAGING_MODE = _configured_staging_mode()
+
+
+@dataclass
+class StagingResult:
+    """Ergebnis des Stagings eines Bildverzeichnisses"""
+    target_path: Path
+    files: int = 0
+    bytes_total: int = 0
+    bytes_by_method: Dict[str, int] = field(
+        default_factory=lambda: {"reflink": 0, "hardlink": 0, "copy": 0, "existing": 0}
+    )
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes, die nicht zusätzlich auf der Platte belegt werden"""
+        return self.bytes_total - self.bytes_by_method["copy"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "target_path": str(self.target_path),
+            "files": self.files,
+            "bytes_total": self.bytes_total,
+            "bytes_saved": self.bytes_saved,
+            "bytes_by_method": dict(self.bytes_by_method)
+        }
+
+
+class ImageStager:
+    """Verlinkt Dateien in Projektverzeichnisse und merkt sich nicht unterstützte Gerätepaare"""
+
+    def __init__(self, mode: str = IMAGE_STAGING_MODE):
+        self.mode = mode
+        self._unsupported: Set[Tuple[str, int, int]] = set()
+        self._lock = threading.Lock()
+
+    def _methods(self):
+        if self.mode == "auto":
+            return ("reflink", "hardlink")
+        if self.mode == "copy":
+            return ()
+        return (self.mode,)
+
+    def _is_unsupported(self, method: str, devices: Tuple[int, int]) -> bool:
+        with self._lock:
+            return (method, *devices) in self._unsupported
+
+    def _mark_unsupported(self, method: str, devices: Tuple[int, int], error: OSError):
+        with self._lock:
+            if (method, *devices) in self._unsupported:
+                return
+            self._unsupported.add((method, *devices))
+        logger.info(f"Staging per {method} nicht möglich ({error.strerror}), weiche aus")
+
+    @staticmethod
+    def _reflink(source: Path, target: Path):
+        if not FCNTL_AVAILABLE:
+            raise OSError(errno.EOPNOTSUPP, "Reflink nicht unterstützt")
+
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                dst.close()
+                target.unlink(missing_ok=True)
+                raise
+
+    def stage_file(self, source: Path, target: Path) -> str:
+        """Stellt eine Datei bereit und liefert das verwendete Verfahren"""
+        if target.exists():
+            if target.samefile(source):
+                return "existing"
+            target.unlink()
+
+        devices = (source.stat().st_dev, target.parent.stat().st_dev)
+
+        for method in self._methods():
+            if self._is_unsupported(method, devices):
+                continue
+            try:
+                if method == "reflink":
+                    self._reflink(source, target)
+                else:
+                    os.link(source, target)
+                return method
+            except OSError as e:
+                if e.errno in _UNSUPPORTED_ERRNOS or e.errno == errno.EPERM:
+                    self._mark_unsupported(method, devices, e)
+                # Sonstige Fehler (z.B. EMLINK) nur für diese Datei, nächstes Verfahren versuchen
+
+        shutil.copy2(source, target)
+        return "copy"
+
+    def stage_directory(self, source_dir: Path, target_dir: Path) -> StagingResult:
+        """
+        Stellt alle Dateien aus source_dir flach in target_dir bereit
+        Blockierend, aus async-Code per Executor aufrufen
+        """
+        source_dir = Path(source_dir)
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        result = StagingResult(target_path=target_dir)
+        for entry in sorted(source_dir.iterdir()):
+            if not entry.is_file():
+                continue
+            method = self.stage_file(entry, target_dir / entry.name)
+            size = entry.stat().st_size
+            result.files += 1
+            result.bytes_total += size
+            result.bytes_by_method[method] += size
+
+        logger.info(
+            f"{result.files} Bilder bereitgestellt in {target_dir}: "
+            f"{result.bytes_saved} von {result.bytes_total} bytes eingespart "
+            f"(reflink {result.bytes_by_method['reflink']}, hardlink {result.bytes_by_method['hardlink']}, "
+            f"kopiert {result.bytes_by_method['copy']})"
+        )
+        return result
+
+
+# Globale Instanz
+image_stager = ImageStager()
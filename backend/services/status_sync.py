@@ -0,0 +1,376 @@
+"""
+Status-Synchronisation für ChiliView
+Ein zentraler Poller für alle laufenden Verarbeitungsaufgaben statt einer Schleife pro Projekt
+
+Laufende Aufgaben werden pro Verarbeitungs-Backend gesammelt und gebündelt abgefragt
+(WebODM: eine Anfrage an die Task-Liste pro WebODM-Projekt). Die Änderungen werden
+pro Reseller in einer Session gesammelt und einmal committet; Datenbank-Sessions sind
+nur während dieses Schritts offen. Das
+Abfrageintervall wächst mit dem Alter der Aufgabe (anfangs schnell, bei langen Stufen
+langsam). Nach einem Neustart werden Projekte im Status "processing" aus den
+Reseller-Datenbanken wieder aufgenommen.
+
+Sind Webhooks aktiv (services/webhooks.py), stößt ein Abschluss-Callback über notify()
+sofort eine Abfrage an; für Backends, die einen Callback registrieren (NodeODM), läuft
+das Polling dann nur noch als Sicherheitsnetz im Abstand von WEBHOOK_SAFETY_POLL_INTERVAL.
+WebODM und die lokale CLI melden keinen Abschluss und werden weiter adaptiv abgefragt.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.database import db_manager, get_database, get_reseller_database
+from database.models import ProcessingLog, Project, Reseller
+from services.processing_backend import LEGACY_BACKEND, BackendTaskStatus, get_processing_backend
+from services.webhooks import WEBHOOK_SAFETY_POLL_INTERVAL, WEBHOOKS_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Abfrageintervall nach Alter der Aufgabe: (bis Sekunden, Intervall)
+POLL_SCHEDULE = ((300, 10.0), (1800, 30.0), (4 * 3600, 60.0))
+POLL_MAX_INTERVAL = 120.0
+
+# Backends, die bei der Task-Erstellung eine Webhook-URL hinterlegen
+WEBHOOK_BACKENDS = {"nodeodm"}
+
+# Taktung der Hauptschleife
+SYNC_TICK = 2.0
+
+
+def _configured_timeout_hours() -> int:
+    """Maximale Verarbeitungsdauer in Stunden (PROCESSING_TIMEOUT_HOURS)"""
+    env_hours = os.getenv("PROCESSING_TIMEOUT_HOURS")
+    if env_hours and env_hours.isdigit():
+        return max(1, int(env_hours))
+    return 6
+
+
+PROCESSING_TIMEOUT_HOURS = _configured_timeout_hours()
+
+
+def poll_interval(age_seconds: float, backend: str = LEGACY_BACKEND) -> float:
+    """Abfrageintervall für eine Aufgabe des angegebenen Alters und Backends"""
+    if WEBHOOKS_ENABLED and backend in WEBHOOK_BACKENDS:
+        return WEBHOOK_SAFETY_POLL_INTERVAL
+    for limit, interval in POLL_SCHEDULE:
+        if age_seconds < limit:
+            return interval
+    return POLL_MAX_INTERVAL
+
+
+# Markierung für Aufgaben, deren Backend nicht erreichbar war
+_UNREACHABLE = object()
+
+
+@dataclass
+class TrackedTask:
+    """Laufende Verarbeitungsaufgabe eines Projekts"""
+    reseller_id: str
+    project_id: int
+    task_ref: str
+    started_at: datetime
+    backend: str = LEGACY_BACKEND
+    next_poll: float = 0.0
+    polls: int = 0
+
+    def age_seconds(self) -> float:
+        return (datetime.utcnow() - self.started_at).total_seconds()
+
+
+class StatusSyncService:
+    """Zentraler Poller für die Verarbeitungsaufgaben aller Reseller"""
+
+    def __init__(self):
+        self.tracked: Dict[Tuple[str, int], TrackedTask] = {}
+        self._worker: Optional[asyncio.Task] = None
+        self._finishing: Dict[Tuple[str, int], asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+
+        # Statistik für Monitoring
+        self.cycles = 0
+        self.status_requests = 0
+        self.commits = 0
+        self.notifications = 0
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._wakeup = asyncio.Event()
+        count = self.rediscover()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Status-Synchronisation gestartet ({count} laufende Aufgaben übernommen)")
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._finishing.values()):
+            task.cancel()
+
+    def track(self, reseller_id: str, project_id: int, task_ref: str,
+              started_at: Optional[datetime] = None, backend: Optional[str] = None):
+        """Nimmt eine laufende Aufgabe in die Synchronisation auf"""
+        backend = backend or LEGACY_BACKEND
+        self.tracked[(reseller_id, project_id)] = TrackedTask(
+            reseller_id=reseller_id,
+            project_id=project_id,
+            task_ref=task_ref,
+            started_at=started_at or datetime.utcnow(),
+            backend=backend,
+            next_poll=time.monotonic() + poll_interval(0.0, backend)
+        )
+
+    def untrack(self, reseller_id: str, project_id: int):
+        self.tracked.pop((reseller_id, project_id), None)
+
+    def notify(self, reseller_id: str, project_id: int) -> bool:
+        """
+        Webhook-Eingang: Aufgabe beim nächsten Durchlauf sofort abfragen
+        Liefert False, wenn das Projekt nicht (mehr) verfolgt wird
+        """
+        tracked = self.tracked.get((reseller_id, project_id))
+        if tracked is None:
+            return False
+        self.notifications += 1
+        tracked.next_poll = 0.0
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def rediscover(self) -> int:
+        """Übernimmt Projekte im Status "processing" aus allen Reseller-Datenbanken"""
+        db = get_database()
+        try:
+            reseller_ids = [row.reseller_id for row in db.query(Reseller.reseller_id).all()]
+        finally:
+            db.close()
+
+        count = 0
+        for reseller_id in reseller_ids:
+            if not Path(db_manager.get_reseller_database_path(reseller_id)).exists():
+                continue
+            try:
+                reseller_db = get_reseller_database(reseller_id)
+            except Exception as e:
+                logger.error(f"Reseller-Datenbank {reseller_id} nicht lesbar: {e}")
+                continue
+
+            try:
+                projects = reseller_db.query(Project).filter(Project.status == "processing").all()
+                orphaned = 0
+                for project in projects:
+                    if project.webodm_task_id:
+                        started_at = project.processing_started_at
+                        if started_at is not None and started_at.tzinfo is not None:
+                            started_at = started_at.replace(tzinfo=None)
+                        self.track(reseller_id, project.id, project.webodm_task_id, started_at,
+                                   project.processing_backend)
+                        count += 1
+                    else:
+                        # Neustart während der Task-Erstellung
+                        project.status = "failed"
+                        project.error_message = "Server-Neustart während der Task-Erstellung"
+                        orphaned += 1
+                if orphaned:
+                    reseller_db.commit()
+            finally:
+                reseller_db.close()
+
+        return count
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fehler in der Status-Synchronisation: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=SYNC_TICK)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def sync_once(self, force: bool = False):
+        """Fragt alle fälligen Aufgaben ab und schreibt die Änderungen gebündelt"""
+        now = time.monotonic()
+        due = [t for t in self.tracked.values() if force or t.next_poll <= now]
+        if not due:
+            return
+        self.cycles += 1
+
+        by_backend: Dict[str, List[TrackedTask]] = {}
+        for tracked in due:
+            tracked.polls += 1
+            tracked.next_poll = now + poll_interval(tracked.age_seconds(), tracked.backend)
+            by_backend.setdefault(tracked.backend, []).append(tracked)
+
+        results = await asyncio.gather(
+            *(self._fetch_statuses(backend, group) for backend, group in by_backend.items()),
+            return_exceptions=True
+        )
+
+        by_reseller: Dict[str, List[Tuple[TrackedTask, Any]]] = {}
+        for (backend, group), statuses in zip(by_backend.items(), results):
+            if isinstance(statuses, BaseException):
+                logger.warning(f"Status von Backend {backend} nicht abrufbar: {statuses}")
+                statuses = {}
+            for tracked in group:
+                # Ohne Antwort nur den Timeout prüfen, None = Aufgabe gelöscht
+                task_status = statuses.get(tracked.task_ref, _UNREACHABLE)
+                by_reseller.setdefault(tracked.reseller_id, []).append((tracked, task_status))
+
+        for reseller_id, updates in by_reseller.items():
+            self._apply_updates(reseller_id, updates)
+
+    async def _fetch_statuses(self, backend: str,
+                              group: List[TrackedTask]) -> Dict[str, Optional[BackendTaskStatus]]:
+        self.status_requests += 1
+        return await get_processing_backend(backend).fetch_statuses([tracked.task_ref for tracked in group])
+
+    def _apply_updates(self, reseller_id: str, updates: List[Tuple[TrackedTask, Any]]):
+        reseller_db = get_reseller_database(reseller_id)
+        try:
+            projects = {
+                project.id: project
+                for project in reseller_db.query(Project).filter(
+                    Project.id.in_([tracked.project_id for tracked, _ in updates])
+                ).all()
+            }
+
+            for tracked, task_status in updates:
+                project = projects.get(tracked.project_id)
+                if project is None or project.status != "processing":
+                    # Gelöscht oder abgebrochen
+                    self.untrack(reseller_id, tracked.project_id)
+                    continue
+                self._apply_task(reseller_db, tracked, project, task_status)
+
+            reseller_db.commit()
+            self.commits += 1
+        except Exception as e:
+            reseller_db.rollback()
+            logger.error(f"Statusaktualisierung für Reseller {reseller_id} fehlgeschlagen: {e}")
+        finally:
+            reseller_db.close()
+
+    def _apply_task(self, reseller_db, tracked: TrackedTask, project: Project, task_status: Any):
+        if tracked.age_seconds() > PROCESSING_TIMEOUT_HOURS * 3600:
+            self._fail(reseller_db, tracked, project, "Verarbeitung-Timeout erreicht")
+            return
+
+        if task_status is None:
+            self._fail(reseller_db, tracked, project, "Verarbeitungs-Task nicht gefunden")
+            return
+        if task_status is _UNREACHABLE:
+            return
+
+        backend_progress = task_status.progress * 100
+        new_progress = 70.0 + backend_progress * 0.25  # 70-95%
+
+        old_progress = project.progress_percentage or 0.0
+        if new_progress > old_progress:
+            project.progress_percentage = new_progress
+            # Processing-Log nur bei spürbarem Fortschritt
+            if int(new_progress) > int(old_progress):
+                reseller_db.add(ProcessingLog(
+                    project_id=project.id,
+                    log_level="INFO",
+                    message=f"Verarbeitung: {backend_progress:.1f}%",
+                    step="processing",
+                    progress=new_progress
+                ))
+
+        if task_status.status == "completed":
+            self.untrack(tracked.reseller_id, tracked.project_id)
+            key = (tracked.reseller_id, tracked.project_id)
+            self._finishing[key] = asyncio.create_task(self._finish_completed(tracked, task_status))
+        elif task_status.status in ("failed", "canceled"):
+            self._fail(reseller_db, tracked, project, task_status.error or "Unbekannter Fehler")
+
+    def _fail(self, reseller_db, tracked: TrackedTask, project: Project, error_message: str):
+        self.untrack(tracked.reseller_id, tracked.project_id)
+        project.status = "failed"
+        project.error_message = error_message
+        reseller_db.add(ProcessingLog(
+            project_id=project.id,
+            log_level="ERROR",
+            message=f"Verarbeitung fehlgeschlagen: {error_message}",
+            step="failed",
+            progress=project.progress_percentage
+        ))
+        logger.error(f"Verarbeitung fehlgeschlagen (Projekt {project.id}): {error_message}")
+
+    async def _finish_completed(self, tracked: TrackedTask, task_status: BackendTaskStatus):
+        """Lädt die Ergebnisse einer abgeschlossenen Aufgabe und schließt das Projekt ab"""
+        key = (tracked.reseller_id, tracked.project_id)
+        output_dir = Path(f"data/resellers/{tracked.reseller_id}/projects/{tracked.project_id}/output")
+        error_message = None
+        try:
+            await get_processing_backend(tracked.backend).download_results(
+                tracked.task_ref, output_dir, task_status
+            )
+        except Exception as e:
+            logger.error(f"Fehler beim Herunterladen der Ergebnisse ({tracked.backend}): {e}")
+            error_message = "Ergebnisse konnten nicht heruntergeladen werden"
+
+        reseller_db = get_reseller_database(tracked.reseller_id)
+        try:
+            project = reseller_db.query(Project).filter(Project.id == tracked.project_id).first()
+            if project is None or project.status != "processing":
+                return
+
+            if error_message is None:
+                project.status = "completed"
+                project.progress_percentage = 100.0
+                project.processing_completed_at = datetime.utcnow()
+                project.viewer_path = str(output_dir)
+                project.viewer_url = f"/viewer/{tracked.reseller_id}/{tracked.project_id}/"
+
+                # Upload-Dateien löschen (Speicherplatz sparen)
+                if project.upload_path and Path(project.upload_path).exists():
+                    shutil.rmtree(project.upload_path, ignore_errors=True)
+
+                reseller_db.add(ProcessingLog(
+                    project_id=project.id,
+                    log_level="INFO",
+                    message="Verarbeitung erfolgreich abgeschlossen",
+                    step="completed",
+                    progress=100.0
+                ))
+                logger.info(f"Verarbeitung abgeschlossen (Projekt {project.id})")
+            else:
+                project.status = "failed"
+                project.error_message = error_message
+
+            reseller_db.commit()
+        finally:
+            reseller_db.close()
+            self._finishing.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tracked_tasks": len(self.tracked),
+            "finishing_tasks": len(self._finishing),
+            "cycles": self.cycles,
+            "status_requests": self.status_requests,
+            "commits": self.commits,
+            "webhooks_enabled": WEBHOOKS_ENABLED,
+            "notifications": self.notifications
+        }
+
+
+# Globale Instanz
+status_sync = StatusSyncService()
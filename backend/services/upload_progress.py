@@ -0,0 +1,116 @@
+"""
+Upload-Fortschritt für ChiliView
+In-Memory-Fortschrittskanal pro Projekt und gebündelte Commits der Reseller-Datenbank
+
+Während eines Uploads wird der Fortschritt nur im Speicher aktualisiert; Status-Endpunkte
+lesen ihn von dort. Project-, VirusScanResult- und ImageMetadata-Zeilen werden alle
+UPLOAD_COMMIT_BATCH_FILES Dateien bzw. UPLOAD_COMMIT_INTERVAL Sekunden und einmal am Ende
+committet. Bei mehreren Worker-Prozessen sieht ein anderer Prozess den Datenbankstand,
+der höchstens einen Batch zurückliegt.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+
+def _configured_batch_files() -> int:
+    """Dateien pro Commit (UPLOAD_COMMIT_BATCH_FILES)"""
+    env_files = os.getenv("UPLOAD_COMMIT_BATCH_FILES")
+    if env_files and env_files.isdigit():
+        return max(1, int(env_files))
+    return 50
+
+
+UPLOAD_COMMIT_BATCH_FILES = _configured_batch_files()
+UPLOAD_COMMIT_INTERVAL = float(os.getenv("UPLOAD_COMMIT_INTERVAL", "2.0"))
+
+
+@dataclass
+class UploadProgress:
+    """Live-Fortschritt eines laufenden Uploads"""
+    reseller_id: str
+    project_id: int
+    files_received: int = 0
+    bytes_received: int = 0
+    progress_percentage: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+    updated_at: float = field(default_factory=time.monotonic)
+
+
+class UploadProgressChannel:
+    """
+    Prozessweiter Fortschrittskanal, Schlüssel ist (reseller_id, project_id)
+    Projekt-IDs sind nur innerhalb einer Reseller-Datenbank eindeutig
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, int], UploadProgress] = {}
+        self._lock = threading.Lock()
+
+    def start(self, reseller_id: str, project_id: int) -> UploadProgress:
+        progress = UploadProgress(reseller_id=reseller_id, project_id=project_id)
+        with self._lock:
+            self._entries[(reseller_id, project_id)] = progress
+        return progress
+
+    def update(self, reseller_id: str, project_id: int, bytes_received: int,
+               progress_percentage: Optional[float] = None):
+        """Zählt eine fertig verarbeitete Datei und setzt den Fortschritt"""
+        with self._lock:
+            progress = self._entries.get((reseller_id, project_id))
+            if progress is None:
+                return
+            progress.files_received += 1
+            progress.bytes_received = bytes_received
+            if progress_percentage is not None:
+                progress.progress_percentage = progress_percentage
+            progress.updated_at = time.monotonic()
+
+    def get(self, reseller_id: str, project_id: int) -> Optional[UploadProgress]:
+        with self._lock:
+            return self._entries.get((reseller_id, project_id))
+
+    def finish(self, reseller_id: str, project_id: int):
+        with self._lock:
+            self._entries.pop((reseller_id, project_id), None)
+
+
+class BatchedCommitter:
+    """
+    Bündelt Commits einer Reseller-Session während eines Uploads
+    Committet alle batch_files Aufrufe von record() oder nach interval Sekunden
+    """
+
+    def __init__(self, reseller_db, batch_files: int = UPLOAD_COMMIT_BATCH_FILES,
+                 interval: float = UPLOAD_COMMIT_INTERVAL):
+        self.reseller_db = reseller_db
+        self.batch_files = batch_files
+        self.interval = interval
+        self.pending = 0
+        self.commits = 0
+        self._last_commit = time.monotonic()
+
+    def record(self, *instances):
+        """Nimmt die Zeilen einer Datei in den aktuellen Batch auf und committet bei Bedarf"""
+        for instance in instances:
+            if instance is not None:
+                self.reseller_db.add(instance)
+        self.pending += 1
+        if (self.pending >= self.batch_files
+                or time.monotonic() - self._last_commit >= self.interval):
+            self.flush()
+
+    def flush(self):
+        """Committet den offenen Batch sofort"""
+        if self.pending:
+            self.reseller_db.commit()
+            self.commits += 1
+        self.pending = 0
+        self._last_commit = time.monotonic()
+
+
+# Globale Instanz
+upload_progress = UploadProgressChannel()
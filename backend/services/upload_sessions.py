@@ -0,0 +1,271 @@
+"""
+Wiederaufnehmbare Uploads für ChiliView
+Chunk-Verwaltung für Upload-Sitzungen (Teildateien, Offsets, Prüfsummen, Ablauf)
+
+Der Sitzungszustand liegt in der Reseller-Datenbank (UploadSession/UploadSessionFile),
+die Teildateien unter data/resellers/{reseller_id}/uploads/{session_uuid}. Ein Chunk wird
+erst nach fsync als empfangen verbucht, damit die Datenbank nach einem Neustart nie mehr
+Bytes meldet, als auf der Platte liegen.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import weakref
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Set
+
+from database.models import Project, UploadSession, VirusScanResult
+from services.ingest import STREAM_CHUNK_SIZE, UploadLimitExceeded
+from services.upload_progress import upload_progress
+
+logger = logging.getLogger(__name__)
+
+
+def _configured_ttl_hours() -> int:
+    """Lebensdauer offener Sitzungen in Stunden (UPLOAD_SESSION_TTL_HOURS)"""
+    env_hours = os.getenv("UPLOAD_SESSION_TTL_HOURS")
+    if env_hours and env_hours.isdigit():
+        return max(1, int(env_hours))
+    return 48
+
+
+def _configured_commit_timeout_minutes() -> int:
+    """
+    Zeit ohne Änderung, nach der eine Sitzung im Status "committing" als hängengeblieben
+    gilt (UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES), etwa nach einem Absturz während des Commits
+    """
+    env_minutes = os.getenv("UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES")
+    if env_minutes and env_minutes.isdigit():
+        return max(1, int(env_minutes))
+    return 60
+
+
+UPLOAD_SESSION_TTL_HOURS = _configured_ttl_hours()
+UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES = _configured_commit_timeout_minutes()
+
+# Empfohlene Chunk-Größe für Clients
+UPLOAD_SESSION_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+
+
+class ChunkOffsetMismatch(Exception):
+    """Chunk passt nicht an die bisher empfangenen Bytes"""
+
+    def __init__(self, expected_offset: int):
+        super().__init__(f"Offset stimmt nicht, erwartet: {expected_offset}")
+        self.expected_offset = expected_offset
+
+
+class ChunkChecksumMismatch(Exception):
+    """SHA-256 des empfangenen Chunks stimmt nicht mit der Angabe des Clients überein"""
+    pass
+
+
+def session_directory(reseller_id: str, session_uuid: str) -> Path:
+    return Path(f"data/resellers/{reseller_id}/uploads/{session_uuid}")
+
+
+def part_path(reseller_id: str, session_uuid: str, file_index: int) -> Path:
+    return session_directory(reseller_id, session_uuid) / f"{file_index:04d}.part"
+
+
+def session_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+
+
+def project_file_path(upload_dir: Path, file_index: int, filename: str) -> Path:
+    """Zielpfad einer Sitzungsdatei im Upload-Verzeichnis des Projekts"""
+    return Path(upload_dir) / f"{file_index:04d}_{filename}"
+
+
+def reconcile_part_file(path: Path, received_bytes: int) -> int:
+    """
+    Gleicht Teildatei und verbuchte Bytes nach einem Absturz ab
+    Überschüssige, nicht verbuchte Bytes werden abgeschnitten
+    """
+    try:
+        disk_size = path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+    if disk_size > received_bytes:
+        with open(path, "r+b") as f:
+            f.truncate(received_bytes)
+        return received_bytes
+    return disk_size
+
+
+class SessionChunkWriter:
+    """
+    Schreibt einen Chunk an einer festen Position in die Teildatei
+    Der Chunk gilt erst nach finish() (SHA-256-Prüfung und fsync) als empfangen
+    """
+
+    def __init__(self, path: Path, offset: int, max_bytes: int):
+        self.path = Path(path)
+        self.offset = offset
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "r+b" if self.path.exists() else "w+b")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadLimitExceeded(
+                f"Chunk überschreitet die angekündigte Dateigröße um {self.size - self.max_bytes} bytes"
+            )
+        self._hash.update(data)
+        self._buffer += data
+
+        if len(self._buffer) >= STREAM_CHUNK_SIZE:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+    def finish(self, expected_sha256: str) -> int:
+        """Prüft die Chunk-Prüfsumme, synchronisiert die Datei und liefert die Chunk-Größe"""
+        if self._hash.hexdigest() != expected_sha256.lower():
+            self.abort()
+            raise ChunkChecksumMismatch("Prüfsumme des Chunks stimmt nicht überein")
+
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return self.size
+
+    def abort(self):
+        """Verwirft den Chunk (Teildatei zurück auf den Offset)"""
+        self._buffer.clear()
+        if not self._file.closed:
+            self._file.truncate(self.offset)
+            self._file.close()
+
+
+_chunk_locks: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+
+
+def get_chunk_lock(reseller_id: str, session_uuid: str, file_index: int) -> asyncio.Lock:
+    """Serialisiert Chunks derselben Datei innerhalb des Prozesses"""
+    key = (reseller_id, session_uuid, file_index)
+    lock = _chunk_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _chunk_locks[key] = lock
+    return lock
+
+
+def remove_session_files(reseller_id: str, session_uuid: str):
+    shutil.rmtree(session_directory(reseller_id, session_uuid), ignore_errors=True)
+
+
+def discard_upload_project(reseller_db, reseller_id: str, project: Optional[Project]):
+    """
+    Entfernt ein abgebrochenes Upload-Projekt samt bereits geschriebener Dateien
+    """
+    if project is None:
+        return
+
+    upload_progress.finish(reseller_id, project.id)
+
+    try:
+        reseller_db.rollback()
+        if project.upload_path:
+            shutil.rmtree(Path(project.upload_path).parent, ignore_errors=True)
+        reseller_db.query(VirusScanResult).filter(
+            VirusScanResult.file_path.like(f"{project.upload_path}%")
+        ).delete(synchronize_session=False)
+        reseller_db.delete(project)
+        reseller_db.commit()
+    except Exception as e:
+        reseller_db.rollback()
+        logger.error(f"Fehler beim Verwerfen des Upload-Projekts: {str(e)}")
+
+
+# Sitzungen, deren Commit in diesem Prozess gerade läuft (nie als hängengeblieben werten)
+active_commits: Set[str] = set()
+
+
+def is_stale_commit(upload_session: UploadSession) -> bool:
+    """
+    Hängt die Sitzung im Status "committing", ohne dass ein Commit sie noch bearbeitet?
+    """
+    if upload_session.status != "committing" or upload_session.session_uuid in active_commits:
+        return False
+    changed_at = upload_session.updated_at or upload_session.created_at
+    if changed_at is None:
+        return True
+    if changed_at.tzinfo is not None:
+        changed_at = changed_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return changed_at < datetime.utcnow() - timedelta(minutes=UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES)
+
+
+def release_stale_commit(reseller_db, reseller_id: str, upload_session: UploadSession):
+    """
+    Gibt eine nach einem Absturz im Status "committing" hängengebliebene Sitzung wieder frei
+
+    Bereits ins Projekt verschobene Dateien wandern zurück in die Sitzung, das halb
+    angelegte Projekt wird verworfen und die Sitzung ist wieder offen (ein neuer Commit
+    ist möglich, nach Ablauf räumt expire_upload_sessions sie ab). Fehlende Teildateien
+    werden mit den verbuchten Bytes abgeglichen, der Client lädt sie dann erneut hoch.
+    """
+    project = None
+    if upload_session.project_id:
+        project = reseller_db.query(Project).filter(Project.id == upload_session.project_id).first()
+
+    for session_file in upload_session.files:
+        source = part_path(reseller_id, upload_session.session_uuid, session_file.file_index)
+        if project is not None and project.upload_path and not source.exists():
+            target = project_file_path(project.upload_path, session_file.file_index, session_file.filename)
+            try:
+                os.replace(target, source)
+            except OSError:
+                pass
+        session_file.received_bytes = reconcile_part_file(source, session_file.received_bytes)
+
+    upload_session.status = "open"
+    upload_session.project_id = None
+    reseller_db.commit()
+    discard_upload_project(reseller_db, reseller_id, project)
+
+    logger.warning(f"Hängengebliebener Commit der Upload-Sitzung {upload_session.session_uuid} "
+                   f"zurückgesetzt ({reseller_id})")
+
+
+def expire_upload_sessions(reseller_db, reseller_id: str) -> int:
+    """
+    Gibt hängengebliebene Commits frei, bricht abgelaufene offene Sitzungen ab und
+    löscht ihre Teildateien
+    """
+    stale = reseller_db.query(UploadSession).filter(
+        UploadSession.status == "committing",
+        UploadSession.updated_at < datetime.utcnow() - timedelta(minutes=UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES)
+    ).all()
+
+    for upload_session in stale:
+        if is_stale_commit(upload_session):
+            release_stale_commit(reseller_db, reseller_id, upload_session)
+
+    expired = reseller_db.query(UploadSession).filter(
+        UploadSession.status == "open",
+        UploadSession.expires_at < datetime.utcnow()
+    ).all()
+
+    for upload_session in expired:
+        upload_session.status = "aborted"
+        remove_session_files(reseller_id, upload_session.session_uuid)
+
+    if expired:
+        reseller_db.commit()
+        logger.info(f"{len(expired)} abgelaufene Upload-Sitzungen entfernt ({reseller_id})")
+
+    return len(expired)
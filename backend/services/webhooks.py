@@ -0,0 +1,106 @@
+"""
+Webhooks für ChiliView
+Authentifizierung und Auswertung von Abschluss-Callbacks der Verarbeitungs-Knoten
+
+Ein Callback löst keine Statusänderung direkt aus, sondern nur eine sofortige Abfrage
+durch die Status-Synchronisation; der Inhalt des Callbacks wird also nie als Beweis für
+den Abschluss genommen. Zwei Verfahren werden akzeptiert:
+
+- Token in der URL (?token=...), HMAC-SHA256 über "reseller_id:project_id". NodeODM
+  ruft die bei der Task-Erstellung übergebene webhook-URL unverändert auf und kann
+  selbst nicht signieren.
+- Signatur des Bodys im Header X-ChiliView-Signature: sha256=<hex> (eigene Sender,
+  tools/send_webhook.py).
+
+Ohne WEBHOOK_SECRET sind Webhooks deaktiviert und es bleibt beim reinen Polling.
+"""
+
+import hashlib
+import hmac
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+SIGNATURE_HEADER = "X-ChiliView-Signature"
+
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOKS_ENABLED = bool(WEBHOOK_SECRET)
+
+# Öffentliche Basis-URL des Backends, unter der die Knoten den Webhook erreichen
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "http://chiliview-backend:8000").rstrip("/")
+
+
+def _configured_safety_interval() -> float:
+    """Abfrageintervall in Sekunden, solange Webhooks aktiv sind (WEBHOOK_SAFETY_POLL_INTERVAL)"""
+    env_interval = os.getenv("WEBHOOK_SAFETY_POLL_INTERVAL")
+    if env_interval and env_interval.isdigit():
+        return float(max(10, int(env_interval)))
+    return 300.0
+
+
+WEBHOOK_SAFETY_POLL_INTERVAL = _configured_safety_interval()
+
+# Statuscodes der Knoten, die auf ein Ende der Verarbeitung hindeuten (WebODM und NodeODM)
+_FINAL_STATUS_CODES = {30, 40, 50}
+
+
+def _hmac_hex(secret: str, message: bytes) -> str:
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def webhook_token(reseller_id: str, project_id: int, secret: str = None) -> str:
+    """Projektbezogenes Token für die Webhook-URL"""
+    return _hmac_hex(secret or WEBHOOK_SECRET, f"{reseller_id}:{project_id}".encode("utf-8"))
+
+
+def webhook_path(reseller_id: str, project_id: int) -> str:
+    return f"/api/webhooks/processing/{reseller_id}/{project_id}"
+
+
+def webhook_url(reseller_id: str, project_id: int, base_url: str = None,
+                secret: str = None) -> Optional[str]:
+    """Vollständige Webhook-URL mit Token, None wenn Webhooks deaktiviert sind"""
+    secret = secret or WEBHOOK_SECRET
+    if not secret:
+        return None
+    query = urlencode({"token": webhook_token(reseller_id, project_id, secret)})
+    return f"{(base_url or WEBHOOK_BASE_URL).rstrip('/')}{webhook_path(reseller_id, project_id)}?{query}"
+
+
+def sign_body(body: bytes, secret: str = None) -> str:
+    """Wert für den Header X-ChiliView-Signature"""
+    return f"sha256={_hmac_hex(secret or WEBHOOK_SECRET, body)}"
+
+
+def verify_webhook(reseller_id: str, project_id: int, body: bytes,
+                   token: Optional[str], signature: Optional[str]) -> bool:
+    """Prüft URL-Token oder Body-Signatur (zeitkonstant)"""
+    if not WEBHOOKS_ENABLED:
+        return False
+    if token and hmac.compare_digest(token, webhook_token(reseller_id, project_id)):
+        return True
+    if signature and hmac.compare_digest(signature.strip(), sign_body(body)):
+        return True
+    return False
+
+
+def parse_webhook_payload(payload: Any) -> Dict[str, Any]:
+    """
+    Normalisiert WebODM- und NodeODM-Callbacks auf task_id und status_code
+    WebODM: {"id": ..., "project": ..., "status": 30}
+    NodeODM: {"uuid": ..., "status": {"code": 40}}
+    """
+    if not isinstance(payload, dict):
+        return {"task_id": None, "status_code": None, "final": False}
+
+    task_id = payload.get("uuid") or payload.get("id")
+    status = payload.get("status")
+    if isinstance(status, dict):
+        status = status.get("code")
+    status_code = status if isinstance(status, int) else None
+
+    return {
+        "task_id": str(task_id) if task_id is not None else None,
+        "status_code": status_code,
+        "final": status_code in _FINAL_STATUS_CODES
+    }
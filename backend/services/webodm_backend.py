@@ -0,0 +1,196 @@
+"""
+WebODM-Backend für ChiliView
+Verarbeitung über die WebODM-Webapp (REST), Knotenwahl über die Knoten-Registry
+
+Pro Auftrag wird im WebODM-Projekt des Resellers (services/webodm_projects.py) eine
+Partial-Task angelegt, die Bilder werden batchweise parallel hochgeladen und die Task
+anschließend committet. Task-Referenz ist "{webodm_project_id}_{task_id}". Der Status
+wird einzeln pro Task abgefragt, bei vielen laufenden Tasks eines Projekts mit einer
+Anfrage an die Task-Liste (WEBODM_STATUS_LIST_THRESHOLD).
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.asset_download import download_task_results
+from services.node_registry import node_registry
+from services.processing_backend import (
+    DEFAULT_TASK_OPTIONS, BackendTaskStatus, ProcessingBackend, ProcessingJob,
+    list_image_files, send_image_batch, upload_in_batches
+)
+from services.webodm_client import (
+    WEBODM_TASK_STATUS, WEBODM_UPLOAD_BATCH_FILES, WEBODM_UPLOAD_CONCURRENCY, WEBODM_UPLOAD_RETRIES,
+    WebODMClient, get_webodm_client
+)
+from services.webodm_projects import webodm_projects
+
+logger = logging.getLogger(__name__)
+
+# Ab dieser Zahl laufender Tasks in einem WebODM-Projekt wird die Task-Liste abgefragt
+# (die Liste enthält auch alle abgeschlossenen Tasks des Resellers)
+_env_list_threshold = os.getenv("WEBODM_STATUS_LIST_THRESHOLD", "5")
+WEBODM_STATUS_LIST_THRESHOLD = int(_env_list_threshold) if _env_list_threshold.isdigit() else 5
+
+
+def split_task_ref(task_ref: str):
+    """Task-Referenz in (WebODM-Projekt, Task-ID) zerlegen"""
+    webodm_project_id, task_id = task_ref.split("_", 1)
+    return webodm_project_id, task_id
+
+
+class WebODMBackend(ProcessingBackend):
+    """
+    WebODM-Webapp als Verarbeitungs-Backend
+    Nutzt den gemeinsamen WebODM-Client (Verbindungspool, zwischengespeichertes Token)
+    """
+
+    name = "webodm"
+
+    def __init__(self, client: Optional[WebODMClient] = None):
+        self.client = client or get_webodm_client()
+        self.list_requests = 0
+        self.detail_requests = 0
+
+    async def submit(self, job: ProcessingJob, on_progress=None, on_node_selected=None) -> str:
+        image_files = list_image_files(job.images_path)
+
+        # Knoten mit der kleinsten vorhergesagten Fertigstellungszeit
+        selection = await node_registry.select_node(len(image_files))
+        if on_node_selected:
+            on_node_selected(selection)
+
+        webodm_project_id = await webodm_projects.get_project(self.client, job.reseller_id)
+        task_id = await self._create_task(webodm_project_id, job, selection)
+        if task_id is None:
+            # Projekt wurde in WebODM gelöscht: neu anlegen und einmal wiederholen
+            webodm_projects.invalidate(job.reseller_id)
+            webodm_project_id = await webodm_projects.get_project(self.client, job.reseller_id)
+            task_id = await self._create_task(webodm_project_id, job, selection)
+            if task_id is None:
+                raise Exception(f"WebODM-Projekt {webodm_project_id} nicht gefunden")
+
+        task_url = f"/api/projects/{webodm_project_id}/tasks/{task_id}"
+        try:
+            await upload_in_batches(
+                image_files,
+                lambda batch: send_image_batch(
+                    self.client, f"{task_url}/upload/", batch, WEBODM_UPLOAD_RETRIES, "WebODM"
+                ),
+                WEBODM_UPLOAD_BATCH_FILES, WEBODM_UPLOAD_CONCURRENCY, on_progress
+            )
+
+            commit_response = await self.client.post(f"{task_url}/commit/")
+            if commit_response.status_code != 200:
+                raise Exception(f"WebODM Task-Commit fehlgeschlagen: {commit_response.status_code}")
+
+        except Exception as e:
+            logger.error(f"Fehler bei WebODM Task-Erstellung: {str(e)}")
+
+            # Unvollständigen Partial-Task entfernen, das Reseller-Projekt bleibt bestehen
+            try:
+                await self.client.post(f"{task_url}/remove/")
+            except Exception:
+                pass
+            raise
+
+        task_ref = f"{webodm_project_id}_{task_id}"
+        logger.info(f"WebODM Task {task_ref} erstellt für Projekt {job.project_id} ({len(image_files)} Bilder)")
+        return task_ref
+
+    async def _create_task(self, webodm_project_id: int, job: ProcessingJob, selection) -> Optional[int]:
+        """Partial-Task ohne Bilder anlegen; None, wenn das WebODM-Projekt nicht existiert"""
+        task_response = await self.client.post(f"/api/projects/{webodm_project_id}/tasks/", json={
+            "name": f"ChiliView_Project_{job.project_id}",
+            "processing_node": selection.node_id if selection else None,
+            "partial": True,
+            "auto_boundary": True,
+            "options": DEFAULT_TASK_OPTIONS
+        })
+        if task_response.status_code == 404:
+            return None
+        if task_response.status_code != 201:
+            raise Exception(f"WebODM Task-Erstellung fehlgeschlagen: {task_response.status_code}")
+        return task_response.json()["id"]
+
+    async def fetch_statuses(self, task_refs: List[str]) -> Dict[str, Optional[BackendTaskStatus]]:
+        """Einzelabfragen, ab WEBODM_STATUS_LIST_THRESHOLD Tasks eine Listenabfrage pro Projekt"""
+        by_webodm_project: Dict[str, List[str]] = {}
+        for task_ref in task_refs:
+            by_webodm_project.setdefault(split_task_ref(task_ref)[0], []).append(task_ref)
+
+        task_lists = await asyncio.gather(
+            *(self._fetch_tasks(webodm_project_id, refs)
+              for webodm_project_id, refs in by_webodm_project.items()),
+            return_exceptions=True
+        )
+
+        statuses: Dict[str, Optional[BackendTaskStatus]] = {}
+        for (webodm_project_id, refs), tasks in zip(by_webodm_project.items(), task_lists):
+            if isinstance(tasks, BaseException):
+                logger.warning(f"WebODM-Taskliste für Projekt {webodm_project_id} nicht abrufbar: {tasks}")
+                continue
+            for task_ref in refs:
+                task_data = tasks.get(split_task_ref(task_ref)[1])
+                statuses[task_ref] = self._to_status(task_data) if task_data is not None else None
+        return statuses
+
+    async def _fetch_tasks(self, webodm_project_id: str, task_refs: List[str]) -> Dict[str, Dict[str, Any]]:
+        if len(task_refs) >= WEBODM_STATUS_LIST_THRESHOLD:
+            self.list_requests += 1
+            response = await self.client.get(f"/api/projects/{webodm_project_id}/tasks/", timeout=15.0)
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}")
+            return {str(task["id"]): task for task in response.json()}
+
+        async def fetch_one(task_id: str) -> Optional[Dict[str, Any]]:
+            self.detail_requests += 1
+            response = await self.client.get(f"/api/projects/{webodm_project_id}/tasks/{task_id}/", timeout=15.0)
+            if response.status_code == 404:
+                return None
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}")
+            return response.json()
+
+        task_ids = [split_task_ref(task_ref)[1] for task_ref in task_refs]
+        results = await asyncio.gather(*(fetch_one(task_id) for task_id in task_ids))
+        return {task_id: task for task_id, task in zip(task_ids, results) if task is not None}
+
+    @staticmethod
+    def _to_status(task_data: Dict[str, Any]) -> BackendTaskStatus:
+        # running_progress liefert WebODM als Anteil 0..1
+        progress = min(max(float(task_data.get("running_progress") or 0.0), 0.0), 1.0)
+        return BackendTaskStatus(
+            status=WEBODM_TASK_STATUS.get(task_data.get("status"), "unknown"),
+            progress=progress,
+            error=task_data.get("last_error"),
+            assets=task_data.get("available_assets") or []
+        )
+
+    async def download_results(self, task_ref: str, output_path: Path,
+                               task_status: BackendTaskStatus) -> Dict[str, Dict[str, Any]]:
+        webodm_project_id, task_id = split_task_ref(task_ref)
+        manifest = await download_task_results(
+            self.client, webodm_project_id, task_id, task_status.assets, output_path
+        )
+        logger.info(f"WebODM-Ergebnisse heruntergeladen ({task_ref}, {len(manifest)} Assets, "
+                    f"{sum(entry['size'] for entry in manifest.values())} bytes)")
+        return manifest
+
+    async def cancel(self, task_ref: str):
+        webodm_project_id, task_id = split_task_ref(task_ref)
+        try:
+            await self.client.post(f"/api/projects/{webodm_project_id}/tasks/{task_id}/cancel/")
+        except Exception as e:
+            logger.warning(f"WebODM Task {task_ref} konnte nicht abgebrochen werden: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "list_requests": self.list_requests,
+            "detail_requests": self.detail_requests,
+            "projects": webodm_projects.stats(),
+            "client": self.client.stats()
+        }
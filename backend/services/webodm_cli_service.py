@@ -10,9 +10,18 @@ import os
 import json
 import shutil
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Awaitable, Callable, Optional, Dict, Any, List
 from datetime import datetime
-import re
+
+from services.cli_supervisor import (
+    follow_log, is_active as is_supervisor_active, launch as launch_supervised, read_state, state_path
+)
+from services.job_logs import job_logs
+from services.odm_progress import (
+    ODMProgressTracker, StatusFileWriter, checkpoint_path, rerun_from_stage, write_checkpoint
+)
+from services.resource_allocator import ResourceSlot
+from services.staging import StagingResult, image_stager
 
 logger = logging.getLogger(__name__)
 
@@ -95,8 +104,22 @@ class WebODMCLIService:
             logger.error(f"Fehler beim Erstellen des WebODM-CLI Projekts: {e}")
             raise
             
+    async def stage_images(self, images_path: str, target_path: Path) -> StagingResult:
+        """
+        Stellt die Upload-Bilder im Projektverzeichnis bereit (Reflink/Hardlink, Kopie nur als Fallback)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, image_stager.stage_directory, Path(images_path), target_path
+        )
+        
     async def process_images(self, project_path: str, images_path: str,
-                           options: Dict[str, Any] = None, instance_id: str = None) -> Dict[str, Any]:
+                           options: Dict[str, Any] = None, instance_id: str = None,
+                           resources: Optional[ResourceSlot] = None,
+                           on_progress: Optional[Callable[[int, Optional[str]], None]] = None,
+                           resume_after: Optional[str] = None,
+                           on_checkpoint: Optional[Callable[[str], Awaitable[None]]] = None,
+                           task_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Verarbeitet Bilder mit WebODM-CLI (parallele Instanzen möglich)
         
@@ -105,6 +128,12 @@ class WebODMCLIService:
             images_path: Pfad zu den Eingabebildern
             options: Verarbeitungsoptionen
             instance_id: Eindeutige Instanz-ID für parallele Verarbeitung
+            resources: Zugeteilter Slot (Kerne, Speicher) bei paralleler Verarbeitung
+            on_progress: Rückruf mit (Gesamtfortschritt 0-100, ODM-Stufe)
+            resume_after: Zuletzt abgeschlossene ODM-Stufe eines unterbrochenen Laufs;
+                fortgesetzt wird mit --rerun-from der folgenden Stufe in denselben Verzeichnissen
+            on_checkpoint: Awaitable-Rückruf mit der ODM-Stufe, sobald eine Stufe abgeschlossen ist
+            task_id: Queue-Task; Schlüssel des Job-Logs (instance_id ist nur je Projekt eindeutig)
             
         Returns:
             Dict mit Verarbeitungsstatus und Ergebnissen
@@ -126,6 +155,10 @@ class WebODMCLIService:
             output_path.mkdir(parents=True, exist_ok=True)
             temp_path.mkdir(parents=True, exist_ok=True)
             
+            # Eingabebilder ins Instanz-Verzeichnis verlinken statt duplizieren
+            staging = await self.stage_images(images_path, project_path / f"images{instance_suffix}")
+            images_path = str(staging.target_path)
+            
             # Standard-Optionen für Drohnenfotografie
             default_options = {
                 "dem": True,
@@ -149,6 +182,20 @@ class WebODMCLIService:
             if options:
                 default_options.update(options)
                 
+            rerun_from = rerun_from_stage(resume_after)
+            if rerun_from:
+                # Ergebnisse bis resume_after liegen noch in output/temp der Instanz
+                default_options["rerun-from"] = rerun_from
+                default_options["rerun-all"] = False
+                
+            if resources is not None:
+                # Nur die Kerne des eigenen Slots nutzen statt aller Kerne ("auto")
+                requested = default_options.get("max-concurrency")
+                threads = resources.threads
+                if isinstance(requested, int) and 0 < requested < threads:
+                    threads = requested
+                default_options["max-concurrency"] = threads
+                
             # Eindeutiger Projekt-Name für parallele Instanzen
             project_name = f"{project_path.name}{instance_suffix}"
             
@@ -173,112 +220,153 @@ class WebODMCLIService:
             
             # Status-Datei erstellen (instanz-spezifisch)
             status_file = project_path / f"processing_status{instance_suffix}.json"
-            await self._update_status(status_file, "running", f"Verarbeitung gestartet (Instanz {instance_id})", 0)
-            
-            # Prozess starten mit separatem Working Directory
-            working_dir = temp_path
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                cwd=str(working_dir),
-                env={**os.environ, "TMPDIR": str(temp_path)}  # Separate Temp-Verzeichnisse
+            status_writer = StatusFileWriter(status_file)
+            progress_tracker = ODMProgressTracker(resume_after if rerun_from else None)
+            if rerun_from:
+                await status_writer.update("running", f"Verarbeitung fortgesetzt ab {rerun_from} (Instanz {instance_id})",
+                                           progress_tracker.progress, force=True)
+            else:
+                await status_writer.update("running", f"Verarbeitung gestartet (Instanz {instance_id})", 0, force=True)
+            
+            # Instanz unter eigenem Supervisor starten: überlebt Neustarts des Backends,
+            # die Ausgabe landet direkt in der Log-Datei
+            supervisor_state = state_path(project_path, instance_id)
+            state = await launch_supervised(
+                cmd, supervisor_state, log_path,
+                cwd=temp_path,  # Separates Working Directory
+                env={**os.environ, "TMPDIR": str(temp_path)},  # Separate Temp-Verzeichnisse
+                cpus=resources.cpus if resources is not None else None,
+                cgroup=resources.cgroup if resources is not None else None,
+                info={"resume_after": progress_tracker.completed_stage, "staging": staging.to_dict()}
             )
-            
-            # Log-Datei für Output
-            with open(log_path, 'w') as log_file:
-                # Output in Echtzeit lesen und Status aktualisieren
-                async for line in self._read_process_output(process):
-                    log_file.write(line + '\n')
-                    log_file.flush()
-                    
-                    # Fortschritt aus Log parsen
-                    progress = self._parse_progress(line)
-                    if progress is not None:
-                        await self._update_status(status_file, "running", line.strip(), progress)
-                        
-            # Auf Prozess-Ende warten
-            return_code = await process.wait()
-            
-            if return_code == 0:
-                # Erfolgreiche Verarbeitung
-                results = await self._collect_results(output_path)
-                await self._update_status(status_file, "completed", f"Verarbeitung erfolgreich abgeschlossen (Instanz {instance_id})", 100)
+            if resources is not None:
+                resources.pid = state["pid"]
                 
-                # Potree-Viewer vorbereiten falls Punktwolke vorhanden
-                if results.get("point_cloud"):
-                    await self._prepare_potree_viewer(project_path, results["point_cloud"])
-                
-                # Temp-Verzeichnis aufräumen
-                if temp_path.exists():
-                    import shutil
-                    shutil.rmtree(temp_path)
-                    
-                return {
-                    "status": "completed",
-                    "message": f"Verarbeitung erfolgreich abgeschlossen (Instanz {instance_id})",
-                    "results": results,
-                    "log_file": str(log_path),
-                    "instance_id": instance_id
-                }
-            else:
-                # Fehler bei Verarbeitung
-                await self._update_status(status_file, "failed", f"Verarbeitung fehlgeschlagen (Instanz {instance_id})", 0)
-                return {
-                    "status": "failed",
-                    "message": f"WebODM-CLI Verarbeitung fehlgeschlagen (Instanz {instance_id})",
-                    "return_code": return_code,
-                    "log_file": str(log_path),
-                    "instance_id": instance_id
-                }
+            return await self._monitor_instance(project_path, instance_id, supervisor_state, state,
+                                                status_writer, progress_tracker, on_progress, on_checkpoint,
+                                                task_id or instance_id or project_path.name)
                 
         except Exception as e:
             logger.error(f"Fehler bei WebODM-CLI Verarbeitung (Instanz {instance_id}): {e}")
-            if 'status_file' in locals():
-                await self._update_status(status_file, "failed", f"Fehler: {str(e)}", 0)
+            if 'status_writer' in locals():
+                await status_writer.update("failed", f"Fehler: {str(e)}", 0, force=True)
             raise
             
-    async def _read_process_output(self, process):
-        """Liest Prozess-Output zeilenweise"""
-        while True:
-            line = await process.stdout.readline()
-            if not line:
-                break
-            yield line.decode().strip()
-            
-    def _parse_progress(self, line: str) -> Optional[int]:
-        """Parst Fortschritt aus WebODM-CLI Output"""
-        # Verschiedene Progress-Patterns
-        patterns = [
-            r'(\d+)%',  # Direkte Prozentangabe
-            r'(\d+)/(\d+)',  # Schritt x von y
-            r'Progress: (\d+)',  # Progress: x
-        ]
+    async def attach_instance(self, project_path: str, instance_id: str = None,
+                              resources: Optional[ResourceSlot] = None,
+                              on_progress: Optional[Callable[[int, Optional[str]], None]] = None,
+                              on_checkpoint: Optional[Callable[[str], Awaitable[None]]] = None,
+                              task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Hängt sich nach einem Backend-Neustart an eine Instanz, deren Supervisor noch läuft
+        oder inzwischen beendet ist, und liefert das Ergebnis wie process_images
         
-        for pattern in patterns:
-            match = re.search(pattern, line)
-            if match:
-                if '/' in pattern:
-                    # x/y Format
-                    current, total = map(int, match.groups())
-                    return int((current / total) * 100)
-                else:
-                    # Direkte Prozentangabe
-                    return int(match.group(1))
-                    
-        return None
+        Returns:
+            Ergebnis-Dict oder None, wenn es keinen Supervisor (mehr) gibt
+        """
+        project_path = Path(project_path)
+        supervisor_state = state_path(project_path, instance_id)
+        state = read_state(supervisor_state)
+        if state is None or (state.get("status") != "exited" and not is_supervisor_active(state)):
+            return None
+            
+        logger.info(f"WebODM-CLI Instanz {instance_id} wieder aufgenommen (Supervisor PID {state['pid']})")
+        if resources is not None:
+            resources.pid = state["pid"]
+            
+        instance_suffix = f"_{instance_id}" if instance_id else ""
+        status_writer = StatusFileWriter(project_path / f"processing_status{instance_suffix}.json")
+        # Die Log-Datei wird von vorn gelesen, der Fortschritt daraus neu aufgebaut
+        progress_tracker = ODMProgressTracker(state.get("info", {}).get("resume_after"))
+        try:
+            return await self._monitor_instance(project_path, instance_id, supervisor_state, state,
+                                                status_writer, progress_tracker, on_progress, on_checkpoint,
+                                                task_id or instance_id or project_path.name)
+        except Exception as e:
+            logger.error(f"Fehler bei WebODM-CLI Verarbeitung (Instanz {instance_id}): {e}")
+            await status_writer.update("failed", f"Fehler: {str(e)}", 0, force=True)
+            raise
+            
+    async def _monitor_instance(self, project_path: Path, instance_id: Optional[str], supervisor_state: Path,
+                                state: Dict[str, Any], status_writer: StatusFileWriter,
+                                progress_tracker: ODMProgressTracker,
+                                on_progress: Optional[Callable[[int, Optional[str]], None]],
+                                on_checkpoint: Optional[Callable[[str], Awaitable[None]]],
+                                log_key: str) -> Dict[str, Any]:
+        """Verfolgt die Log-Datei einer Instanz bis zum Ende und sammelt die Ergebnisse"""
+        instance_suffix = f"_{instance_id}" if instance_id else ""
+        output_path = project_path / f"output{instance_suffix}"
+        temp_path = project_path / f"temp{instance_suffix}"
+        log_path = Path(state["log_file"])
+        staging = state.get("info", {}).get("staging")
+        checkpoint_file = checkpoint_path(project_path, instance_id)
+        checkpoint = progress_tracker.completed_stage
         
-    async def _update_status(self, status_file: Path, status: str, message: str, progress: int):
-        """Aktualisiert Status-Datei"""
-        status_data = {
-            "status": status,
-            "message": message,
-            "progress": progress,
-            "timestamp": datetime.now().isoformat()
-        }
+        # Output in den Ringpuffer (Live-Ansicht); die Log-Datei schreibt der Supervisor
+        job_log = job_logs.open(log_key)
+        try:
+            async for line in follow_log(log_path, supervisor_state):
+                await job_log.append(line)
+                
+                # Stufengewichteter Fortschritt, Status-Datei gedrosselt
+                progress = progress_tracker.feed(line)
+                if progress is not None:
+                    await status_writer.update("running", line, progress, progress_tracker.stage)
+                    if on_progress:
+                        on_progress(int(progress), progress_tracker.stage)
+                        
+                # Abgeschlossene Stufe festhalten, damit ein Neustart dort fortsetzen kann
+                if progress_tracker.completed_stage != checkpoint:
+                    checkpoint = progress_tracker.completed_stage
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, write_checkpoint, checkpoint_file, checkpoint
+                    )
+                    if on_checkpoint:
+                        await on_checkpoint(checkpoint)
+        except BaseException:
+            if not job_log.finished:
+                await job_log.finish("failed")
+            raise
+                    
+        # Exit-Status aus der Status-Datei des Supervisors
+        return_code = (read_state(supervisor_state) or {}).get("return_code")
+        await job_log.finish("completed" if return_code == 0 else "failed")
+        supervisor_state.unlink(missing_ok=True)
         
-        with open(status_file, 'w') as f:
-            json.dump(status_data, f, indent=2)
+        if return_code == 0:
+            # Erfolgreiche Verarbeitung
+            results = await self._collect_results(output_path)
+            await status_writer.update("completed", f"Verarbeitung erfolgreich abgeschlossen (Instanz {instance_id})", 100, force=True)
+            
+            # Potree-Viewer vorbereiten falls Punktwolke vorhanden
+            if results.get("point_cloud"):
+                await self._prepare_potree_viewer(project_path, results["point_cloud"])
+            
+            # Temp-Verzeichnis aufräumen, ein Fortsetzen ist nicht mehr nötig
+            if temp_path.exists():
+                shutil.rmtree(temp_path)
+            checkpoint_file.unlink(missing_ok=True)
+                
+            return {
+                "status": "completed",
+                "message": f"Verarbeitung erfolgreich abgeschlossen (Instanz {instance_id})",
+                "results": results,
+                "log_file": str(log_path),
+                "instance_id": instance_id,
+                "staging": staging
+            }
+        else:
+            # Fehler bei Verarbeitung (ohne Exit-Status: Supervisor abgebrochen)
+            await status_writer.update("failed", f"Verarbeitung fehlgeschlagen (Instanz {instance_id})",
+                                       progress_tracker.progress, progress_tracker.stage, force=True)
+            return {
+                "status": "failed",
+                "message": f"WebODM-CLI Verarbeitung fehlgeschlagen (Instanz {instance_id})",
+                "return_code": return_code,
+                "log_file": str(log_path),
+                "instance_id": instance_id,
+                "staging": staging
+            }
             
     async def _collect_results(self, output_path: Path) -> Dict[str, Any]:
         """Sammelt Verarbeitungsergebnisse"""
@@ -366,11 +454,12 @@ class WebODMCLIService:
         try:
             project_path = Path(project_path)
             
-            # Eingabebilder löschen (Speicherplatz sparen)
-            images_path = project_path / "images"
-            if images_path.exists():
-                shutil.rmtree(images_path)
-                logger.info(f"Eingabebilder gelöscht: {images_path}")
+            # Bereitgestellte Eingabebilder löschen (auch instanzspezifische images_*)
+            # Bei Hardlinks bleibt die Upload-Datei erhalten
+            for images_path in project_path.glob("images*"):
+                if images_path.is_dir():
+                    shutil.rmtree(images_path)
+                    logger.info(f"Eingabebilder gelöscht: {images_path}")
                 
             # Temporäre Dateien löschen
             temp_files = project_path.glob("*.tmp")
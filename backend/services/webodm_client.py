@@ -0,0 +1,259 @@
+"""
+WebODM HTTP-Client für ChiliView
+Prozessweiter httpx-Client mit Keep-Alive-Pool und zwischengespeichertem Auth-Token
+
+Statt pro Aufruf einen neuen Client aufzubauen und sich neu anzumelden, teilen sich
+routers/upload.py und services/webodm_service.py einen Client. Das Token wird nur bei
+Ablauf (exp-Claim des JWT, sonst WEBODM_TOKEN_TTL) oder nach einer 401-Antwort erneuert.
+Die Zahl der Logins der letzten Stunde steht in stats() für das Monitoring.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Sicherheitsabstand vor Token-Ablauf (Sekunden)
+TOKEN_REFRESH_MARGIN = 300
+
+
+def _configured_token_ttl() -> int:
+    """Token-Lebensdauer, falls das Token kein exp enthält (WEBODM_TOKEN_TTL, Sekunden)"""
+    env_ttl = os.getenv("WEBODM_TOKEN_TTL")
+    if env_ttl and env_ttl.isdigit():
+        return int(env_ttl)
+    return 6 * 3600  # WebODM-Standard (JWT_EXPIRATION_DELTA)
+
+
+def _configured_int(name: str, default: int, minimum: int = 1) -> int:
+    """Ganzzahlige Einstellung aus der Umgebung"""
+    env_value = os.getenv(name)
+    if env_value and env_value.isdigit():
+        return max(minimum, int(env_value))
+    return default
+
+
+# Partial-Upload von Task-Bildern: Bilder pro Anfrage, parallele Anfragen, Wiederholungen pro Batch
+WEBODM_UPLOAD_BATCH_FILES = _configured_int("WEBODM_UPLOAD_BATCH_FILES", 20)
+WEBODM_UPLOAD_CONCURRENCY = _configured_int("WEBODM_UPLOAD_CONCURRENCY", 4)
+WEBODM_UPLOAD_RETRIES = _configured_int("WEBODM_UPLOAD_RETRIES", 3, minimum=0)
+
+# Asset-Download: parallele Assets und Wiederaufnahmen pro Asset
+WEBODM_DOWNLOAD_CONCURRENCY = _configured_int("WEBODM_DOWNLOAD_CONCURRENCY", 3)
+WEBODM_DOWNLOAD_RETRIES = _configured_int("WEBODM_DOWNLOAD_RETRIES", 5, minimum=0)
+
+
+# Statuscodes von WebODM-Tasks
+WEBODM_TASK_STATUS = {
+    10: "queued",
+    20: "processing",
+    30: "completed",
+    40: "failed",
+    50: "canceled"
+}
+
+
+class WebODMAuthError(Exception):
+    """Anmeldung bei WebODM fehlgeschlagen"""
+    pass
+
+
+def _token_expiry(token: str, fallback_ttl: int) -> float:
+    """Ablaufzeit (time.time) aus dem exp-Claim, ohne Signaturprüfung"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except Exception:
+        return time.time() + fallback_ttl
+
+
+class WebODMClient:
+    """
+    Gemeinsamer WebODM-Client (ein Verbindungspool, ein Token pro Prozess)
+    Nur innerhalb eines Event-Loops verwenden
+    """
+
+    def __init__(self, base_url: str, username: str, password: str,
+                 token_ttl: int = 6 * 3600, max_connections: int = 20):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.token_ttl = token_ttl
+        self.max_connections = max_connections
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+        self._login_lock = asyncio.Lock()
+
+        # Statistik für Monitoring
+        self.logins_total = 0
+        self.requests_total = 0
+        self.unauthorized_retries = 0
+        self._login_times: deque = deque()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=120.0
+                )
+            )
+        return self._client
+
+    def _token_valid(self) -> bool:
+        return self._token is not None and time.time() < self._token_expires - TOKEN_REFRESH_MARGIN
+
+    async def token(self, force_refresh: bool = False) -> str:
+        """Liefert ein gültiges Token; meldet sich nur bei Bedarf neu an"""
+        if not force_refresh and self._token_valid():
+            return self._token
+
+        stale_token = self._token
+        async with self._login_lock:
+            # Ein anderer Aufrufer hat während des Wartens bereits erneuert
+            if self._token != stale_token and self._token_valid():
+                return self._token
+            if not force_refresh and self._token_valid():
+                return self._token
+            return await self._login()
+
+    async def _login(self) -> str:
+        response = await self.client.post(
+            "/api/token-auth/",
+            data={"username": self.username, "password": self.password}
+        )
+        if response.status_code != 200:
+            raise WebODMAuthError(f"WebODM Login fehlgeschlagen: {response.status_code}")
+
+        self._token = response.json()["token"]
+        self._token_expires = _token_expiry(self._token, self.token_ttl)
+
+        now = time.time()
+        self.logins_total += 1
+        self._login_times.append(now)
+        self._prune_logins(now)
+        logger.info("WebODM-Token erneuert")
+        return self._token
+
+    def _prune_logins(self, now: float):
+        while self._login_times and self._login_times[0] < now - 3600:
+            self._login_times.popleft()
+
+    async def request(self, method: str, path: str, authenticated: bool = True,
+                      **kwargs) -> httpx.Response:
+        """
+        Sendet eine Anfrage über den gemeinsamen Pool
+        Bei 401 wird das Token einmal erneuert und die Anfrage wiederholt
+        (Multipart-Dateien müssen dafür zurückspulbar sein)
+        """
+        self.requests_total += 1
+        if not authenticated:
+            return await self.client.request(method, path, **kwargs)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"JWT {await self.token()}"
+        response = await self.client.request(method, path, headers=headers, **kwargs)
+
+        if response.status_code == 401:
+            self.unauthorized_retries += 1
+            await response.aclose()
+            self._rewind_files(kwargs.get("files"))
+            headers["Authorization"] = f"JWT {await self.token(force_refresh=True)}"
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+
+        return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, path: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        Wie request(), liefert die Antwort aber ungelesen zum blockweisen Lesen
+        (für große Downloads; Body ohne Dateien, damit ein 401 wiederholt werden kann)
+        """
+        self.requests_total += 1
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"JWT {await self.token()}"
+        response = await self.client.send(
+            self.client.build_request(method, path, headers=headers, **kwargs), stream=True
+        )
+
+        if response.status_code == 401:
+            self.unauthorized_retries += 1
+            await response.aclose()
+            headers["Authorization"] = f"JWT {await self.token(force_refresh=True)}"
+            response = await self.client.send(
+                self.client.build_request(method, path, headers=headers, **kwargs), stream=True
+            )
+
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    @staticmethod
+    def _rewind_files(files):
+        for _, value in files or ():
+            file_obj = value[1] if isinstance(value, tuple) else value
+            if hasattr(file_obj, "seek"):
+                file_obj.seek(0)
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        self._prune_logins(now)
+        return {
+            "base_url": self.base_url,
+            "logins_last_hour": len(self._login_times),
+            "logins_total": self.logins_total,
+            "requests_total": self.requests_total,
+            "unauthorized_retries": self.unauthorized_retries,
+            "token_valid_for_s": max(0, int(self._token_expires - now)) if self._token else 0
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_webodm_client: Optional[WebODMClient] = None
+
+
+def get_webodm_client() -> WebODMClient:
+    """Prozessweite WebODMClient-Instanz (Konfiguration aus WEBODM_URL/USERNAME/PASSWORD)"""
+    global _webodm_client
+    if _webodm_client is None:
+        _webodm_client = WebODMClient(
+            os.getenv("WEBODM_URL", "http://webodm-cli:8080"),
+            os.getenv("WEBODM_USERNAME", "admin"),
+            os.getenv("WEBODM_PASSWORD", "admin"),
+            token_ttl=_configured_token_ttl(),
+            max_connections=_configured_int("WEBODM_MAX_CONNECTIONS", 20)
+        )
+    return _webodm_client
+
+
+async def close_webodm_client():
+    if _webodm_client is not None:
+        await _webodm_client.close()
@@ -0,0 +1,123 @@
+"""
+WebODM-Projekte pro Reseller für ChiliView
+Alle Tasks eines Resellers landen in einem gemeinsamen WebODM-Projekt
+
+Das Projekt wird beim ersten Auftrag angelegt (bzw. über den Namen wiedergefunden) und
+seine ID in der SystemConfig der zentralen Datenbank (Schlüssel "webodm_project_{reseller_id}")
+sowie im Speicher zwischengespeichert. Wurde das Projekt in WebODM gelöscht, verwirft
+invalidate() den Eintrag und der nächste Auftrag legt es neu an.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from database.database import get_database
+from database.models import SystemConfig
+from services.webodm_client import WebODMClient
+
+logger = logging.getLogger(__name__)
+
+
+def webodm_project_name(reseller_id: str) -> str:
+    return f"ChiliView_Reseller_{reseller_id}"
+
+
+def _config_key(reseller_id: str) -> str:
+    return f"webodm_project_{reseller_id}"
+
+
+class WebODMProjectStore:
+    """Zwischenspeicher der WebODM-Projekt-IDs pro Reseller"""
+
+    def __init__(self):
+        self._projects: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.created = 0
+
+    async def get_project(self, client: WebODMClient, reseller_id: str) -> int:
+        """WebODM-Projekt-ID des Resellers, bei Bedarf angelegt"""
+        project_id = self._projects.get(reseller_id)
+        if project_id is not None:
+            return project_id
+
+        # Gleichzeitige Aufträge desselben Resellers legen das Projekt nur einmal an
+        lock = self._locks.setdefault(reseller_id, asyncio.Lock())
+        async with lock:
+            project_id = self._projects.get(reseller_id)
+            if project_id is None:
+                project_id = self._load(reseller_id)
+            if project_id is None:
+                project_id = await self._find_or_create(client, reseller_id)
+                self._save(reseller_id, project_id)
+            self._projects[reseller_id] = project_id
+            return project_id
+
+    def invalidate(self, reseller_id: str):
+        """Eintrag verwerfen, z.B. nachdem das Projekt in WebODM gelöscht wurde"""
+        self._projects.pop(reseller_id, None)
+        db = get_database()
+        try:
+            db.query(SystemConfig).filter(SystemConfig.key == _config_key(reseller_id)).delete()
+            db.commit()
+        finally:
+            db.close()
+        logger.warning(f"WebODM-Projekt für Reseller {reseller_id} verworfen")
+
+    def _load(self, reseller_id: str) -> Optional[int]:
+        db = get_database()
+        try:
+            config = db.query(SystemConfig).filter(SystemConfig.key == _config_key(reseller_id)).first()
+            if config is not None and config.value and config.value.isdigit():
+                return int(config.value)
+            return None
+        finally:
+            db.close()
+
+    def _save(self, reseller_id: str, project_id: int):
+        db = get_database()
+        try:
+            config = db.query(SystemConfig).filter(SystemConfig.key == _config_key(reseller_id)).first()
+            if config is None:
+                config = SystemConfig(
+                    key=_config_key(reseller_id),
+                    description=f"WebODM-Projekt für Reseller {reseller_id}"
+                )
+                db.add(config)
+            config.value = str(project_id)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _find_or_create(self, client: WebODMClient, reseller_id: str) -> int:
+        name = webodm_project_name(reseller_id)
+
+        # Projekt aus einem früheren Lauf ohne SystemConfig-Eintrag wiederverwenden
+        response = await client.get("/api/projects/", params={"name": name})
+        if response.status_code == 200:
+            for project in response.json():
+                if project.get("name") == name:
+                    logger.info(f"WebODM-Projekt {project['id']} für Reseller {reseller_id} wiedergefunden")
+                    return project["id"]
+
+        response = await client.post("/api/projects/", json={
+            "name": name,
+            "description": f"ChiliView-Verarbeitungen für Reseller {reseller_id}"
+        })
+        if response.status_code != 201:
+            raise Exception(f"WebODM Projekt-Erstellung fehlgeschlagen: {response.status_code}")
+
+        self.created += 1
+        project_id = response.json()["id"]
+        logger.info(f"WebODM-Projekt {project_id} für Reseller {reseller_id} erstellt")
+        return project_id
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached_projects": len(self._projects),
+            "created_projects": self.created
+        }
+
+
+# Globale Instanz
+webodm_projects = WebODMProjectStore()
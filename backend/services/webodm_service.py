@@ -4,36 +4,32 @@ Stellt sicher, dass WebODM vollständig konfiguriert und einsatzbereit ist
 """
 
 import asyncio
-import aiohttp
 import logging
-import os
-import json
 from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from services.webodm_client import WebODMAuthError, WebODMClient, get_webodm_client
 
 logger = logging.getLogger(__name__)
 
 class WebODMService:
-    """Service für WebODM-Integration mit automatischer Konfiguration"""
+    """
+    Service für WebODM-Integration mit automatischer Konfiguration
+    Verbindungen und Token kommen aus dem gemeinsamen WebODM-Client
+    """
     
-    def __init__(self):
-        self.base_url = os.getenv("WEBODM_URL", "http://webodm-webapp:8080")
-        self.username = os.getenv("WEBODM_USERNAME", "admin")
-        self.password = os.getenv("WEBODM_PASSWORD", "admin")
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.token: Optional[str] = None
-        self.token_expires: Optional[datetime] = None
+    def __init__(self, client: Optional[WebODMClient] = None):
+        self.client = client or get_webodm_client()
+        self.base_url = self.client.base_url
         
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession()
         await self.ensure_webodm_ready()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self.session:
-            await self.session.close()
+        """Async context manager exit (der gemeinsame Client bleibt offen)"""
+        pass
             
     async def ensure_webodm_ready(self) -> bool:
         """
@@ -71,10 +67,10 @@ class WebODMService:
         
         while (datetime.now() - start_time).seconds < timeout:
             try:
-                async with self.session.get(f"{self.base_url}/api/") as response:
-                    if response.status == 200:
-                        logger.info("WebODM ist verfügbar")
-                        return True
+                response = await self.client.get("/api/", authenticated=False)
+                if response.status_code == 200:
+                    logger.info("WebODM ist verfügbar")
+                    return True
             except Exception:
                 pass
                 
@@ -87,19 +83,13 @@ class WebODMService:
         """Stellt sicher, dass der Admin-Benutzer existiert"""
         try:
             # Versuche Login - wenn erfolgreich, existiert der Benutzer bereits
-            login_data = {
-                "username": self.username,
-                "password": self.password
-            }
-            
-            async with self.session.post(
-                f"{self.base_url}/api/token-auth/",
-                json=login_data
-            ) as response:
-                if response.status == 200:
-                    logger.info("WebODM Admin-Benutzer bereits vorhanden")
-                    return True
-                    
+            try:
+                await self.client.token()
+                logger.info("WebODM Admin-Benutzer bereits vorhanden")
+                return True
+            except WebODMAuthError:
+                pass
+                
             # Benutzer existiert nicht - über Django Management Command erstellen
             logger.info("Erstelle WebODM Admin-Benutzer...")
             
@@ -116,32 +106,13 @@ class WebODMService:
     async def _authenticate(self) -> bool:
         """Authentifiziert sich bei WebODM"""
         try:
-            login_data = {
-                "username": self.username,
-                "password": self.password
-            }
+            await self.client.token()
+            logger.info("WebODM-Authentifizierung erfolgreich")
+            return True
             
-            async with self.session.post(
-                f"{self.base_url}/api/token-auth/",
-                json=login_data
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    self.token = data.get("token")
-                    # Token ist 24 Stunden gültig
-                    self.token_expires = datetime.now() + timedelta(hours=23)
-                    
-                    # Session-Header setzen
-                    self.session.headers.update({
-                        "Authorization": f"JWT {self.token}"
-                    })
-                    
-                    logger.info("WebODM-Authentifizierung erfolgreich")
-                    return True
-                else:
-                    logger.error(f"WebODM-Login fehlgeschlagen: {response.status}")
-                    return False
-                    
+        except WebODMAuthError as e:
+            logger.error(str(e))
+            return False
         except Exception as e:
             logger.error(f"Fehler bei WebODM-Authentifizierung: {e}")
             return False
@@ -175,11 +146,8 @@ class WebODMService:
             logger.debug(f"Konnte Einstellung {key} nicht setzen: {e}")
             
     async def refresh_token_if_needed(self):
-        """Erneuert Token falls nötig"""
-        if (not self.token or 
-            not self.token_expires or 
-            datetime.now() >= self.token_expires - timedelta(minutes=5)):
-            await self._authenticate()
+        """Erneuert Token falls nötig (Ablauf oder 401 behandelt der gemeinsame Client)"""
+        await self.client.token()
             
     async def create_project(self, name: str, description: str = "") -> Optional[Dict]:
         """Erstellt ein neues WebODM-Projekt"""
@@ -191,17 +159,14 @@ class WebODMService:
                 "description": description
             }
             
-            async with self.session.post(
-                f"{self.base_url}/api/projects/",
-                json=project_data
-            ) as response:
-                if response.status == 201:
-                    project = await response.json()
-                    logger.info(f"WebODM-Projekt erstellt: {project['id']}")
-                    return project
-                else:
-                    logger.error(f"Fehler beim Erstellen des Projekts: {response.status}")
-                    return None
+            response = await self.client.post("/api/projects/", json=project_data)
+            if response.status_code == 201:
+                project = response.json()
+                logger.info(f"WebODM-Projekt erstellt: {project['id']}")
+                return project
+            else:
+                logger.error(f"Fehler beim Erstellen des Projekts: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"Fehler beim Erstellen des WebODM-Projekts: {e}")
@@ -247,17 +212,14 @@ class WebODMService:
             # Dies würde normalerweise über Multipart-Upload erfolgen
             # Hier vereinfacht dargestellt
             
-            async with self.session.post(
-                f"{self.base_url}/api/projects/{project_id}/tasks/",
-                json=task_data
-            ) as response:
-                if response.status == 201:
-                    task = await response.json()
-                    logger.info(f"WebODM-Aufgabe erstellt: {task['id']}")
-                    return task
-                else:
-                    logger.error(f"Fehler beim Erstellen der Aufgabe: {response.status}")
-                    return None
+            response = await self.client.post(f"/api/projects/{project_id}/tasks/", json=task_data)
+            if response.status_code == 201:
+                task = response.json()
+                logger.info(f"WebODM-Aufgabe erstellt: {task['id']}")
+                return task
+            else:
+                logger.error(f"Fehler beim Erstellen der Aufgabe: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"Fehler beim Erstellen der WebODM-Aufgabe: {e}")
@@ -268,14 +230,12 @@ class WebODMService:
         try:
             await self.refresh_token_if_needed()
             
-            async with self.session.get(
-                f"{self.base_url}/api/projects/{project_id}/tasks/{task_id}/"
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"Fehler beim Abrufen des Aufgabenstatus: {response.status}")
-                    return None
+            response = await self.client.get(f"/api/projects/{project_id}/tasks/{task_id}/")
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Fehler beim Abrufen des Aufgabenstatus: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"Fehler beim Abrufen des WebODM-Aufgabenstatus: {e}")
@@ -287,14 +247,15 @@ class WebODMService:
         try:
             await self.refresh_token_if_needed()
             
-            async with self.session.get(
-                f"{self.base_url}/api/projects/{project_id}/tasks/{task_id}/download/{asset_type}"
-            ) as response:
-                if response.status == 200:
-                    return await response.read()
-                else:
-                    logger.error(f"Fehler beim Herunterladen von {asset_type}: {response.status}")
-                    return None
+            response = await self.client.get(
+                f"/api/projects/{project_id}/tasks/{task_id}/download/{asset_type}",
+                timeout=300.0
+            )
+            if response.status_code == 200:
+                return response.content
+            else:
+                logger.error(f"Fehler beim Herunterladen von {asset_type}: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"Fehler beim Herunterladen der WebODM-Assets: {e}")
@@ -303,8 +264,8 @@ class WebODMService:
     async def health_check(self) -> bool:
         """Prüft ob WebODM gesund ist"""
         try:
-            async with self.session.get(f"{self.base_url}/api/") as response:
-                return response.status == 200
+            response = await self.client.get("/api/", authenticated=False)
+            return response.status_code == 200
         except Exception:
             return False
 
@@ -0,0 +1,30 @@
+"""
+Gemeinsame Test-Fixtures für das ChiliView Backend
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Backend-Module wie im laufenden Server importierbar machen (from services... / database...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.models import Base
+
+
+@pytest.fixture
+def reseller_db(tmp_path, monkeypatch):
+    """Leere Reseller-Datenbank im Speicher, Arbeitsverzeichnis (data/...) im tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,25 @@
+"""
+Tests für den stufengewichteten ODM-Fortschritt
+"""
+
+from services.odm_progress import STAGELESS_OUTPUT_LINES, ODMProgressTracker
+
+
+def test_setup_output_before_first_stage_is_ignored():
+    tracker = ODMProgressTracker()
+
+    assert tracker.feed("Downloading model weights 100%") is None
+    assert tracker.feed("Loading images 120/120") is None
+    assert tracker.feed("Running dataset stage") is None
+    assert tracker.progress == 0.0
+
+    assert tracker.feed("Running opensfm stage") == 2.0
+    assert tracker.feed("Reconstructing 50%") == 2.0 + 35 * 0.5
+
+
+def test_output_without_stages_counts_as_overall_progress():
+    tracker = ODMProgressTracker()
+
+    for _ in range(STAGELESS_OUTPUT_LINES):
+        tracker.feed("Verarbeite Bilder")
+    assert tracker.feed("Fortschritt 40%") == 40.0
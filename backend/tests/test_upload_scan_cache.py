@@ -0,0 +1,91 @@
+"""
+Tests für den Virenscan-Verdict-Cache auf den Upload-Endpunkten:
+bereits sauber gescannte Inhalte gehen nicht erneut an clamd
+"""
+
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from auth.auth_handler import require_user
+from database.models import User
+from routers import upload
+from services.clamav_client import ClamdClient
+from services.scan_cache import ScanVerdictCache
+from tools.fake_clamd import FakeClamd
+
+JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + os.urandom(200000)
+
+
+@pytest.fixture
+def upload_client(reseller_db, tmp_path, monkeypatch):
+    """Upload-Router mit Fake-clamd, eigenem Verdict-Cache und der Test-Datenbank"""
+    fake_clamd = FakeClamd(socket_path=str(tmp_path / "clamd.sock")).start()
+
+    scanner = upload.VirusScanner()
+    scanner.enabled = True
+    scanner.cache_enabled = True
+    scanner.client = ClamdClient(socket_path=fake_clamd.socket_path)
+    scanner.cache = ScanVerdictCache()
+    monkeypatch.setattr(upload, "virus_scanner", scanner)
+    monkeypatch.setattr(upload, "get_reseller_database", lambda reseller_id: reseller_db)
+
+    async def no_processing(project_id: int, reseller_id: str):
+        pass
+    monkeypatch.setattr(upload, "start_processing", no_processing)
+
+    user = User(username="u", email="u@example.com", password_hash="x", full_name="U",
+                max_projects=50, max_upload_size_mb=10)
+    reseller_db.add(user)
+    reseller_db.commit()
+    user_id = user.id
+
+    app = FastAPI()
+    app.include_router(upload.router, prefix="/api/upload")
+    app.dependency_overrides[require_user] = lambda: {
+        "sub": str(user_id), "reseller_id": "r1", "role": "user"
+    }
+
+    try:
+        with TestClient(app) as client:
+            yield client, fake_clamd
+    finally:
+        scanner.client.close()
+        fake_clamd.stop()
+
+
+def _upload(client, path: str, fields: dict):
+    return client.post(path, data={"project_name": "Flug", **fields},
+                       files=[("files", ("a.jpg", JPEG, "image/jpeg"))])
+
+
+def test_repeated_upload_is_not_rescanned(upload_client):
+    client, fake_clamd = upload_client
+
+    assert _upload(client, "/api/upload/", {}).status_code == 200
+    assert fake_clamd.files_scanned == 1
+
+    assert _upload(client, "/api/upload/", {}).status_code == 200
+    assert fake_clamd.files_scanned == 1
+
+
+def test_stream_with_declared_sha256_is_not_rescanned(upload_client):
+    client, fake_clamd = upload_client
+
+    assert _upload(client, "/api/upload/stream", {}).status_code == 200
+    assert fake_clamd.files_scanned == 1
+
+    declared = {"sha256": hashlib.sha256(JPEG).hexdigest()}
+    assert _upload(client, "/api/upload/stream", declared).status_code == 200
+    assert fake_clamd.files_scanned == 1
+
+
+def test_stream_rejects_wrong_declared_sha256(upload_client):
+    client, fake_clamd = upload_client
+
+    assert _upload(client, "/api/upload/", {}).status_code == 200
+    other = {"sha256": hashlib.sha256(b"anderer Inhalt").hexdigest()}
+    assert _upload(client, "/api/upload/stream", other).status_code == 400
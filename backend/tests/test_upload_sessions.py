@@ -0,0 +1,85 @@
+"""
+Tests für die Upload-Sitzungen: Freigabe nach einem Absturz während des Commits
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from database.models import Project, UploadSession, UploadSessionFile
+from services.upload_sessions import (
+    UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES, active_commits, expire_upload_sessions, part_path,
+    project_file_path
+)
+
+RESELLER_ID = "r1"
+
+
+def _crashed_commit(reseller_db, expires_in: timedelta) -> UploadSession:
+    """
+    Stellt den Zustand nach einem Absturz mitten im Commit nach: Status "committing",
+    halb angelegtes Projekt, eine Datei bereits ins Projekt verschoben, eine noch in der Sitzung
+    """
+    project = Project(project_uuid="p-1", name="Flug", user_id=1, status="uploading")
+    reseller_db.add(project)
+    reseller_db.commit()
+    upload_dir = Path(f"data/resellers/{RESELLER_ID}/projects/{project.id}/upload")
+    upload_dir.mkdir(parents=True)
+    project.upload_path = str(upload_dir)
+
+    upload_session = UploadSession(
+        session_uuid="s-1", user_id=1, project_name="Flug", project_id=project.id,
+        status="committing", total_size_bytes=8,
+        expires_at=datetime.utcnow() + expires_in,
+        updated_at=datetime.utcnow() - timedelta(minutes=UPLOAD_SESSION_COMMIT_TIMEOUT_MINUTES + 1)
+    )
+    upload_session.files = [
+        UploadSessionFile(file_index=0, filename="a.jpg", size_bytes=4, received_bytes=4),
+        UploadSessionFile(file_index=1, filename="b.jpg", size_bytes=4, received_bytes=4),
+    ]
+    reseller_db.add(upload_session)
+    reseller_db.commit()
+
+    part_path(RESELLER_ID, "s-1", 0).parent.mkdir(parents=True)
+    project_file_path(upload_dir, 0, "a.jpg").write_bytes(b"aaaa")
+    part_path(RESELLER_ID, "s-1", 1).write_bytes(b"bbbb")
+    return upload_session
+
+
+def test_expiry_releases_crashed_commit(reseller_db):
+    upload_session = _crashed_commit(reseller_db, timedelta(hours=1))
+    upload_dir = Path(reseller_db.query(Project).one().upload_path)
+
+    expire_upload_sessions(reseller_db, RESELLER_ID)
+
+    reseller_db.refresh(upload_session)
+    assert upload_session.status == "open"
+    assert upload_session.project_id is None
+    assert [f.received_bytes for f in upload_session.files] == [4, 4]
+    assert part_path(RESELLER_ID, "s-1", 0).read_bytes() == b"aaaa"
+    assert part_path(RESELLER_ID, "s-1", 1).read_bytes() == b"bbbb"
+    assert reseller_db.query(Project).count() == 0
+    assert not upload_dir.parent.exists()
+
+
+def test_expiry_aborts_expired_crashed_commit(reseller_db):
+    upload_session = _crashed_commit(reseller_db, timedelta(hours=-1))
+
+    expire_upload_sessions(reseller_db, RESELLER_ID)
+
+    reseller_db.refresh(upload_session)
+    assert upload_session.status == "aborted"
+    assert not part_path(RESELLER_ID, "s-1", 0).parent.exists()
+    assert reseller_db.query(Project).count() == 0
+
+
+def test_expiry_keeps_commit_running_in_this_process(reseller_db):
+    upload_session = _crashed_commit(reseller_db, timedelta(hours=1))
+    active_commits.add("s-1")
+    try:
+        expire_upload_sessions(reseller_db, RESELLER_ID)
+    finally:
+        active_commits.discard("s-1")
+
+    reseller_db.refresh(upload_session)
+    assert upload_session.status == "committing"
+    assert reseller_db.query(Project).count() == 1
@@ -0,0 +1,126 @@
+"""
+ChiliView ClamAV-Benchmark
+Vergleicht den Durchsatz pro 1000 Dateien zwischen dem alten Scan-Muster
+(neue Verbindung pro Befehl: PING, Scan, VERSION) und dem gepoolten ClamdClient
+(IDSESSION, INSTREAM, gecachte Version) gegen den lokalen Fake-clamd
+
+Aufruf (im backend-Verzeichnis):
+    python tools/bench_clamav.py --files 1000 --size-kb 512 --latency-ms 0.2
+    python tools/bench_clamav.py --tcp   # clamd im Container simulieren
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+# Backend-Pfad zum Python-Path hinzufügen
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.clamav_client import ClamdClient
+from tools.fake_clamd import FakeClamd
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _legacy_command(connect, command: bytes, payload: bytes = None) -> bytes:
+    """Ein Befehl über eine frische Verbindung (wie pyclamd pro Aufruf)"""
+    sock = connect()
+    try:
+        sock.sendall(command)
+        if payload is not None:
+            view = memoryview(payload)
+            for offset in range(0, len(payload), CHUNK_SIZE):
+                chunk = view[offset:offset + CHUNK_SIZE]
+                sock.sendall(struct.pack("!L", len(chunk)) + chunk)
+            sock.sendall(struct.pack("!L", 0))
+        reply = b""
+        while not reply.endswith(b"\0"):
+            data = sock.recv(4096)
+            if not data:
+                break
+            reply += data
+        return reply
+    finally:
+        sock.close()
+
+
+def legacy_scan(connect, payload: bytes):
+    """Altes Muster: Verbindung + PING, Scan, bis zu zweimal VERSION"""
+    _legacy_command(connect, b"zPING\0")
+    _legacy_command(connect, b"zINSTREAM\0", payload)
+    _legacy_command(connect, b"zVERSION\0")
+    _legacy_command(connect, b"zVERSION\0")
+
+
+def pooled_scan(client: ClamdClient, payload: bytes):
+    session = client.open_stream()
+    view = memoryview(payload)
+    for offset in range(0, len(payload), CHUNK_SIZE):
+        session.feed(bytes(view[offset:offset + CHUNK_SIZE]))
+    session.finish()
+
+
+def run(name: str, scan, payload: bytes, file_count: int, fake: FakeClamd) -> dict:
+    fake.reset_stats()
+    start = time.perf_counter()
+    for _ in range(file_count):
+        scan(payload)
+    duration = time.perf_counter() - start
+    return {
+        "name": name,
+        "per_1000": duration / file_count * 1000,
+        "files_per_s": file_count / duration,
+        "connections": fake.connections,
+        "commands": fake.commands
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiliView ClamAV-Benchmark")
+    parser.add_argument("--files", type=int, default=1000, help="Anzahl Dateien")
+    parser.add_argument("--size-kb", type=int, default=512, help="Größe pro Datei in KB")
+    parser.add_argument("--latency-ms", type=float, default=0.2, help="Verzögerung pro clamd-Antwort")
+    parser.add_argument("--tcp", action="store_true", help="TCP statt Unix-Socket")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_kb * 1024)
+    work_dir = tempfile.mkdtemp(prefix="chiliview_clamd_")
+
+    if args.tcp:
+        fake = FakeClamd(host="127.0.0.1", latency_ms=args.latency_ms).start()
+        client = ClamdClient(host="127.0.0.1", port=fake.port)
+
+        def connect():
+            return socket.create_connection(("127.0.0.1", fake.port))
+    else:
+        socket_path = os.path.join(work_dir, "clamd.sock")
+        fake = FakeClamd(socket_path=socket_path, latency_ms=args.latency_ms).start()
+        client = ClamdClient(socket_path=socket_path)
+
+        def connect():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(socket_path)
+            return sock
+
+    try:
+        print(f"🦠 {args.files} Dateien à {args.size_kb} KB über {'TCP' if args.tcp else 'Unix-Socket'}, "
+              f"{args.latency_ms} ms Latenz pro Antwort")
+        for result in (
+            run("legacy", lambda p: legacy_scan(connect, p), payload, args.files, fake),
+            run("pooled", lambda p: pooled_scan(client, p), payload, args.files, fake),
+        ):
+            print(f"  {result['name']:>6}: {result['per_1000']:.2f}s pro 1000 Dateien "
+                  f"({result['files_per_s']:.0f} Dateien/s), "
+                  f"{result['connections']} Verbindungen, {result['commands']} Befehle")
+    finally:
+        client.close()
+        fake.stop()
+        os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
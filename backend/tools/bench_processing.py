@@ -0,0 +1,129 @@
+"""
+ChiliView Verarbeitungs-Benchmark
+Misst die Pipeline des NodeODM-Backends (Upload, Statusabfrage, Ergebnis-Download)
+gegen lokale Fake-NodeODM-Knoten, ohne ODM und ohne WebODM
+
+Aufruf (im backend-Verzeichnis):
+    python tools/bench_processing.py --projects 4 --images 200 --size-kb 512
+    python tools/bench_processing.py --nodes 3 --upload-error-rate 0.05 --download-cut-rate 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Backend-Pfad zum Python-Path hinzufügen
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.nodeodm_backend import NodeODMBackend
+from services.processing_backend import ProcessingJob
+from tools.fake_nodeodm import FakeNodeODM
+
+MB = 1024 * 1024
+
+
+def create_images(path: Path, count: int, size: int):
+    path.mkdir(parents=True, exist_ok=True)
+    payload = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + os.urandom(size - 11)
+    for i in range(count):
+        (path / f"IMG_{i:05d}.jpg").write_bytes(payload)
+
+
+async def run_project(backend: NodeODMBackend, job: ProcessingJob, output_path: Path) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    task_ref = await backend.submit(job)
+    timings["upload"] = time.perf_counter() - start
+
+    polls = 0
+    while True:
+        polls += 1
+        task_status = (await backend.fetch_statuses([task_ref])).get(task_ref)
+        if task_status is not None and task_status.final:
+            break
+        await asyncio.sleep(0.1)
+    timings["processing"] = time.perf_counter() - start - timings["upload"]
+
+    download_start = time.perf_counter()
+    manifest = {}
+    if task_status.status == "completed":
+        manifest = await backend.download_results(task_ref, output_path, task_status)
+    timings["download"] = time.perf_counter() - download_start
+    timings["total"] = time.perf_counter() - start
+
+    return {
+        "task_ref": task_ref,
+        "status": task_status.status,
+        "polls": polls,
+        "assets": len(manifest),
+        "bytes": sum(entry["size"] for entry in manifest.values()),
+        **timings
+    }
+
+
+async def benchmark(args, work_dir: Path):
+    fakes = []
+    for i in range(args.nodes):
+        fake = FakeNodeODM(
+            port=0, cores=args.cores * (i + 1), parallel=args.parallel,
+            seconds_per_image=args.seconds_per_image,
+            upload_error_rate=args.upload_error_rate, download_cut_rate=args.download_cut_rate
+        )
+        fake.start()
+        fakes.append(fake)
+
+    backend = NodeODMBackend(nodes=[fake.address for fake in fakes], token="")
+    try:
+        jobs = []
+        for project_id in range(1, args.projects + 1):
+            images_path = work_dir / f"upload_{project_id}"
+            create_images(images_path, args.images, args.size_kb * 1024)
+            jobs.append((ProcessingJob("bench", project_id, 1, str(images_path)),
+                         work_dir / f"output_{project_id}"))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_project(backend, job, output) for job, output in jobs))
+        duration = time.perf_counter() - start
+    finally:
+        await backend.close()
+        for fake in fakes:
+            fake.stop()
+
+    upload_mb = args.projects * args.images * args.size_kb / 1024
+    print(f"📦 {args.projects} Projekte à {args.images} Bilder ({args.size_kb} KB), {args.nodes} Knoten")
+    for result in results:
+        print(f"  {result['task_ref']}: {result['status']}, Upload {result['upload']:.2f}s, "
+              f"Verarbeitung {result['processing']:.2f}s, Download {result['download']:.2f}s "
+              f"({result['assets']} Assets, {result['bytes'] / MB:.1f} MB, {result['polls']} Abfragen)")
+    print(f"  gesamt: {duration:.2f}s, Upload-Durchsatz {upload_mb / max(r['upload'] for r in results):.0f} MB/s")
+    for fake in fakes:
+        print(f"  Knoten {fake.address}: {fake.images_received} Bilder, {len(fake.tasks)} offene Tasks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiliView Verarbeitungs-Benchmark (NodeODM)")
+    parser.add_argument("--projects", type=int, default=4, help="Gleichzeitige Projekte")
+    parser.add_argument("--images", type=int, default=100, help="Bilder pro Projekt")
+    parser.add_argument("--size-kb", type=int, default=256, help="Größe pro Bild in KB")
+    parser.add_argument("--nodes", type=int, default=2, help="Anzahl Fake-Knoten")
+    parser.add_argument("--cores", type=int, default=4, help="Kerne des ersten Knotens (weitere: Vielfache)")
+    parser.add_argument("--parallel", type=int, default=2, help="Parallele Aufgaben pro Knoten")
+    parser.add_argument("--seconds-per-image", type=float, default=0.01)
+    parser.add_argument("--upload-error-rate", type=float, default=0.0)
+    parser.add_argument("--download-cut-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="chiliview_bench_"))
+    try:
+        asyncio.run(benchmark(args, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+ChiliView Verarbeitungs-Kalibrierung
+Ermittelt die beste Kombination aus parallelen WebODM-CLI-Instanzen und Threads pro Instanz
+
+Ein kleiner synthetischer Datensatz (überlappende Ausschnitte einer zufälligen Textur mit
+EXIF/GPS, reproduzierbar über --seed) wird für jede Kombination mehrfach durch
+WebODMCLIService.process_images geschickt, mit denselben Slots wie in der Processing
+Queue (services/resource_allocator.py). Gemessen werden Aufträge pro Stunde und der
+Spitzen-RSS aller Instanzen. Empfohlen wird die schnellste Kombination, die in den
+Speicher passt; mit --apply landet sie in der SystemConfig und wird beim nächsten Start
+der Queue übernommen (MAX_WEBODM_INSTANCES hat weiterhin Vorrang).
+
+--fake-cli ersetzt webodm.sh durch tools/fake_odm_cli.py, um die Kalibrierung selbst
+ohne ODM zu testen.
+
+Aufruf (im backend-Verzeichnis):
+    python tools/calibrate_processing.py --instances 1,2,4 --threads auto
+    python tools/calibrate_processing.py --fake-cli --instances 1,2 --threads 1,2 --apply
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Backend-Pfad zum Python-Path hinzufügen
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.processing_queue import CALIBRATED_INSTANCES_KEY, CALIBRATED_THREADS_KEY
+from services.resource_allocator import MB, ResourceAllocator, process_tree_rss
+from services.webodm_cli_service import WebODMCLIService
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+FAKE_CLI = Path(__file__).resolve().parent / "fake_odm_cli.py"
+
+
+def create_dataset(path: Path, count: int, seed: int):
+    """
+    Synthetischer Flug: Raster überlappender Ausschnitte (ca. 70 %) aus einer Zufallstextur
+    Ohne Pillow nur Platzhalter-Dateien (reicht für --fake-cli)
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    if not PIL_AVAILABLE:
+        for i in range(count):
+            (path / f"IMG_{i:04d}.jpg").write_bytes(b"\xff\xd8\xff\xe0" + rng.randbytes(200_000))
+        return
+
+    tile_w, tile_h = 800, 600
+    step_x, step_y = tile_w * 3 // 10, tile_h * 3 // 10
+    columns = max(int(count ** 0.5), 1)
+    rows = (count + columns - 1) // columns
+
+    width, height = tile_w + step_x * (columns - 1), tile_h + step_y * (rows - 1)
+    texture = Image.frombytes("RGB", (width // 4, height // 4), rng.randbytes(width // 4 * (height // 4) * 3))
+    texture = texture.resize((width, height), Image.BICUBIC)
+
+    for i in range(count):
+        row, column = divmod(i, columns)
+        tile = texture.crop((column * step_x, row * step_y, column * step_x + tile_w, row * step_y + tile_h))
+
+        exif = Image.Exif()
+        exif[0x010F] = "ChiliView"          # Make
+        exif[0x0110] = "Synthetic"          # Model
+        gps = exif.get_ifd(0x8825)
+        gps[1], gps[3] = "N", "E"
+        gps[2] = (47.0, 0.0, 1.0 + row * 0.2)        # Breite (Grad, Minuten, Sekunden)
+        gps[4] = (8.0, 0.0, 1.0 + column * 0.3)      # Länge
+        gps[6] = 100.0                               # Flughöhe
+        tile.save(path / f"IMG_{i:04d}.jpg", quality=90, exif=exif)
+
+
+def fake_cli_wrapper(work_dir: Path) -> str:
+    """Ausführbarer Wrapper, damit der Fake wie webodm.sh aufgerufen werden kann"""
+    wrapper = work_dir / "webodm.sh"
+    wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CLI}" "$@"\n')
+    wrapper.chmod(wrapper.stat().st_mode | stat.S_IEXEC)
+    return str(wrapper)
+
+
+class RSSSampler(threading.Thread):
+    """Summiert den RSS aller Nachfahren dieses Prozesses (Linux /proc) und merkt sich die Spitze"""
+
+    def __init__(self, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, process_tree_rss(os.getpid(), include_root=False))
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+async def run_combination(service: WebODMCLIService, dataset: Path, work_dir: Path,
+                          instances: int, threads: Optional[int], jobs: int) -> Dict:
+    allocator = ResourceAllocator(instances)
+    allocator.configure(instances, threads)
+    slots = asyncio.Semaphore(instances)
+    failures = 0
+
+    async def job(index: int):
+        nonlocal failures
+        async with slots:
+            task_id = f"calib_{instances}_{threads}_{index}"
+            slot = allocator.allocate(task_id)
+            project_path = work_dir / task_id
+            (project_path / "logs").mkdir(parents=True, exist_ok=True)
+            try:
+                result = await service.process_images(
+                    str(project_path), str(dataset), instance_id=f"inst{index}", resources=slot
+                )
+                if result["status"] != "completed":
+                    failures += 1
+            except Exception as e:
+                print(f"  ❌ Auftrag {index}: {e}")
+                failures += 1
+            finally:
+                allocator.release(task_id)
+                shutil.rmtree(project_path, ignore_errors=True)
+
+    sampler = RSSSampler()
+    sampler.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(job(index) for index in range(jobs)))
+    duration = time.perf_counter() - start
+    peak_rss = sampler.stop()
+
+    return {
+        "instances": instances,
+        "threads": allocator.slots[0].threads,
+        "jobs": jobs,
+        "failures": failures,
+        "duration": duration,
+        "jobs_per_hour": (jobs - failures) / duration * 3600 if duration > 0 else 0.0,
+        "peak_rss": peak_rss,
+        "memory_budget": allocator.memory_bytes
+    }
+
+
+def recommend(results: List[Dict]) -> Optional[Dict]:
+    """Höchster Durchsatz ohne Fehlschläge, dessen Spitzen-RSS ins Speicherbudget passt"""
+    candidates = [r for r in results if r["failures"] == 0 and r["peak_rss"] <= r["memory_budget"]]
+    if not candidates:
+        return None
+    # Bei fast gleichem Durchsatz (< 5 %) die Variante mit weniger Instanzen bevorzugen
+    best = max(r["jobs_per_hour"] for r in candidates)
+    close = [r for r in candidates if r["jobs_per_hour"] >= best * 0.95]
+    return min(close, key=lambda r: (r["instances"], -r["jobs_per_hour"]))
+
+
+def save_recommendation(recommendation: Dict):
+    from database.database import get_database
+    from database.models import SystemConfig
+
+    values = {
+        CALIBRATED_INSTANCES_KEY: (str(recommendation["instances"]),
+                                   "Kalibrierte Anzahl paralleler WebODM-CLI-Instanzen"),
+        CALIBRATED_THREADS_KEY: (str(recommendation["threads"]),
+                                 "Kalibrierte Threads (--max-concurrency) pro Instanz")
+    }
+    db = get_database()
+    try:
+        for key, (value, description) in values.items():
+            config = db.query(SystemConfig).filter(SystemConfig.key == key).first()
+            if config is None:
+                config = SystemConfig(key=key, description=description)
+                db.add(config)
+            config.value = value
+        db.commit()
+    finally:
+        db.close()
+
+
+def parse_list(value: str) -> List[Optional[int]]:
+    return [None if item.strip() == "auto" else int(item) for item in value.split(",") if item.strip()]
+
+
+async def calibrate(args, work_dir: Path) -> List[Dict]:
+    dataset = work_dir / "dataset"
+    create_dataset(dataset, args.images, args.seed)
+    print(f"📷 Synthetischer Datensatz: {args.images} Bilder" + ("" if PIL_AVAILABLE else " (Platzhalter)"))
+
+    service = WebODMCLIService()
+    if args.fake_cli:
+        service.webodm_cli_path = fake_cli_wrapper(work_dir)
+    elif not service.webodm_cli_path:
+        raise SystemExit("❌ WebODM-CLI nicht gefunden (--fake-cli für einen Testlauf)")
+
+    results = []
+    for instances in parse_list(args.instances):
+        for threads in parse_list(args.threads):
+            jobs = instances * args.jobs_per_instance
+            result = await run_combination(service, dataset, work_dir, instances, threads, jobs)
+            results.append(result)
+            print(f"  {result['instances']} Instanzen × {result['threads']} Threads: "
+                  f"{result['jobs_per_hour']:.1f} Aufträge/h, {result['duration']:.1f}s für {jobs} Aufträge, "
+                  f"Spitze {result['peak_rss'] / MB:.0f} MB"
+                  + (f", {result['failures']} Fehler" if result["failures"] else ""))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiliView Verarbeitungs-Kalibrierung")
+    parser.add_argument("--instances", default="1,2,4", help="Zu testende Instanzanzahlen")
+    parser.add_argument("--threads", default="auto",
+                        help="Threads pro Instanz, 'auto' = alle Kerne des Slots")
+    parser.add_argument("--images", type=int, default=24, help="Bilder im synthetischen Datensatz")
+    parser.add_argument("--jobs-per-instance", type=int, default=2, help="Aufträge pro Instanz und Kombination")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fake-cli", action="store_true", help="tools/fake_odm_cli.py statt webodm.sh")
+    parser.add_argument("--apply", action="store_true", help="Empfehlung in die SystemConfig schreiben")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    work_dir = Path(tempfile.mkdtemp(prefix="chiliview_calib_"))
+    try:
+        results = asyncio.run(calibrate(args, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    recommendation = recommend(results)
+    if recommendation is None:
+        print("❌ Keine Kombination ohne Fehler innerhalb des Speicherbudgets")
+        sys.exit(1)
+
+    print(f"✅ Empfehlung: max_concurrent_jobs={recommendation['instances']}, "
+          f"--max-concurrency {recommendation['threads']} ({recommendation['jobs_per_hour']:.1f} Aufträge/h)")
+    if args.apply:
+        save_recommendation(recommendation)
+        print("💾 In SystemConfig gespeichert, wird beim nächsten Start der Queue übernommen")
+
+
+if __name__ == "__main__":
+    main()
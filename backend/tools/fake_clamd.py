@@ -0,0 +1,218 @@
+"""
+ChiliView Fake-clamd
+Lokaler Ersatz für den ClamAV-Daemon zum Testen und Benchmarken ohne ClamAV
+
+Unterstützt PING, VERSION, INSTREAM, IDSESSION/END (z- und n-Präfix) über
+Unix-Socket oder TCP. Dateien mit der EICAR-Testsignatur werden als infiziert gemeldet.
+
+Aufruf (im backend-Verzeichnis):
+    python tools/fake_clamd.py --tcp 127.0.0.1:3310
+    python tools/fake_clamd.py --socket /tmp/clamd.sock --latency-ms 0.5
+"""
+
+import argparse
+import os
+import socketserver
+import struct
+import threading
+import time
+from typing import Optional
+
+EICAR_SIGNATURE = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+DEFAULT_STREAM_MAX_LENGTH = 25 * 1024 * 1024  # clamd-Standard StreamMaxLength
+
+
+class _FakeClamdHandler(socketserver.BaseRequestHandler):
+    """Bearbeitet eine Client-Verbindung wie clamd"""
+
+    def setup(self):
+        self._buffer = bytearray()
+        self.server.fake.connections += 1
+
+    def _read(self, size: int) -> Optional[bytes]:
+        while len(self._buffer) < size:
+            data = self.request.recv(65536)
+            if not data:
+                return None
+            self._buffer += data
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _read_command(self):
+        """Liest einen Befehl: z<NAME>\\0 oder n<NAME>\\n"""
+        prefix = self._read(1)
+        if prefix is None:
+            return None, None
+        terminator = b"\0" if prefix == b"z" else b"\n"
+        while terminator not in self._buffer:
+            data = self.request.recv(4096)
+            if not data:
+                return None, None
+            self._buffer += data
+        end = self._buffer.index(terminator)
+        command = bytes(self._buffer[:end])
+        del self._buffer[:end + 1]
+        return command.decode().strip(), terminator
+
+    def _read_instream(self) -> str:
+        fake = self.server.fake
+        size = 0
+        tail = b""
+        infected = False
+        while True:
+            header = self._read(4)
+            if header is None:
+                raise ConnectionError("INSTREAM abgebrochen")
+            length = struct.unpack("!L", header)[0]
+            if length == 0:
+                break
+            chunk = self._read(length)
+            if chunk is None:
+                raise ConnectionError("INSTREAM abgebrochen")
+            size += length
+            if size > fake.stream_max_length:
+                return "INSTREAM size limit exceeded. ERROR"
+            # Signatur auch über Blockgrenzen hinweg erkennen
+            if EICAR_SIGNATURE in tail + chunk:
+                infected = True
+            tail = chunk[-len(EICAR_SIGNATURE):]
+
+        fake.files_scanned += 1
+        fake.bytes_scanned += size
+        if infected:
+            return "stream: Eicar-Test-Signature FOUND"
+        return "stream: OK"
+
+    def handle(self):
+        fake = self.server.fake
+        session = False
+        request_id = 0
+
+        while True:
+            command, terminator = self._read_command()
+            if command is None:
+                return
+
+            if command == "IDSESSION":
+                session = True
+                continue
+            if command == "END":
+                return
+
+            request_id += 1
+            fake.commands += 1
+
+            try:
+                if command == "PING":
+                    reply = "PONG"
+                elif command == "VERSION":
+                    reply = fake.version
+                elif command == "INSTREAM":
+                    reply = self._read_instream()
+                else:
+                    reply = "UNKNOWN COMMAND"
+            except ConnectionError:
+                return
+
+            if fake.latency:
+                time.sleep(fake.latency)
+
+            prefix = f"{request_id}: " if session else ""
+            self.request.sendall((prefix + reply).encode() + terminator)
+
+            if not session:
+                return
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _ThreadingUnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class FakeClamd:
+    """
+    Fake-clamd-Server mit Zählern für Tests und Benchmarks
+
+    Als TCP-Server: FakeClamd(host="127.0.0.1", port=0) – port wird nach start() gesetzt
+    Als Unix-Socket: FakeClamd(socket_path="/tmp/clamd.sock")
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, host: Optional[str] = None,
+                 port: int = 0, latency_ms: float = 0.0, signature_version: int = 27000,
+                 stream_max_length: int = DEFAULT_STREAM_MAX_LENGTH):
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000.0
+        self.signature_version = signature_version
+        self.stream_max_length = stream_max_length
+        self._server = None
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def version(self) -> str:
+        return f"ClamAV 1.2.1/{self.signature_version}/Fri Oct 16 08:00:00 2026"
+
+    def reset_stats(self):
+        self.connections = 0
+        self.commands = 0
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+
+    def start(self) -> "FakeClamd":
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self._server = _ThreadingUnixServer(self.socket_path, _FakeClamdHandler)
+        else:
+            self._server = _ThreadingTCPServer((self.host or "127.0.0.1", self.port), _FakeClamdHandler)
+            self.port = self._server.server_address[1]
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiliView Fake-clamd")
+    parser.add_argument("--socket", help="Unix-Socket-Pfad")
+    parser.add_argument("--tcp", default="127.0.0.1:3310", help="TCP-Adresse host:port")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Verzögerung pro Antwort")
+    parser.add_argument("--signature-version", type=int, default=27000)
+    args = parser.parse_args()
+
+    if args.socket:
+        fake = FakeClamd(socket_path=args.socket, latency_ms=args.latency_ms,
+                         signature_version=args.signature_version)
+        address = args.socket
+    else:
+        host, port = args.tcp.rsplit(":", 1)
+        fake = FakeClamd(host=host, port=int(port), latency_ms=args.latency_ms,
+                         signature_version=args.signature_version)
+        address = args.tcp
+
+    fake.start()
+    print(f"🧪 Fake-clamd läuft auf {address} ({fake.version})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+ChiliView Fake-NodeODM
+Lokaler Ersatz für einen NodeODM-Knoten zum Testen und Benchmarken ohne ODM
+
+Unterstützt /info, /task/new/init, /task/new/upload/{uuid}, /task/new/commit/{uuid},
+/task/{uuid}/info, /task/{uuid}/download/{asset} (mit Range und Repr-Digest),
+/task/list, /task/cancel und /task/remove. Die Verarbeitung wird simuliert: eine Aufgabe
+braucht --seconds-per-image pro Bild, höchstens --parallel laufen gleichzeitig. Danach
+stehen textured_model.zip, orthophoto.tif und dsm.tif bereit und die webhook-URL der
+Aufgabe wird aufgerufen.
+
+Aufruf (im backend-Verzeichnis):
+    python tools/fake_nodeodm.py --port 3000
+    python tools/fake_nodeodm.py --port 3001 --cores 4 --parallel 1 --seconds-per-image 0.2
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Statuscodes wie NodeODM
+QUEUED, RUNNING, FAILED, COMPLETED, CANCELED = 10, 20, 30, 40, 50
+
+
+def _tiff_asset(size: int) -> bytes:
+    """Little-Endian-TIFF-Header, aufgefüllt auf size Bytes"""
+    header = b"II*\x00\x08\x00\x00\x00"
+    return header + random.randbytes(max(0, size - len(header)))
+
+
+def _model_asset(images: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("odm_textured_model_geo.obj", "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n" * images)
+        archive.writestr("odm_textured_model_geo.mtl", "newmtl material0\n")
+    return buffer.getvalue()
+
+
+class FakeTask:
+    def __init__(self, name: str, options: str, webhook: Optional[str]):
+        self.uuid = str(uuid.uuid4())
+        self.name = name
+        self.options = options
+        self.webhook = webhook
+        self.created = time.time()
+        self.images = 0
+        self.bytes = 0
+        self.status = QUEUED
+        self.committed = False
+        self.started: Optional[float] = None
+        self.duration = 0.0
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.assets: Dict[str, bytes] = {}
+
+    def info(self) -> Dict:
+        status = {"code": self.status}
+        if self.error:
+            status["errorMessage"] = self.error
+        return {
+            "uuid": self.uuid,
+            "name": self.name,
+            "dateCreated": int(self.created * 1000),
+            "processingTime": int((time.time() - self.started) * 1000) if self.started else 0,
+            "status": status,
+            "options": json.loads(self.options or "[]"),
+            "imagesCount": self.images,
+            "progress": round(self.progress, 1)
+        }
+
+
+class _FakeNodeODMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self) -> "FakeNodeODM":
+        return self.server.fake
+
+    def _send_json(self, data, status: int = 200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _form(self, body: bytes) -> Dict[str, str]:
+        content_type = self.headers.get("Content-Type", "")
+        if "application/x-www-form-urlencoded" in content_type:
+            return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+        if "multipart/form-data" in content_type:
+            form = {}
+            for match in re.finditer(rb'name="([^"]+)"\r\n\r\n(.*?)\r\n--', body, re.DOTALL):
+                form[match.group(1).decode()] = match.group(2).decode("utf-8", "ignore")
+            return form
+        return {}
+
+    def _authorized(self, query: Dict) -> bool:
+        if not self.fake.token:
+            return True
+        if query.get("token", [""])[0] == self.fake.token:
+            return True
+        self._send_json({"error": "Invalid authentication token"}, 401)
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if not self._authorized(query):
+            return
+
+        if url.path == "/info":
+            return self._send_json(self.fake.node_info())
+        if url.path == "/task/list":
+            return self._send_json([{"uuid": task_uuid} for task_uuid in list(self.fake.tasks)])
+
+        match = re.fullmatch(r"/task/([^/]+)/info", url.path)
+        if match:
+            task = self.fake.tasks.get(match.group(1))
+            if task is None:
+                return self._send_json({"error": f"{match.group(1)} not found"})
+            return self._send_json(task.info())
+
+        match = re.fullmatch(r"/task/([^/]+)/download/([^/]+)", url.path)
+        if match:
+            task = self.fake.tasks.get(match.group(1))
+            if task is None or task.status != COMPLETED or match.group(2) not in task.assets:
+                return self._send_json({"error": "Asset not found"}, 404)
+            return self._send_asset(task.assets[match.group(2)])
+
+        self._send_json({"error": "Not found"}, 404)
+
+    def _send_asset(self, data: bytes):
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = re.fullmatch(r"bytes=(\d+)-", range_header.strip())
+            start = int(match.group(1)) if match else 0
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        # Abbruch mitten im Download simulieren (für Range-Wiederaufnahme)
+        cut = self.fake.should_cut_download()
+        chunk = data[start:]
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(chunk)))
+        self.send_header("Accept-Ranges", "bytes")
+        digest = base64.b64encode(hashlib.sha256(data).digest()).decode()
+        self.send_header("Repr-Digest", f"sha-256=:{digest}:")
+        self.end_headers()
+        self.fake.bytes_downloaded += len(chunk) // 2 if cut else len(chunk)
+        if cut:
+            self.wfile.write(chunk[:len(chunk) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(chunk)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        body = self._read_body()
+        if not self._authorized(query):
+            return
+
+        if url.path == "/task/new/init":
+            form = self._form(body)
+            task = FakeTask(form.get("name", "task"), form.get("options", "[]"), form.get("webhook"))
+            self.fake.tasks[task.uuid] = task
+            return self._send_json({"uuid": task.uuid})
+
+        match = re.fullmatch(r"/task/new/upload/([^/]+)", url.path)
+        if match:
+            task = self.fake.tasks.get(match.group(1))
+            if task is None or task.committed:
+                return self._send_json({"error": "Invalid uuid (not initialized)"})
+            if self.fake.should_fail_upload():
+                return self._send_json({"error": "Simulierter Serverfehler"}, 503)
+            images = body.count(b'filename="')
+            task.images += images
+            task.bytes += len(body)
+            self.fake.images_received += images
+            self.fake.bytes_received += len(body)
+            return self._send_json({"success": True})
+
+        match = re.fullmatch(r"/task/new/commit/([^/]+)", url.path)
+        if match:
+            task = self.fake.tasks.get(match.group(1))
+            if task is None:
+                return self._send_json({"error": "Invalid uuid (not initialized)"})
+            if task.images == 0:
+                return self._send_json({"error": "Not enough images"})
+            task.committed = True
+            task.duration = task.images * self.fake.seconds_per_image
+            return self._send_json({"uuid": task.uuid})
+
+        if url.path in ("/task/cancel", "/task/remove"):
+            task_uuid = self._form(body).get("uuid")
+            task = self.fake.tasks.get(task_uuid)
+            if task is None:
+                return self._send_json({"error": f"{task_uuid} not found"})
+            if url.path == "/task/cancel":
+                if task.status in (QUEUED, RUNNING):
+                    task.status = CANCELED
+            else:
+                self.fake.tasks.pop(task_uuid, None)
+            return self._send_json({"success": True})
+
+        self._send_json({"error": "Not found"}, 404)
+
+
+class FakeNodeODM:
+    """Fake-NodeODM-Knoten in einem Hintergrund-Thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 3000, cores: int = 8,
+                 memory_gb: int = 32, parallel: int = 2, seconds_per_image: float = 0.05,
+                 max_images: Optional[int] = None, token: str = "", fail_rate: float = 0.0,
+                 upload_error_rate: float = 0.0, download_cut_rate: float = 0.0,
+                 asset_kb_per_image: int = 64):
+        self.host = host
+        self.port = port
+        self.cores = cores
+        self.memory_gb = memory_gb
+        self.parallel = parallel
+        self.seconds_per_image = seconds_per_image
+        self.max_images = max_images
+        self.token = token
+        self.fail_rate = fail_rate
+        self.upload_error_rate = upload_error_rate
+        self.download_cut_rate = download_cut_rate
+        self.asset_kb_per_image = asset_kb_per_image
+
+        self.tasks: Dict[str, FakeTask] = {}
+        self.images_received = 0
+        self.bytes_received = 0
+        self.bytes_downloaded = 0
+        self.webhooks_sent = 0
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads = []
+        self._stop = threading.Event()
+        self._random = random.Random(0)
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def node_info(self) -> Dict:
+        active = [t for t in self.tasks.values() if t.status in (QUEUED, RUNNING)]
+        total_memory = self.memory_gb * 1024 ** 3
+        running = sum(1 for t in active if t.status == RUNNING)
+        return {
+            "version": "2.2.1-fake",
+            "taskQueueCount": len(active),
+            "totalMemory": total_memory,
+            "availableMemory": int(total_memory * (1 - 0.3 * running / max(1, self.parallel))),
+            "cpuCores": self.cores,
+            "maxImages": self.max_images,
+            "maxParallelTasks": self.parallel,
+            "engineVersion": "3.5.0-fake",
+            "engine": "odm"
+        }
+
+    def should_fail_upload(self) -> bool:
+        return self._random.random() < self.upload_error_rate
+
+    def should_cut_download(self) -> bool:
+        return self._random.random() < self.download_cut_rate
+
+    def _tick(self):
+        """Simuliert Warteschlange und Verarbeitung"""
+        while not self._stop.wait(0.02):
+            now = time.time()
+            running = [t for t in self.tasks.values() if t.status == RUNNING]
+            for task in list(self.tasks.values()):
+                if task.status == QUEUED and task.committed and len(running) < self.parallel:
+                    task.status = RUNNING
+                    task.started = now
+                    running.append(task)
+
+            for task in running:
+                elapsed = now - task.started
+                task.progress = min(100.0, 100.0 * elapsed / task.duration) if task.duration else 100.0
+                if task.progress < 100.0:
+                    continue
+                if self._random.random() < self.fail_rate:
+                    task.status = FAILED
+                    task.error = "Simulierter Verarbeitungsfehler"
+                else:
+                    size = task.images * self.asset_kb_per_image * 1024
+                    task.assets = {
+                        "textured_model.zip": _model_asset(task.images),
+                        "orthophoto.tif": _tiff_asset(size),
+                        "dsm.tif": _tiff_asset(size // 4)
+                    }
+                    task.status = COMPLETED
+                if task.webhook:
+                    threading.Thread(target=self._send_webhook, args=(task,), daemon=True).start()
+
+    def _send_webhook(self, task: FakeTask):
+        request = urllib.request.Request(
+            task.webhook, data=json.dumps(task.info()).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+            self.webhooks_sent += 1
+        except Exception as e:
+            print(f"⚠️  Webhook für {task.uuid} fehlgeschlagen: {e}")
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _FakeNodeODMHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+            threading.Thread(target=self._tick, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiliView Fake-NodeODM")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--cores", type=int, default=8, help="Gemeldete CPU-Kerne")
+    parser.add_argument("--memory-gb", type=int, default=32, help="Gemeldeter Arbeitsspeicher")
+    parser.add_argument("--parallel", type=int, default=2, help="Gleichzeitig laufende Aufgaben")
+    parser.add_argument("--seconds-per-image", type=float, default=0.05, help="Simulierte Rechenzeit")
+    parser.add_argument("--max-images", type=int, default=None)
+    parser.add_argument("--token", default="", help="Erwartetes Token (?token=)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Anteil fehlschlagender Aufgaben")
+    parser.add_argument("--upload-error-rate", type=float, default=0.0, help="Anteil 503 beim Upload")
+    parser.add_argument("--download-cut-rate", type=float, default=0.0,
+                        help="Anteil abgebrochener Downloads (testet Range-Wiederaufnahme)")
+    args = parser.parse_args()
+
+    fake = FakeNodeODM(
+        host=args.host, port=args.port, cores=args.cores, memory_gb=args.memory_gb,
+        parallel=args.parallel, seconds_per_image=args.seconds_per_image,
+        max_images=args.max_images, token=args.token, fail_rate=args.fail_rate,
+        upload_error_rate=args.upload_error_rate, download_cut_rate=args.download_cut_rate
+    )
+    fake.start()
+    print(f"🧪 Fake-NodeODM läuft auf {fake.address} ({args.cores} Kerne, {args.parallel} parallel)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+        print(f"📊 {fake.images_received} Bilder empfangen, {fake.bytes_downloaded} bytes ausgeliefert")
+
+
+if __name__ == "__main__":
+    main()
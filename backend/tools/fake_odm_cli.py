@@ -0,0 +1,132 @@
+"""
+ChiliView Fake-WebODM-CLI
+Ersetzt webodm.sh für Tests und Kalibrierung ohne ODM
+
+Versteht den Aufruf aus WebODMCLIService.process_images ("process --project ...
+--images ... --output ... --max-concurrency N ..."), gibt die ODM-Stufen mit
+Fortschritt aus und erzeugt echte CPU- und Speicherlast: pro Bild
+FAKE_ODM_CORE_SECONDS CPU-Sekunden, davon FAKE_ODM_SERIAL_FRACTION einfädig,
+der Rest verteilt auf --max-concurrency Worker-Prozesse mit je
+FAKE_ODM_MB_PER_WORKER MB Arbeitsspeicher. Damit zeigen sich Überbelegung und
+Amdahl-Effekt wie bei einer echten Instanz. Am Ende werden Platzhalter-Ergebnisse
+ins Ausgabeverzeichnis geschrieben. --rerun-from überspringt die Stufen davor
+wie bei einem fortgesetzten Lauf.
+
+Aufruf:
+    python tools/fake_odm_cli.py process --project p --images imgs --output out --max-concurrency 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Stufen wie in ODM mit grobem Anteil an der Rechenzeit
+STAGES = [
+    ("dataset", 0.02),
+    ("opensfm", 0.35),
+    ("openmvs", 0.28),
+    ("odm_filterpoints", 0.03),
+    ("odm_meshing", 0.08),
+    ("mvs_texturing", 0.10),
+    ("odm_georeferencing", 0.05),
+    ("odm_dem", 0.04),
+    ("odm_orthophoto", 0.05)
+]
+
+OUTPUT_FILES = ["orthophoto.tif", "dsm.tif", "dtm.tif", "point_cloud.ply", "mesh.obj", "texture.jpg"]
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def burn(cpu_seconds: float, memory_mb: int = 0) -> float:
+    """Verbraucht cpu_seconds CPU-Zeit und hält dabei memory_mb MB belegt"""
+    buffer = bytearray(memory_mb * 1024 * 1024)
+    # Seiten tatsächlich anfassen, damit sie im RSS erscheinen
+    for offset in range(0, len(buffer), 4096):
+        buffer[offset] = 1
+
+    start = time.process_time()
+    value = 0
+    while time.process_time() - start < cpu_seconds:
+        for i in range(10000):
+            value += i * i
+    return time.process_time() - start
+
+
+def run_stage(name: str, cpu_seconds: float, serial_fraction: float, workers: int,
+              memory_mb: int, pool: ProcessPoolExecutor):
+    print(f"[INFO]    Running {name} stage", flush=True)
+    burn(cpu_seconds * serial_fraction)
+
+    parallel_seconds = cpu_seconds * (1.0 - serial_fraction)
+    chunks = workers * 4
+    futures = [pool.submit(burn, parallel_seconds / chunks, memory_mb) for _ in range(chunks)]
+    for done, future in enumerate(futures, 1):
+        future.result()
+        print(f"{name}: {done}/{chunks}", flush=True)
+    print(f"[INFO]    Finished {name} stage", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake-WebODM-CLI (Kalibrierung/Tests)")
+    parser.add_argument("command", choices=["process"])
+    parser.add_argument("--project", required=True)
+    parser.add_argument("--images", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--temp")
+    parser.add_argument("--max-concurrency", default="auto")
+    parser.add_argument("--rerun-from")
+    args, _ = parser.parse_known_args()
+
+    if args.max_concurrency.isdigit():
+        workers = max(int(args.max_concurrency), 1)
+    else:
+        workers = os.cpu_count() or 1
+
+    images = [p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS]
+    if not images:
+        print("[ERROR] Keine Bilder gefunden", flush=True)
+        return 1
+
+    if os.getenv("FAKE_ODM_FAIL") == "1":
+        print("[ERROR] Simulierter Fehler", flush=True)
+        return 1
+
+    core_seconds = _env_float("FAKE_ODM_CORE_SECONDS", 0.05) * len(images)
+    serial_fraction = min(max(_env_float("FAKE_ODM_SERIAL_FRACTION", 0.2), 0.0), 1.0)
+    memory_mb = int(_env_float("FAKE_ODM_MB_PER_WORKER", 50))
+
+    print(f"[INFO]    Fake-ODM: {len(images)} Bilder, {workers} Threads, {core_seconds:.1f} CPU-Sekunden",
+          flush=True)
+    stages = STAGES
+    if args.rerun_from:
+        names = [name for name, _ in STAGES]
+        if args.rerun_from not in names:
+            print(f"[ERROR] Unbekannte Stufe {args.rerun_from}", flush=True)
+            return 1
+        stages = STAGES[names.index(args.rerun_from):]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, share in stages:
+            run_stage(name, core_seconds * share, serial_fraction, workers, memory_mb, pool)
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    for filename in OUTPUT_FILES:
+        (output / filename).write_bytes(b"FAKE" + os.urandom(1024))
+    print("[INFO]    ODM app finished", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
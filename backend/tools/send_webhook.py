@@ -0,0 +1,86 @@
+"""
+ChiliView Webhook-Sender
+Lokaler Ersatz für WebODM/NodeODM-Callbacks zum Testen des Webhook-Empfangs
+
+Sendet einen Abschluss-Callback im Format von WebODM ({"id", "project", "status"}) oder
+NodeODM ({"uuid", "status": {"code"}}) und authentifiziert per URL-Token (wie NodeODM)
+oder per Body-Signatur im Header X-ChiliView-Signature.
+
+Aufruf (im backend-Verzeichnis):
+    python tools/send_webhook.py --reseller r1 --project 7 --secret geheim --style nodeodm
+    python tools/send_webhook.py --reseller r1 --project 7 --secret geheim --auth signature \\
+        --task-id 3_5d1c... --status completed
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.webhooks import SIGNATURE_HEADER, sign_body, webhook_path, webhook_token  # noqa: E402
+
+# Statuscodes je Format
+STATUS_CODES = {
+    "webodm": {"queued": 10, "running": 20, "completed": 30, "failed": 40, "canceled": 50},
+    "nodeodm": {"queued": 10, "running": 20, "failed": 30, "completed": 40, "canceled": 50},
+}
+
+
+def build_payload(style: str, task_id: str, status: str) -> dict:
+    code = STATUS_CODES[style][status]
+    if style == "webodm":
+        webodm_project_id, _, task_uuid = task_id.partition("_")
+        return {
+            "id": task_uuid or task_id,
+            "project": int(webodm_project_id) if webodm_project_id.isdigit() else webodm_project_id,
+            "status": code,
+            "running_progress": 1.0 if status == "completed" else 0.5,
+            "last_error": "Stand-in: Verarbeitung fehlgeschlagen" if status == "failed" else None
+        }
+    return {
+        "uuid": task_id,
+        "name": "chiliview-stand-in",
+        "dateCreated": int(time.time() * 1000),
+        "status": {"code": code},
+        "progress": 100 if status == "completed" else 50
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChiliView Webhook-Sender")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Basis-URL des Backends")
+    parser.add_argument("--reseller", required=True, help="Reseller-ID")
+    parser.add_argument("--project", type=int, required=True, help="Projekt-ID")
+    parser.add_argument("--secret", required=True, help="WEBHOOK_SECRET des Backends")
+    parser.add_argument("--style", choices=sorted(STATUS_CODES), default="nodeodm")
+    parser.add_argument("--auth", choices=("token", "signature"), default="token")
+    parser.add_argument("--status", choices=("queued", "running", "completed", "failed", "canceled"),
+                        default="completed")
+    parser.add_argument("--task-id", default=None, help="Task-ID (Standard: zufällige UUID)")
+    args = parser.parse_args()
+
+    task_id = args.task_id or str(uuid.uuid4())
+    body = json.dumps(build_payload(args.style, task_id, args.status)).encode("utf-8")
+
+    url = args.base_url.rstrip("/") + webhook_path(args.reseller, args.project)
+    params = {}
+    headers = {"Content-Type": "application/json"}
+    if args.auth == "token":
+        params["token"] = webhook_token(args.reseller, args.project, args.secret)
+    else:
+        headers[SIGNATURE_HEADER] = sign_body(body, args.secret)
+
+    response = httpx.post(url, params=params, headers=headers, content=body, timeout=10.0)
+    print(f"📨 {args.style}-Callback ({args.status}) an {url}: HTTP {response.status_code}")
+    print(response.text)
+    sys.exit(0 if response.status_code < 300 else 1)
+
+
+if __name__ == "__main__":
+    main()